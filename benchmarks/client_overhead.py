@@ -0,0 +1,98 @@
+"""
+Client overhead per streamed token, measured against agentx.fake_ollama.
+
+Streams the same unpaced response three ways and reports wall and CPU time per
+token for each:
+
+- raw: httpx stream plus json.loads per NDJSON line, the floor for any client
+- ollama: ollama.Client.chat(stream=True) on the pooled connection
+- engine: ConversationEngine.ask, which adds metrics, chunk accumulation and
+  persistence of the turn
+
+    PYTHONPATH=src python benchmarks/client_overhead.py --tokens 5000 --turns 5
+"""
+
+import argparse
+import json
+import tempfile
+import time
+
+from agentx.connection import OllamaConnection
+from agentx.engine import ConversationEngine
+from agentx.fake_ollama import FakeOllama
+
+
+def timed(fn, turns: int, tokens: int) -> dict:
+    """
+    Run ``fn`` ``turns`` times and return per-token timings of the fastest run.
+    """
+    best_wall = best_cpu = float("inf")
+    for _ in range(turns):
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        fn()
+        best_wall = min(best_wall, time.perf_counter() - wall_start)
+        best_cpu = min(best_cpu, time.process_time() - cpu_start)
+    return {
+        "wall_us_per_token": best_wall * 1e6 / tokens,
+        "cpu_us_per_token": best_cpu * 1e6 / tokens,
+    }
+
+
+def run(tokens: int = 5000, turns: int = 5) -> dict:
+    """
+    :param tokens: Chunks per streamed response.
+    :param turns: Runs per variant; the fastest is reported.
+    """
+    server = FakeOllama(tokens=tokens).start()
+    config = {"agentx": {"ollama_host": server.address, "ollama_model": server.model}}
+    connection = OllamaConnection(config)
+    request = {
+        "model": server.model,
+        "messages": [{"role": "user", "content": "benchmark"}],
+        "stream": True,
+    }
+
+    def raw():
+        with connection.http.stream("POST", "/api/chat", json=request) as response:
+            for line in response.iter_lines():
+                if line:
+                    json.loads(line)
+
+    def ollama():
+        for _ in connection.client.chat(
+            model=server.model, messages=request["messages"], stream=True
+        ):
+            pass
+
+    try:
+        with tempfile.TemporaryDirectory() as history:
+            engine = ConversationEngine(
+                config, history, "session_benchmark", connection=connection
+            )
+            results = {
+                "tokens": tokens,
+                "turns": turns,
+                "raw": timed(raw, turns, tokens),
+                "ollama": timed(ollama, turns, tokens),
+                "engine": timed(lambda: engine.ask("benchmark"), turns, tokens),
+            }
+            engine.close()
+    finally:
+        connection.close()
+        server.stop()
+    results["engine_overhead_us_per_token"] = (
+        results["engine"]["cpu_us_per_token"] - results["raw"]["cpu_us_per_token"]
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokens", type=int, default=5000)
+    parser.add_argument("--turns", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.tokens, args.turns), indent=2))
+
+
+if __name__ == "__main__":
+    main()
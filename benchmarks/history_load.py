@@ -0,0 +1,83 @@
+"""
+History load time versus the number of past sessions.
+
+Builds a user history with N sessions of a few messages each, written through
+Context so the history index is maintained as in the app, then times
+History() cold (index present) and with the index removed (every session
+backfilled once).
+
+    PYTHONPATH=src python benchmarks/history_load.py --sessions 100 1000 3000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from agentx.context import Context
+from agentx.history import History
+from agentx.message import Message
+from agentx.storage import HISTORY_INDEX_FILE, HistoryIndex
+
+
+def build_history(path: str, sessions: int, messages: int):
+    """
+    Write ``sessions`` sessions of ``messages`` messages each under ``path``.
+    """
+    index = HistoryIndex(path)
+    for idx in range(sessions):
+        context = Context()
+        context.session_id = f"session_{idx:06d}"
+        context.path = os.path.join(path, context.session_id, "context")
+        os.makedirs(context.path)
+        context.history_index = index
+        for n in range(messages):
+            role = "user" if n % 2 == 0 else "assistant"
+            context.add_message(
+                datetime.now(), Message(role=role, content=f"message {n} of {idx}")
+            )
+        context.close()
+
+
+def time_load(path: str) -> float:
+    started = time.perf_counter()
+    History(user_history_path=path)
+    return (time.perf_counter() - started) * 1000
+
+
+def run(sizes: list[int] = (100, 1000, 3000), messages: int = 4) -> dict:
+    """
+    :param sizes: Session counts to measure.
+    :param messages: Messages per session.
+    """
+    results = {"messages_per_session": messages, "runs": []}
+    for sessions in sizes:
+        with tempfile.TemporaryDirectory() as path:
+            build_history(path, sessions, messages)
+            indexed_ms = time_load(path)
+            os.remove(os.path.join(path, HISTORY_INDEX_FILE))
+            backfill_ms = time_load(path)
+            reindexed_ms = time_load(path)
+        results["runs"].append(
+            {
+                "sessions": sessions,
+                "indexed_ms": indexed_ms,
+                "backfill_ms": backfill_ms,
+                "after_backfill_ms": reindexed_ms,
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[100, 1000, 3000])
+    parser.add_argument("--messages", type=int, default=4)
+    args = parser.parse_args()
+    print(json.dumps(run(args.sessions, args.messages), indent=2))
+
+
+if __name__ == "__main__":
+    main()
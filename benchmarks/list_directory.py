@@ -0,0 +1,61 @@
+"""
+FileExplorer.list_directory time on large directories.
+
+Creates directories with N files (and N/10 subdirectories) and times
+list_directory, best of several runs, once the entries are in the OS cache.
+
+    PYTHONPATH=src python benchmarks/list_directory.py --entries 1000 10000 50000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from agentx.file_explorer import FileExplorer
+
+
+def populate(path: str, entries: int):
+    for idx in range(entries):
+        with open(os.path.join(path, f"file_{idx:07d}.txt"), "wb") as f:
+            f.write(b"x" * (idx % 4096))
+    for idx in range(entries // 10):
+        os.mkdir(os.path.join(path, f"dir_{idx:07d}"))
+
+
+def run(sizes: list[int] = (1000, 10000, 50000), repeat: int = 5) -> dict:
+    """
+    :param sizes: File counts to measure.
+    :param repeat: Runs per size; the fastest is reported.
+    """
+    results = {"repeat": repeat, "runs": []}
+    for entries in sizes:
+        with tempfile.TemporaryDirectory() as path:
+            populate(path, entries)
+            explorer = FileExplorer(start_path=path)
+            best = float("inf")
+            for _ in range(repeat):
+                started = time.perf_counter()
+                listed = explorer.list_directory()
+                best = min(best, time.perf_counter() - started)
+        results["runs"].append(
+            {
+                "entries": len(listed),
+                "ms": best * 1000,
+                "us_per_entry": best * 1e6 / max(1, len(listed)),
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.entries, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Memory held by the messages of a loaded session.
+
+Writes a session log of N messages, then loads it three times under
+tracemalloc:
+
+- baseline: the Message representation before it was compacted, a
+  ``@dataclass`` with an instance dict, its own role string and chunk list, and
+  the content in memory, loaded as Context.load_messages used to;
+- slotted: the current slotted, interned Message with its content in memory;
+- lazy: Context.load_messages as is, each message's content left on disk until
+  it is used.
+
+Reports the memory held after loading and per message.
+
+    PYTHONPATH=src python benchmarks/message_memory.py --messages 100000 --chars 500
+"""
+
+import argparse
+import gc
+import json
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+
+from agentx.context import Context
+from agentx.message import Message, estimate_tokens
+from agentx.storage import SessionLog
+
+
+def write_log(path: str, messages: int, chars: int):
+    """
+    Append ``messages`` messages of ``chars`` characters each to a new log.
+    """
+    content = ("lorem ipsum " * (chars // 12 + 1))[:chars]
+    log = SessionLog(path, fsync_every=messages)
+    epoch = datetime.now().timestamp()
+    for idx in range(messages):
+        role = "user" if idx % 2 == 0 else "assistant"
+        message = Message(role=role, content=f"{idx} {content}", epoch=epoch + idx)
+        message.seq = idx
+        log.append(message.serialize())
+    log.close()
+
+
+@dataclass
+class BaselineMessage:
+    """
+    The fields and storage of Message before ``__slots__`` and lazy content.
+    """
+
+    def __init__(self, data: dict, file: str):
+        self.role = data.get("role", "user")
+        self._content = data.get("content", "")
+        self._chunks: list[str] = []
+        self.attachments: list[str] = data.get("attachments") or []
+        self._enabled = data.get("enabled", True)
+        self._file = file
+        self._epoch = data.get("epoch", 0)
+        self.metrics = data.get("metrics")
+        self.seq = data.get("seq")
+        self._tokens = data.get("tokens")
+        self.pinned = data.get("pinned", False)
+        self.summary_of = data.get("summary_of")
+        self.status = data.get("status")
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @property
+    def tokens(self) -> int:
+        if self._tokens is None:
+            self._tokens = estimate_tokens(self._content)
+        return self._tokens
+
+    @property
+    def ts(self) -> datetime:
+        return datetime.fromtimestamp(self._epoch)
+
+
+def measure(load, messages: int) -> dict:
+    """
+    Run ``load`` under tracemalloc and report what its result keeps alive.
+    """
+    gc.collect()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    loaded = load()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del loaded
+    return {
+        "seconds": elapsed,
+        "mb": current / 1024**2,
+        "peak_mb": peak / 1024**2,
+        "bytes_per_message": current / messages,
+    }
+
+
+def load_lazy(path: str) -> Context:
+    """
+    Load the session the way the app does, content left in the log.
+    """
+    context = Context()
+    context.path = path
+    context.load_messages("")
+    return context
+
+
+def load_baseline(path: str) -> Context:
+    """
+    Load the session into baseline messages, as Context.load_messages did.
+    """
+    context = Context()
+    context.path = path
+    log = context.log
+    for entry in sorted(log.entries(), key=lambda e: (e.epoch, e.seq)):
+        message = BaselineMessage(log.read(entry), log.segment_path(entry.segment))
+        context.messages.append((message.ts, message))
+        context.window.append(message)
+    log.close()
+    return context
+
+
+def load_slotted(path: str) -> Context:
+    """
+    Load the session with every slotted message holding its content.
+    """
+    context = load_lazy(path)
+    for _, message in context.messages:
+        message.content = message.content
+    return context
+
+
+def run(messages: int = 100000, chars: int = 500) -> dict:
+    """
+    :param messages: Messages in the session.
+    :param chars: Characters of content per message.
+    """
+    with tempfile.TemporaryDirectory() as path:
+        write_log(path, messages, chars)
+        baseline = measure(lambda: load_baseline(path), messages)
+        slotted = measure(lambda: load_slotted(path), messages)
+        lazy = measure(lambda: load_lazy(path), messages)
+    return {
+        "messages": messages,
+        "chars": chars,
+        "baseline": baseline,
+        "slotted": slotted,
+        "lazy": lazy,
+        "slotted_saved_ratio": 1 - slotted["mb"] / baseline["mb"],
+        "lazy_saved_ratio": 1 - lazy["mb"] / baseline["mb"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--chars", type=int, default=500)
+    args = parser.parse_args()
+    print(json.dumps(run(args.messages, args.chars), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Message.save throughput into a session log.
+
+Appends messages of a fixed size to a fresh SessionLog and reports messages and
+megabytes per second, with the default fsync batching and with an fsync after
+every message. The write-behind variant fsyncs every message too, but through
+agentx.persistence.WriteBehind, and also reports how long the caller (the GUI
+thread in the app) was blocked per message.
+
+    PYTHONPATH=src python benchmarks/message_save.py --messages 5000 --chars 2000
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from datetime import datetime
+
+from agentx.message import Message
+from agentx.persistence import WriteBehind
+from agentx.storage import SessionLog
+
+
+def save_messages(messages: int, chars: int, fsync_every: int) -> dict:
+    """
+    Save ``messages`` messages of ``chars`` characters each.
+    """
+    content = ("lorem ipsum " * (chars // 12 + 1))[:chars]
+    with tempfile.TemporaryDirectory() as path:
+        log = SessionLog(path, fsync_every=fsync_every)
+        started = time.perf_counter()
+        for idx in range(messages):
+            role = "user" if idx % 2 == 0 else "assistant"
+            Message(role=role, content=content).save(log, datetime.now())
+        log.sync()
+        elapsed = time.perf_counter() - started
+        size = log.size_bytes()
+        log.close()
+    return {
+        "fsync_every": fsync_every,
+        "seconds": elapsed,
+        "messages_per_second": messages / elapsed,
+        "mb_per_second": size / elapsed / 1024**2,
+    }
+
+
+def save_messages_behind(messages: int, chars: int) -> dict:
+    """
+    Save through the write-behind worker, with an fsync after every message.
+    """
+    content = ("lorem ipsum " * (chars // 12 + 1))[:chars]
+    with tempfile.TemporaryDirectory() as path:
+        log = SessionLog(path, fsync_every=1)
+        writer = WriteBehind()
+        started = time.perf_counter()
+        for idx in range(messages):
+            role = "user" if idx % 2 == 0 else "assistant"
+            writer.save_message(
+                log, Message(role=role, content=content), datetime.now()
+            )
+        queued = time.perf_counter() - started
+        writer.flush()
+        elapsed = time.perf_counter() - started
+        writer.close()
+        size = log.size_bytes()
+        log.close()
+    return {
+        "fsync_every": 1,
+        "seconds": elapsed,
+        "messages_per_second": messages / elapsed,
+        "mb_per_second": size / elapsed / 1024**2,
+        "caller_us_per_message": queued * 1e6 / messages,
+    }
+
+
+def run(messages: int = 5000, chars: int = 2000) -> dict:
+    """
+    :param messages: Messages to save per variant.
+    :param chars: Characters of content per message.
+    """
+    return {
+        "messages": messages,
+        "chars": chars,
+        "batched": save_messages(messages, chars, fsync_every=16),
+        "fsync_each": save_messages(messages, chars, fsync_every=1),
+        "write_behind": save_messages_behind(messages, chars),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--chars", type=int, default=2000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.messages, args.chars), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Chat stream decoding: ollama's pydantic path versus agentx.ndjson.
+
+Decodes the same 10k NDJSON chunks in memory two ways, then streams them from
+agentx.fake_ollama through ConversationEngine.run_turn with
+``ollama_fast_stream`` off and on:
+
+- pydantic: json.loads, ChatResponse(**chunk) and a scan of message.__dict__
+- fast: ndjson.loads (orjson when installed) and ndjson.route
+
+    PYTHONPATH=src python benchmarks/ndjson_decode.py --chunks 10000
+"""
+
+import argparse
+import json
+import tempfile
+import time
+
+from ollama import ChatResponse
+
+from agentx import ndjson
+from agentx.engine import ConversationEngine
+from agentx.fake_ollama import FakeOllama
+
+
+def decode_pydantic(lines: list[bytes]):
+    for line in lines:
+        part = ChatResponse(**json.loads(line))
+        channels = [
+            k for k, v in part.message.__dict__.items() if v and k not in ["role", ""]
+        ]
+        if channels:
+            getattr(part.message, channels[0])
+
+
+def decode_fast(lines: list[bytes]):
+    for line in lines:
+        chunk = ndjson.loads(line)
+        message = chunk.get("message")
+        if message:
+            ndjson.route(message)
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        fn()
+        best = min(best, time.process_time() - started)
+    return best
+
+
+def run(chunks: int = 10000, repeat: int = 5) -> dict:
+    """
+    :param chunks: Chunks per stream.
+    :param repeat: Runs per variant; the fastest is reported.
+    """
+    server = FakeOllama(tokens=chunks)
+    lines = [
+        json.dumps(server.chunk(channel, value)).encode("utf-8")
+        for channel, value in server.chunks()
+    ]
+    results = {
+        "chunks": chunks,
+        "decoder": ndjson.loads.__module__,
+        "decode_us_per_chunk": {
+            "pydantic": best_of(lambda: decode_pydantic(lines), repeat) * 1e6 / chunks,
+            "fast": best_of(lambda: decode_fast(lines), repeat) * 1e6 / chunks,
+        },
+        "stream_cpu_us_per_chunk": {},
+    }
+
+    server.start()
+    try:
+        with tempfile.TemporaryDirectory() as history:
+            for name, fast in (("pydantic", False), ("fast", True)):
+                config = {
+                    "agentx": {
+                        "ollama_host": server.address,
+                        "ollama_model": server.model,
+                        "ollama_fast_stream": fast,
+                    }
+                }
+                engine = ConversationEngine(config, history, f"session_{name}")
+                turn = engine.begin_turn("benchmark")
+                cpu = best_of(lambda: engine.run_turn(turn, lambda event: None), repeat)
+                results["stream_cpu_us_per_chunk"][name] = cpu * 1e6 / chunks
+                engine.close()
+                engine.connection.close()
+    finally:
+        server.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.chunks, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
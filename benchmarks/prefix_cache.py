@@ -0,0 +1,88 @@
+"""
+Prompt-prefix (KV cache) reuse benchmark against a live Ollama server.
+
+Runs the same multi-turn conversation twice: once append-only, the way
+agentx.request_builder.RequestBuilder keeps requests, and once with the oldest
+turn dropped before every request, which changes the prompt prefix each time.
+Reports Ollama's prompt_eval_count and prompt_eval_duration for the final turn
+of each mode; with a stable prefix only the newest messages are evaluated.
+
+    PYTHONPATH=src python benchmarks/prefix_cache.py --turns 8 --host localhost:11434
+"""
+
+import argparse
+import json
+
+from agentx.config import load_config
+from agentx.connection import OllamaConnection
+from agentx.message import Message
+from agentx.request_builder import RequestBuilder
+
+FILLER = (
+    "Describe, in a few sentences, a detail of the history of the printing "
+    "press that you have not mentioned yet. "
+)
+
+
+def run(connection: OllamaConnection, turns: int, perturb: bool) -> dict:
+    """
+    Run one conversation and return the server counters of its last turn.
+
+    :param connection: A pooled Ollama connection.
+    :param turns: Number of user turns.
+    :param perturb: Drop the oldest turn before each request.
+    """
+    builder = RequestBuilder(keep_alive="10m")
+    history: list[Message] = [
+        Message(role="system", content="You are a concise assistant.", pinned=True)
+    ]
+    last = None
+    for turn in range(turns):
+        history.append(Message(role="user", content=f"{turn + 1}. {FILLER}"))
+        if perturb and len(history) > 3:
+            del history[1:3]  # Oldest user/assistant pair
+        response = connection.client.chat(
+            model=connection.model,
+            messages=builder.build(history),
+            options={"num_predict": 32, "temperature": 0, "seed": 1},
+            keep_alive=builder.keep_alive,
+        )
+        history.append(Message(role="assistant", content=response.message.content))
+        last = {
+            "messages": len(history) - 1,
+            "prefix_messages_reused": builder.reused,
+            "prompt_eval_count": response.prompt_eval_count,
+            "prompt_eval_ms": (response.prompt_eval_duration or 0) / 1e6,
+        }
+    return last
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--config", default="agentx.toml")
+    parser.add_argument("--host", help="Overrides ollama_host from the config")
+    parser.add_argument("--model", help="Overrides ollama_model from the config")
+    parser.add_argument("--turns", type=int, default=8)
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if args.host:
+        config["agentx"]["ollama_host"] = args.host
+    if args.model:
+        config["agentx"]["ollama_model"] = args.model
+    connection = OllamaConnection(config)
+    try:
+        results = {
+            "host": connection.host,
+            "model": connection.model,
+            "turns": args.turns,
+            "stable": run(connection, args.turns, perturb=False),
+            "perturbed": run(connection, args.turns, perturb=True),
+        }
+    finally:
+        connection.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
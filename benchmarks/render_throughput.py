@@ -0,0 +1,130 @@
+"""
+Render throughput benchmark for the output_text widget.
+
+Replays a canned thinking/content chunk stream into a tk.Text at a fixed token
+rate, once through the legacy per-chunk path (insert + see + update_idletasks for
+every token) and once through agentx.render.RenderBuffer, and reports forced
+layout passes and CPU time per generated token.
+
+Needs a display (use Xvfb on a headless box):
+
+    PYTHONPATH=src python benchmarks/render_throughput.py --tokens 2000 --rate 80
+"""
+
+import argparse
+import json
+import time
+import tkinter as tk
+
+from agentx.render import RenderBuffer
+
+
+def canned_stream(tokens: int, thinking_ratio: float = 0.3) -> list[tuple[str, str]]:
+    """
+    Build a deterministic (channel, text) chunk stream.
+
+    :param tokens: Total number of chunks.
+    :param thinking_ratio: Fraction of chunks on the thinking channel.
+    """
+    thinking = int(tokens * thinking_ratio)
+    words = ["lorem ", "ipsum ", "dolor ", "sit ", "amet,\n", "consectetur "]
+    return [
+        ("thinking" if i < thinking else "content", words[i % len(words)])
+        for i in range(tokens)
+    ]
+
+
+def make_text(root: tk.Tk) -> tk.Text:
+    text = tk.Text(root, wrap=tk.WORD)
+    text.pack(expand=True, fill=tk.BOTH)
+    text.tag_config("agent_thinking", font=("Terminal", 10, "italic"))
+    text.tag_config("agent_response", font=("Terminal", 10, "normal"))
+    root.update()
+    return text
+
+
+def run_legacy(root: tk.Tk, chunks, rate: float) -> dict:
+    """
+    One insert, one see and one update_idletasks per chunk, as before.
+    """
+    text = make_text(root)
+    passes = 0
+    interval = 1.0 / rate
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for idx, (channel, chunk) in enumerate(chunks):
+        tag = "agent_thinking" if channel == "thinking" else "agent_response"
+        text.insert(tk.END, chunk, (tag,))
+        text.see(tk.END)
+        root.update_idletasks()
+        passes += 1
+        # Keep the event loop alive between tokens like the real app does
+        deadline = wall_start + (idx + 1) * interval
+        while time.perf_counter() < deadline:
+            root.update()
+            time.sleep(0.001)
+    cpu = time.process_time() - cpu_start
+    text.destroy()
+    return {"layout_passes": passes, "cpu_seconds": cpu}
+
+
+def run_buffered(root: tk.Tk, chunks, rate: float, frame_ms: int) -> dict:
+    """
+    Chunks go through RenderBuffer, which flushes once per frame.
+    """
+    text = make_text(root)
+    render = RenderBuffer(text, frame_ms)
+    interval = 1.0 / rate
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for idx, (channel, chunk) in enumerate(chunks):
+        tag = "agent_thinking" if channel == "thinking" else "agent_response"
+        render.write(chunk, tag)
+        deadline = wall_start + (idx + 1) * interval
+        while time.perf_counter() < deadline:
+            root.update()
+            time.sleep(0.001)
+    render.flush()
+    root.update()
+    cpu = time.process_time() - cpu_start
+    text.destroy()
+    return {"layout_passes": render.flushes, "cpu_seconds": cpu}
+
+
+def run(tokens: int = 2000, rate: float = 80.0, frame_ms: int = 16) -> dict:
+    """
+    Run both variants and return the results.
+
+    :param tokens: Number of chunks to stream.
+    :param rate: Chunks per second.
+    :param frame_ms: RenderBuffer frame interval.
+    :raises tk.TclError: If no display is available.
+    """
+    chunks = canned_stream(tokens)
+    root = tk.Tk()
+    try:
+        results = {
+            "tokens": tokens,
+            "rate": rate,
+            "frame_ms": frame_ms,
+            "legacy": run_legacy(root, chunks, rate),
+            "buffered": run_buffered(root, chunks, rate, frame_ms),
+        }
+    finally:
+        root.destroy()
+    for variant in ("legacy", "buffered"):
+        r = results[variant]
+        r["layout_passes_per_token"] = r["layout_passes"] / tokens
+        r["cpu_ms_per_token"] = r["cpu_seconds"] * 1000 / tokens
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=80.0, help="tokens/second")
+    parser.add_argument("--frame-ms", type=int, default=16)
+    args = parser.parse_args()
+    print(json.dumps(run(args.tokens, args.rate, args.frame_ms), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Runs every AgentX benchmark and writes the results to one JSON file.
+
+Nothing needs a real Ollama host: client overhead runs against
+agentx.fake_ollama. The render benchmark needs a display (use Xvfb on a
+headless box) and is recorded as skipped without one.
+
+    PYTHONPATH=src python benchmarks/suite.py --output results/$(date +%F).json
+    PYTHONPATH=src python benchmarks/suite.py --quick
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tkinter as tk
+from datetime import datetime
+
+import client_overhead
+import history_load
+import list_directory
+import message_memory
+import message_save
+import ndjson_decode
+import render_throughput
+
+BENCHMARKS = {
+    "client_overhead": (
+        client_overhead.run,
+        {"tokens": 5000, "turns": 5},
+        {"tokens": 500, "turns": 2},
+    ),
+    "ndjson_decode": (
+        ndjson_decode.run,
+        {"chunks": 10000, "repeat": 5},
+        {"chunks": 2000, "repeat": 2},
+    ),
+    "render_throughput": (
+        render_throughput.run,
+        {"tokens": 2000, "rate": 80.0},
+        {"tokens": 200, "rate": 200.0},
+    ),
+    "message_save": (
+        message_save.run,
+        {"messages": 5000, "chars": 2000},
+        {"messages": 500, "chars": 2000},
+    ),
+    "message_memory": (
+        message_memory.run,
+        {"messages": 100000, "chars": 500},
+        {"messages": 5000, "chars": 500},
+    ),
+    "history_load": (
+        history_load.run,
+        {"sizes": [100, 1000, 3000]},
+        {"sizes": [100, 500]},
+    ),
+    "list_directory": (
+        list_directory.run,
+        {"sizes": [1000, 10000, 50000]},
+        {"sizes": [1000, 5000]},
+    ),
+}
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", help="JSON file to write; stdout if omitted")
+    parser.add_argument("--quick", action="store_true", help="Small sizes, for CI")
+    parser.add_argument(
+        "--only", nargs="+", choices=sorted(BENCHMARKS), help="Benchmarks to run"
+    )
+    args = parser.parse_args()
+
+    results = {
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "benchmarks": {},
+    }
+    for name, (run, full, quick) in BENCHMARKS.items():
+        if args.only and name not in args.only:
+            continue
+        print(f"Running {name}...", file=sys.stderr)
+        try:
+            results["benchmarks"][name] = run(**(quick if args.quick else full))
+        except tk.TclError as e:
+            results["benchmarks"][name] = {"skipped": str(e)}
+
+    data = json.dumps(results, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(data + "\n")
+    else:
+        print(data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Docstring for agentx.cancellation
+"""
+
+import socket
+import threading
+import time
+from typing import Any, Callable
+
+
+class CancelToken:
+    """
+    Cancels one chat request.
+
+    The streaming code registers callbacks with ``on_cancel`` that abort the
+    request's socket; ``cancel`` runs them at once from any thread, so a worker
+    blocked in a read wakes up with an error instead of waiting for the next
+    chunk, and the server sees the disconnect and frees its slot. Callbacks run
+    under the token's lock, so once ``on_cancel``'s unregister function returns,
+    the callback can no longer touch a connection handed back to the pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callbacks: dict[int, Callable[[], None]] = {}
+        self._next_id = 0
+        self.requested_at: float | None = None  # perf_counter() of cancel()
+        self.closed_at: float | None = None  # When a stream was first aborted
+        self.acknowledged_at: float | None = None  # When the worker stopped
+
+    @property
+    def cancelled(self) -> bool:
+        """
+        True once ``cancel`` was called.
+        """
+        return self.requested_at is not None
+
+    def cancel(self):
+        """
+        Request cancellation and abort every registered stream.
+        """
+        with self._lock:
+            if self.requested_at is not None:
+                return
+            self.requested_at = time.perf_counter()
+            for callback in self._callbacks.values():
+                self._run(callback)
+            self._callbacks.clear()
+
+    def _run(self, callback: Callable[[], None]):
+        try:
+            callback()
+        except Exception as e:
+            print(f"Cancel callback failed: {e}")
+        if self.closed_at is None:
+            self.closed_at = time.perf_counter()
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Run ``callback`` on cancellation, or right away if already cancelled.
+
+        :param callback: Aborts a stream; must be quick and thread-safe.
+        :return: A function that unregisters the callback.
+        """
+        with self._lock:
+            if self.requested_at is None:
+                callback_id = self._next_id
+                self._next_id += 1
+                self._callbacks[callback_id] = callback
+                return lambda: self._unregister(callback_id)
+            self._run(callback)
+        return lambda: None
+
+    def _unregister(self, callback_id: int):
+        with self._lock:
+            self._callbacks.pop(callback_id, None)
+
+    def acknowledge(self):
+        """
+        Record that the streaming worker has stopped.
+        """
+        if self.requested_at is not None and self.acknowledged_at is None:
+            self.acknowledged_at = time.perf_counter()
+
+    def latency(self) -> dict[str, float | None]:
+        """
+        Milliseconds from ``cancel`` to the socket abort and to the worker stop.
+        """
+
+        def since(moment: float | None) -> float | None:
+            if self.requested_at is None or moment is None:
+                return None
+            return max(0.0, (moment - self.requested_at) * 1000)
+
+        return {
+            "cancel_close_ms": since(self.closed_at),
+            "cancel_ack_ms": since(self.acknowledged_at),
+        }
+
+
+def abort_network_stream(network_stream: Any):
+    """
+    Shut down the socket under an httpcore network stream. Unlike closing it,
+    a shutdown also wakes a thread blocked reading from the socket.
+
+    :param network_stream: ``response.extensions["network_stream"]`` or the
+        stream reported by the ``connection.connect_tcp.complete`` trace.
+    """
+    sock = network_stream.get_extra_info("socket")
+    if sock is None:
+        network_stream.close()
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass  # Already closed by the peer
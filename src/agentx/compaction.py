@@ -0,0 +1,212 @@
+"""
+Docstring for agentx.compaction
+"""
+
+import hashlib
+import json
+import os
+import queue
+import threading
+from datetime import datetime
+
+import httpx
+
+from .context import Context
+from .host_pool import HostPool
+from .message import Message
+from .storage import write_atomic
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n\n"
+SUMMARY_INSTRUCTIONS = (
+    "Summarize the conversation below for your own later reference. Keep every "
+    "fact, decision, open question, file name and code identifier that a "
+    "continuation of the conversation could need. Be concise and do not add "
+    "anything that was not said."
+)
+
+
+class CompactionJob:
+    """
+    A range of old messages to collapse into one summary message.
+    """
+
+    def __init__(self, context: Context, messages: list[Message], model: str):
+        """
+        CompactionJob
+
+        :param context: The context the messages belong to.
+        :param messages: The messages to summarize, oldest first. A previous
+            summary, if any, comes first so summaries roll forward.
+        :param model: The model that writes the summary.
+        """
+        self.context = context
+        self.messages = messages
+        self.model = model
+        # Snapshot on the Tk thread; the worker must not read live messages
+        self.transcript = [(m.role, m.content) for m in messages]
+        self.key = hashlib.sha256(
+            json.dumps(
+                {
+                    "context": context.path,
+                    "messages": [m.seq for m in messages],
+                    "model": model,
+                }
+            ).encode("utf-8")
+        ).hexdigest()
+        self.summary: str | None = None
+        self.error: Exception | None = None
+
+
+class Compactor:
+    """
+    Collapses turns that fell out of the context window into a rolling summary.
+
+    Summaries are written by a background worker that only calls the model while
+    no chat turn is streaming, on a host chosen and limited by the host pool like
+    chat turns; when no healthy host has the model the job is skipped. They are
+    cached on disk per (message range, model) so the same range is never
+    summarized twice. Finished jobs are handed back
+    through ``results`` and applied on the Tk thread with ``apply``.
+    """
+
+    def __init__(
+        self,
+        pool: HostPool,
+        cache_dir: str,
+        idle: threading.Event,
+        min_messages: int = 4,
+    ):
+        """
+        Compactor
+
+        :param pool: The session's Ollama hosts.
+        :param cache_dir: Folder holding ``<key>.json`` summary cache entries.
+        :param idle: Set while no chat turn is streaming.
+        :param min_messages: Fewest evicted messages worth a summary.
+        """
+        self.pool = pool
+        self.cache_dir = cache_dir
+        self.idle = idle
+        self.min_messages = min_messages
+        self.results: queue.Queue = queue.Queue()
+        self._jobs: queue.Queue = queue.Queue()
+        self._pending: set[int] = set()  # id(context) of contexts with a job queued
+        self._thread = threading.Thread(
+            target=self._run, name="agentx-compactor", daemon=True
+        )
+        self._thread.start()
+
+    def schedule(self, context: Context) -> bool:
+        """
+        Queue a summary of the messages evicted from the context's window.
+
+        :param context: The context whose turn just completed.
+        :return: True if a job was queued.
+        """
+        if id(context) in self._pending:
+            return False
+        evicted = [m for m in context.window.evicted if m.enabled and m.seq is not None]
+        if len(evicted) < self.min_messages:
+            return False
+        previous = [
+            m for ts, m in context.messages if m.summary_of and m.enabled
+        ]  # The current rolling summary, if any
+        job = CompactionJob(context, previous[-1:] + evicted, self.pool.model)
+        self._pending.add(id(context))
+        self._jobs.put(job)
+        return True
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            try:
+                job.summary = self._cached(job)
+                if job.summary is None:
+                    self.idle.wait()  # Stay out of the user's critical path
+                    job.summary = self._summarize(job)
+                    if job.summary is not None:
+                        self._store(job)
+            except Exception as e:
+                print(f"Compaction failed: {e}")
+                job.error = e
+            self.results.put(job)
+
+    def _cache_path(self, job: CompactionJob) -> str:
+        return os.path.join(self.cache_dir, f"{job.key}.json")
+
+    def _cached(self, job: CompactionJob) -> str | None:
+        try:
+            with open(self._cache_path(job), "r", encoding="utf-8") as f:
+                return json.loads(f.read())["summary"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _store(self, job: CompactionJob):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {"model": job.model, "messages": [m.seq for m in job.messages]}
+        entry["summary"] = job.summary
+        write_atomic(self._cache_path(job), json.dumps(entry).encode("utf-8"))
+
+    def _summarize(self, job: CompactionJob) -> str | None:
+        """
+        Ask the model for the summary.
+
+        :return: The summary, or None if no usable host has the model.
+        """
+        state = self.pool.choose(model=job.model)
+        if state is None or state.healthy is False or not state.available(job.model):
+            print("Compaction skipped: no Ollama host available")
+            return None
+        transcript = "\n\n".join(
+            f"{role.capitalize()}: {content}" for role, content in job.transcript
+        )
+        with self.pool.use(state) as connection:
+            try:
+                response = connection.client.chat(
+                    model=job.model,
+                    messages=[
+                        {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+                        {"role": "user", "content": transcript},
+                    ],
+                    stream=False,
+                )
+            except httpx.HTTPError as e:
+                self.pool.mark_failed(state, e)
+                raise
+        return response.message.content.strip()
+
+    def apply(self, job: CompactionJob) -> Message | None:
+        """
+        Replace the job's messages with its summary. Runs on the Tk thread.
+
+        :param job: A job taken from ``results``.
+        :return: The inserted summary message, or None if the job failed.
+        """
+        self._pending.discard(id(job.context))
+        if job.error is not None or not job.summary:
+            return None
+        summary = Message(
+            role="system",
+            content=SUMMARY_PREFIX + job.summary,
+            pinned=True,
+            summary_of=[m.seq for m in job.messages],
+        )
+        last = job.messages[-1]
+        # Just after the newest summarized message, so it sorts in their place
+        ts = datetime.fromtimestamp(last.epoch + 1e-6)
+        job.context.compact(job.messages, summary, ts)
+        return summary
+
+    def busy(self) -> bool:
+        """
+        :return: True while a queued job has not been applied yet.
+        """
+        return bool(self._pending)
+
+    def stop(self):
+        """
+        Stop the worker after its current job.
+        """
+        self._jobs.put(None)
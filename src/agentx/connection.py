@@ -0,0 +1,107 @@
+"""
+Docstring for agentx.connection
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+import httpx
+from ollama import Client
+
+from .cancellation import CancelToken, abort_network_stream
+
+
+class OllamaConnection:
+    """
+    A long-lived Ollama client and HTTP connection pool shared by the handshake and
+    every chat turn of a session, so turns reuse kept-alive TCP connections instead
+    of opening a new one each time.
+    """
+
+    def __init__(self, config: dict[str, Any]):
+        """
+        OllamaConnection
+
+        Pool and timeout settings are read from the [agentx] table:
+
+        - ``ollama_connect_timeout_seconds`` (default 10)
+        - ``ollama_read_timeout_seconds`` (default 600, gaps while the model thinks)
+        - ``ollama_max_connections`` (default 8)
+        - ``ollama_keepalive_connections`` (default 4)
+        - ``ollama_keepalive_expiry_seconds`` (default 300)
+
+        :param config: The loaded agentx.toml configuration.
+        """
+        agentx_config = config["agentx"]
+        self.host = agentx_config["ollama_host"]
+        self.model = agentx_config["ollama_model"]
+        self.keep_alive = agentx_config.get("ollama_keep_alive")
+        timeout = httpx.Timeout(
+            agentx_config.get("ollama_read_timeout_seconds", 600),
+            connect=agentx_config.get("ollama_connect_timeout_seconds", 10),
+        )
+        limits = httpx.Limits(
+            max_connections=agentx_config.get("ollama_max_connections", 8),
+            max_keepalive_connections=agentx_config.get(
+                "ollama_keepalive_connections", 4
+            ),
+            keepalive_expiry=agentx_config.get("ollama_keepalive_expiry_seconds", 300),
+        )
+        self.client = Client(host=f"http://{self.host}", timeout=timeout, limits=limits)
+        # The ollama Client builds its httpx.Client from the kwargs above; reuse that
+        # pool for raw API calls so there is exactly one pool per host.
+        self.http: httpx.Client = self.client._client
+        # Cancel token of the request each thread is making through ``client``
+        self._cancel = threading.local()
+        self.http.event_hooks["response"].append(self._on_response)
+
+    @contextmanager
+    def cancellable(self, cancel: CancelToken) -> Iterator[None]:
+        """
+        Abort the socket of requests this thread makes through ``client`` while
+        the block runs, as soon as ``cancel`` is cancelled, instead of waiting for
+        the next chunk. See ``agentx.ndjson.stream_chat`` for the raw client.
+
+        :param cancel: The turn's cancel token.
+        """
+        unregister: list[Callable[[], None]] = []
+        self._cancel.token = cancel
+        self._cancel.unregister = unregister
+        try:
+            yield
+        finally:
+            # The connection may go back to the pool; never abort it after this
+            self._cancel.token = None
+            for callback in unregister:
+                callback()
+
+    def _on_response(self, response: httpx.Response):
+        cancel = getattr(self._cancel, "token", None)
+        stream = response.extensions.get("network_stream")
+        if cancel is not None and stream is not None:
+            self._cancel.unregister.append(
+                cancel.on_cancel(lambda: abort_network_stream(stream))
+            )
+
+    def handshake(self, timeout_seconds: float):
+        """
+        Load the model on the server with an empty chat request.
+
+        :param timeout_seconds: How long to wait for the model to load.
+        :raises httpx.HTTPError: If the server cannot be reached or rejects the call.
+        """
+        payload = {
+            "model": self.model,
+            "prompt": "",
+        }  # Empty prompt to trigger model load
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        response = self.http.post("/api/chat", json=payload, timeout=timeout_seconds)
+        response.raise_for_status()
+
+    def close(self):
+        """
+        Close the pooled connections.
+        """
+        self.http.close()
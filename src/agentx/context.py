@@ -3,11 +3,24 @@ Docstring for src.agentx.context
 """
 
 import json
-import tkinter as tk
+import threading
 from datetime import datetime
-from glob import glob
+from typing import TYPE_CHECKING
 
+from .cancellation import CancelToken
+from .context_window import ContextWindow
 from .message import Message
+from .storage import (
+    PREVIEW_CHARS,
+    HistoryIndex,
+    SessionLog,
+    legacy_message_files,
+    migrate_legacy_context,
+    new_summary,
+)
+
+if TYPE_CHECKING:
+    from .persistence import WriteBehind
 
 
 class Context:
@@ -20,119 +33,229 @@ class Context:
         self.session_id: str | None = None  # Optional session ID
         self.path: str | None = None  # Optional path for context storage
         self.expanded: bool = True  # Whether the context is expanded in the GUI
+        self._log: SessionLog | None = None  # Opened on first use, see log
+        self.loaded: bool = True  # False until a history context is expanded
+        self._load_lock = threading.Lock()  # One load at a time, see ensure_loaded
+        self.summary: dict | None = None  # Count, timestamps, preview and size
+        self.history_index: HistoryIndex | None = None  # Kept current on write
+        self.window = ContextWindow()  # Messages that fit the token budget
+        self.writer: "WriteBehind | None" = None  # Saves off the caller's thread
+
+    @property
+    def log(self) -> SessionLog:
+        """
+        The append-only message log stored in the context folder.
+        """
+        if self._log is None or self._log.path != self.path:
+            self._log = SessionLog(self.path)
+        return self._log
 
     def add_message(self, ts: datetime, message: Message) -> None:
         """
         Add a new message to the context.
         """
-        if message.file is None:
-            message.save(self.path, ts)
+        if message.seq is None:
+            self.save(message, ts)
+            self.update_summary(message)
         self.messages.append((ts, message))
+        self.window.append(message)
 
-    def get_messages(self):
+    def set_enabled(self, message: Message, enabled: bool) -> None:
         """
-        get_messages
+        Enable or disable a message, persist the change and reselect the messages
+        that fit the budget.
 
-        Use this method to convert the Context object to a JSON string.
+        :param message: A message of this context.
+        :param enabled: Whether the message should be sent to the model.
+        """
+        message.enabled = enabled
+        if message.seq is not None:
+            self.update_message(message)
+        self.window.rebuild([m for ts, m in self.messages])
 
-        Only enabled messages are included in the output.
+    def compact(self, messages: list[Message], summary: Message, ts: datetime) -> None:
+        """
+        Disable a range of messages and insert the summary that replaces them in
+        the prompt. The originals stay in the log.
 
-        :param self: Description
+        :param messages: The summarized messages.
+        :param summary: The synthetic summary message.
+        :param ts: When the summary belongs in the context order.
         """
-        return json.dumps([m.serialize() for ts, m in self.messages if m.enabled])
+        positions = {id(m): idx for idx, (_, m) in enumerate(self.messages)}
+        for message in messages:
+            message.enabled = False
+            self.update_message(message)
+        insert_at = max(positions.get(id(m), -1) for m in messages) + 1
+        self.save(summary, ts)
+        self.update_summary(summary)
+        self.messages.insert(insert_at, (ts, summary))
+        self.window.rebuild([m for _, m in self.messages])
 
-    def load_messages(self, messages_json: str) -> None:
+    def window_messages(self) -> list[Message]:
         """
-        load_messages
+        :return: The enabled messages that fit the token budget, in order.
+        """
+        return self.window.messages()
 
-        Use this method to load messages from a JSON files into the Context object.
+    @property
+    def message_count(self) -> int:
+        """
+        Number of messages, taken from the summary while the context is not loaded.
+        """
+        if not self.loaded and self.summary is not None:
+            return self.summary["messages"]
+        return len(self.messages)
 
-        :param self: Description
-        :param messages_json: JSON string representing a list of messages.
+    def ensure_loaded(self, cancel: CancelToken | None = None) -> None:
+        """
+        Load the message bodies of a history context on first use. Safe to call
+        from a worker thread; a second caller waits for the first load.
+
+        :param cancel: Stops the load, e.g. when the session is collapsed.
+        :raises concurrent.futures.CancelledError: If cancelled before the end;
+            the context stays unloaded.
+        """
+        with self._load_lock:
+            if not self.loaded:
+                self.load_messages(self.session_id, cancel)
+                self.loaded = True
+
+    def update_summary(self, message: Message) -> None:
+        """
+        Fold a newly saved message into the session summary and, if this context
+        is tracked by a history index, record the new summary there.
+        """
+        summary = self.summary or new_summary(self.session_id)
+        summary["messages"] += 1
+        epoch = message.epoch
+        if summary["first_epoch"] is None:
+            summary["first_epoch"] = epoch
+        summary["last_epoch"] = epoch
+        if not summary["preview"] and message.role == "user":
+            summary["preview"] = message.content[:PREVIEW_CHARS]
+        self.summary = summary
+        if self.writer is not None:
+            snapshot = dict(summary)
+            self.writer.submit(
+                ("summary", self.path), lambda: self.store_summary(snapshot)
+            )
+        else:
+            self.store_summary(summary)
+
+    def store_summary(self, summary: dict) -> None:
+        """
+        Measure the log and record the summary in the history index.
+
+        :param summary: The summary, or a snapshot of it taken when it changed.
+        """
+        summary["bytes"] = self.log.size_bytes()
+        if self.summary is not None:
+            self.summary["bytes"] = summary["bytes"]
+        if self.history_index is not None:
+            self.history_index.update(summary)
+
+    def summarize(self) -> dict:
+        """
+        Build the session summary from the loaded messages.
+        """
+        self.summary = None
+        for ts, message in self.messages:
+            self.update_summary(message)
+        return self.summary or new_summary(self.session_id)
+
+    def save(self, message: Message, ts: datetime | None = None) -> None:
+        """
+        Save a message to the log, through the write-behind worker if there is
+        one.
+
+        :param message: The message to save.
+        :param ts: When the message was added; sets the message epoch.
+        """
+        if self.writer is not None:
+            self.writer.save_message(self.log, message, ts)
+        else:
+            message.save(self.log, ts)
+
+    def update_message(self, message: Message, resized: bool = False) -> None:
         """
-        save_epoch = ""
-        g = glob(self.path + "/*.json")
-        g.sort()
-        for f in g:
-            with open(f, "r", encoding="utf-8") as file:
-                message = Message.from_dict(json.loads(file.read()), file_path=f)
-                self.messages.append((message.ts, message))
+        Persist a change to a message that is already in the context.
 
-    def to_gui(self, root):
+        :param message: The changed message.
+        :param resized: The content changed, so reselect the messages that fit
+            the budget.
         """
-        to_gui
+        self.save(message)
+        if resized:
+            self.window.rebuild([m for ts, m in self.messages])
 
-        Use this method to render the Context object in a tkinter GUI.
+    def close(self) -> None:
+        """
+        Flush and close the context's log.
+        """
+        if self.writer is not None:
+            self.writer.flush()
+        if self._log is not None:
+            self._log.close()
 
-        Example:
-        ▼  Context (2 messages)     # expanded view of context
-            ▼ [ ] ⚙️  You are a helpful assistant...    # Enambled system prompt, expanded
-                      📁  canned prompt1.txt
-                      📁  canned prompt2.txt
-            ▼ [ ] 👤  This is the message content...    # Enabled user prompt, expanded
-                      📁 filename.txt
-                      📁 filename.txt
-                      📁 filename.txt
-            ▶ [x] 🤖  That is a great question...       # Disabled agent response, collapsed
+    def close_readers(self) -> None:
+        """
+        Close the files opened to read message content, e.g. when a history
+        context is collapsed; they are opened again when content is read.
+        """
+        if self._log is not None:
+            self._log.close_readers()
+
+    def get_messages(self):
+        """
+        get_messages
 
-        Example:
-        ▶  Context (2 messages)     # collapsed view of context
+        Use this method to convert the Context object to a JSON string.
 
-        Explanation of GUI elements:
+        Only enabled messages are included in the output.
 
-        - A toggle button (▼ or ▶) to expand/collapse the context content (row 0, column 0)
-        - A label showing "Context (N messages)" where N is the number of messages in the context (row 0, column 1)
-        - A frame containing the context content (row 1, column 1) that can be expanded or collapsed.
+        :param self: Description
+        """
+        return json.dumps([m.serialize() for ts, m in self.messages if m.enabled])
 
+    def load_messages(
+        self, messages_json: str, cancel: CancelToken | None = None
+    ) -> None:
+        """
+        load_messages
 
+        Use this method to load messages from the context's session log into the
+        Context object. Contexts still stored as one JSON file per message are
+        migrated into the log first. Records are read and decoded in parallel
+        (see SessionLog.iter_many); nothing is added if the load is cancelled.
 
         :param self: Description
-        :param root: The tkinter root or parent widget where the context will be rendered.
-        """
-        context_frame = tk.Frame(root)
-
-        expanded_var = tk.BooleanVar(value=True)
-        expand_collapse = {
-            True: "▼",
-            False: "▶",
-        }
-
-        def toggle_expand():
-            expanded = expanded_var.get()
-            expanded_var.set(not expanded)
-            self.expanded = expanded_var.get()
-            collapse_expand_button.config(text=expand_collapse[expanded_var.get()])
-            if expanded:
-                context_messages_frame.grid_remove()
-            else:
-                context_messages_frame.grid(row=1, column=1, columnspan=2, sticky="w")
-
-        collapse_expand_button = tk.Button(
-            context_frame,
-            command=toggle_expand,
-            text=expand_collapse[expanded_var.get()],
-            width=1,
-            height=1,
-            font=("Terminal", 10),
-        )
-        collapse_expand_button.grid(row=0, column=0, sticky="w")
-
-        context_label = tk.Label(
-            context_frame,
-            text=f"{self.session_id or 'Context'} ({len(self.messages)} messages)",
-            font=("Terminal", 10, "bold"),
-        )
-        context_label.grid(row=0, column=1, sticky="w")
-
-        # Normally this is True, but for history contexts we start collapsed
-        context_messages_frame = tk.Frame(context_frame)
-        context_messages_frame.grid(row=1, column=1, columnspan=2, sticky="w")
-
-        for idx, (ts, message) in enumerate(self.messages):
-            m_frame = message.to_gui(context_messages_frame)
-            m_frame.grid(row=idx, column=0, sticky="w")
-
-        if not self.expanded:
-            toggle_expand()
-
-        return context_frame
+        :param messages_json: JSON string representing a list of messages.
+        :param cancel: Stops the load between batches of records.
+        """
+        log = self.log
+        try:
+            if legacy_message_files(self.path):
+                # One-time move from one JSON file per message into the session log
+                migrate_legacy_context(self.path, log)
+            # Context order is by time; compaction summaries are written later but
+            # carry the timestamp of the messages they replace
+            entries = sorted(log.entries(), key=lambda e: (e.epoch, e.seq))
+            messages = [
+                Message.from_log(log, entry, record)  # Content stays on disk
+                for entry, record in zip(entries, log.iter_many(entries, cancel))
+            ]
+        finally:
+            log.close()  # Reads reopen on demand; don't hold fds for every session
+        for message in messages:
+            self.messages.append((message.ts, message))
+            self.window.append(message)
+
+    def gui_label(self) -> str:
+        """
+        Header text for the context: name, message count and first-prompt preview.
+        """
+        label = f"{self.session_id or 'Context'} ({self.message_count} messages)"
+        if self.summary and self.summary["preview"]:
+            label += f"  {self.summary['preview']}"
+        return label
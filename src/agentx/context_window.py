@@ -0,0 +1,108 @@
+"""
+Docstring for agentx.context_window
+"""
+
+from collections import deque
+
+from .message import Message
+
+
+class ContextWindow:
+    """
+    Chooses which messages of a context are sent to the model.
+
+    Pinned and system messages are always sent. The remaining messages are grouped
+    into turns (a user message and the replies that follow it), and the newest
+    turns are kept while everything fits the token budget. The newest turn is
+    always kept, even when it alone exceeds the budget. Once over budget, turns
+    are evicted down to ``low_water`` of the budget rather than just under it, so
+    the following turns only append and the prompt prefix stays stable.
+
+    Token counts come from ``Message.tokens``, which is computed once per message,
+    and the window is maintained incrementally: appending a message only evicts
+    turns from the old end, so a turn costs O(changed) rather than a pass over
+    the whole history. Only ``rebuild`` walks every message, for the rare edits
+    that change old messages (toggling ``enabled``, compaction).
+    """
+
+    def __init__(self, budget: int = 8192, low_water: float = 0.75):
+        """
+        ContextWindow
+
+        :param budget: The most tokens the selected messages may use.
+        :param low_water: Fraction of the budget to evict down to.
+        """
+        self.budget = budget
+        self.low_water = low_water
+        self._position = 0  # Append order, used to merge pinned and turns
+        self._pinned: list[tuple[int, Message]] = []
+        self._pinned_tokens = 0
+        self._turns: deque[list[tuple[int, Message]]] = deque()
+        self._turn_tokens: deque[int] = deque()
+        self._window_tokens = 0
+        self.evicted: list[Message] = []  # Messages that fell out, oldest first
+
+    @staticmethod
+    def cost(message: Message) -> int:
+        """
+        Tokens a message takes in the prompt; disabled messages take none.
+        """
+        return message.tokens if message.enabled else 0
+
+    @property
+    def tokens(self) -> int:
+        """
+        Tokens used by the currently selected messages.
+        """
+        return self._pinned_tokens + self._window_tokens
+
+    def append(self, message: Message) -> None:
+        """
+        Add the newest message and evict the oldest turns that no longer fit.
+
+        :param message: The message just added to the context.
+        """
+        entry = (self._position, message)
+        self._position += 1
+        cost = self.cost(message)
+        if message.pinned or message.role == "system":
+            self._pinned.append(entry)
+            self._pinned_tokens += cost
+        elif message.role == "user" or not self._turns:
+            self._turns.append([entry])
+            self._turn_tokens.append(cost)
+            self._window_tokens += cost
+        else:
+            self._turns[-1].append(entry)
+            self._turn_tokens[-1] += cost
+            self._window_tokens += cost
+        self._evict()
+
+    def _evict(self) -> None:
+        if self.tokens <= self.budget:
+            return
+        target = self.budget * self.low_water
+        while len(self._turns) > 1 and self.tokens > target:
+            turn = self._turns.popleft()
+            self._window_tokens -= self._turn_tokens.popleft()
+            self.evicted.extend(m for _, m in turn)
+
+    def rebuild(self, messages: list[Message]) -> None:
+        """
+        Recompute the window from scratch using the cached token counts.
+
+        :param messages: All messages of the context, oldest first.
+        """
+        self.__init__(self.budget, self.low_water)
+        for message in messages:
+            self.append(message)
+
+    def messages(self) -> list[Message]:
+        """
+        :return: The enabled messages to send, in context order.
+        """
+        entries = list(self._pinned)
+        for turn in self._turns:
+            entries.extend(turn)
+        entries.sort(key=lambda entry: entry[0])
+        return [m for _, m in entries if m.enabled]
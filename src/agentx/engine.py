@@ -0,0 +1,597 @@
+"""
+Docstring for agentx.engine
+"""
+
+import itertools
+import os
+from contextlib import closing
+from datetime import datetime
+from typing import Any, Callable, Iterator
+
+from . import ndjson
+from .cancellation import CancelToken
+from .connection import OllamaConnection
+from .context import Context
+from .host_pool import HostPool, HostState
+from .journal import JOURNAL_FOLDER, TurnJournal
+from .message import Message
+from .persistence import WriteBehind
+from .request_builder import RequestBuilder
+from .response_cache import ResponseCache, response_cache_from_config
+from .storage import HistoryIndex
+from .telemetry import TurnMetrics, append_metrics
+
+# Response statuses that ``begin_continue`` can resume
+CONTINUABLE = ("interrupted", "partial")
+
+
+class Turn:
+    """
+    One prompt and the response being streamed for it.
+    """
+
+    def __init__(
+        self,
+        prompt: str,
+        model: str,
+        host: str,
+        user_message: Message | None = None,
+        pinned_host: str | None = None,
+    ):
+        """
+        Turn
+
+        :param prompt: The user's prompt.
+        :param model: The model the turn is sent to.
+        :param host: The Ollama host that serves the turn.
+        :param user_message: The prompt's message, if shared with other turns.
+        :param pinned_host: Only send the turn to this host.
+        """
+        self.user_message = user_message or Message(role="user", content=prompt)
+        self.model = model
+        self.pinned_host = pinned_host
+        self.thinking_message = Message(role="assistant", content="")
+        self.thinking_message.enabled = False
+        self.response_message = Message(role="assistant", content="")
+        self.metrics = TurnMetrics(model, host)
+        self.messages: list[dict] = []  # The request, snapshotted by begin_turn
+        self.cache_key: str | None = None
+        self.cached_events: list[tuple[str, str]] | None = None  # Set on a cache hit
+        self.last_channel = ""
+        self.error: Exception | None = None
+        self.cancel = CancelToken()  # Aborts this turn's request
+        self.host = host  # Where the request went; may change on failover
+        # A fan-out answer is only added to the context once the user keeps it
+        self.candidate = False
+        self.journal: TurnJournal | None = None  # Crash copy of the streamed text
+        # For a continuation, the metrics the response had before it was resumed
+        self.prior_metrics: dict[str, Any] | None = None
+
+    @property
+    def continuation(self) -> bool:
+        """
+        True if the turn resumes a response that was cut short.
+        """
+        return self.prior_metrics is not None
+
+    @property
+    def cache_hit(self) -> bool:
+        """
+        True if the turn is replayed from the response cache.
+        """
+        return self.cached_events is not None
+
+
+class ConversationEngine:
+    """
+    A conversation without a user interface: context assembly, the streamed chat
+    call, the response cache and persistence through ``Context`` and ``Message``.
+
+    The Tk view and the headless runner both drive a turn the same way:
+
+    1. ``begin_turn`` records the prompt and snapshots the request.
+    2. ``run_turn`` streams the response on any thread, handing every
+       ``(channel, value)`` event to a callback, starting with ``("host", host)``
+       and ending with ``("done", None)`` or ``("error", exception)``.
+    3. ``record_chunk`` accumulates each event into the turn's messages, on the
+       thread that owns the context.
+    4. ``finish_turn`` stores the response and its metrics.
+
+    ``ask`` runs all four steps in the calling thread. ``begin_fanout`` replaces
+    step 1 to send one prompt to several models; the answers stay out of the
+    context until ``keep_turn``.
+    """
+
+    def __init__(
+        self,
+        config: dict[str, Any],
+        user_history_folder: str,
+        session_id: str,
+        connection: OllamaConnection | None = None,
+        response_cache: ResponseCache | None = None,
+        pool: HostPool | None = None,
+    ):
+        """
+        ConversationEngine
+
+        :param config: The loaded agentx.toml configuration.
+        :param user_history_folder: The user's sessions folder.
+        :param session_id: Name of this conversation's session folder.
+        :param connection: A connection to share; one is created if omitted.
+            Ignored if ``pool`` is given.
+        :param response_cache: A response cache to share; one is created from
+            the configuration if omitted and ``response_cache_enabled`` is set.
+        :param pool: The Ollama hosts to route turns to; one is created from the
+            configuration if omitted.
+        """
+        agentx_config = config["agentx"]
+        self.config = config
+        self.session_folder = os.path.join(user_history_folder, session_id)
+        self.context_folder = os.path.join(self.session_folder, "context")
+        os.makedirs(self.context_folder, exist_ok=True)
+        self.metrics_path = os.path.join(self.session_folder, "metrics.jsonl")
+        self.context = Context()
+        self.context.path = self.context_folder
+        self.context.session_id = session_id
+        self.context.window.budget = agentx_config.get("context_token_budget", 8192)
+        self.context.window.low_water = agentx_config.get(
+            "context_evict_to_fraction", 0.75
+        )
+        # Keep the user's history index current as messages are written
+        self.context.history_index = HistoryIndex(user_history_folder)
+        # Messages and the session summary are written on a background thread
+        self.writer: WriteBehind | None = None
+        if agentx_config.get("persistence_write_behind", True):
+            self.writer = WriteBehind(agentx_config.get("persistence_queue_size", 256))
+            self.context.writer = self.writer
+        self._metrics_lines = itertools.count()  # Keys metrics jobs; never coalesced
+        # Streamed text is journaled so a crash mid-response does not lose it
+        self.journal_folder = os.path.join(user_history_folder, JOURNAL_FOLDER)
+        self.journal_enabled = agentx_config.get("journal_enabled", True)
+        self.journal_flush_seconds = agentx_config.get("journal_flush_seconds", 1.0)
+        self.journal_flush_bytes = agentx_config.get("journal_flush_bytes", 4096)
+        # Every turn goes to the least-loaded healthy host of the pool
+        self.pool = pool or HostPool(config, connection)
+        self.connection = self.pool.primary
+        # Keeps the prompt prefix byte-stable so Ollama can reuse its KV cache
+        self.request_builder = RequestBuilder(agentx_config.get("ollama_keep_alive"))
+        # Opt-in replay of identical requests, shared by all of the user's sessions
+        self.response_cache = response_cache or response_cache_from_config(
+            config, user_history_folder
+        )
+        # Decode the chat stream directly instead of through ollama's models
+        self.fast_stream = agentx_config.get("ollama_fast_stream", True)
+        # Called after a message is added to the context, e.g. to update a view
+        self.on_message: Callable[[Message], None] | None = None
+
+    def chat_options(self) -> dict | None:
+        """
+        Model options for chat requests, from the [agentx] table.
+        """
+        num_ctx = self.config["agentx"].get("ollama_num_ctx")
+        return {"num_ctx": num_ctx} if num_ctx else None
+
+    def add_message(self, message: Message):
+        """
+        Adds a message to the context, persisting it.
+
+        :param message: The message to add.
+        """
+        self.context.add_message(ts=datetime.now(), message=message)
+        if self.on_message:
+            self.on_message(message)
+
+    def begin_turn(self, prompt: str, bypass_cache: bool = False) -> Turn:
+        """
+        Records the prompt and snapshots the request for a new turn.
+
+        :param prompt: The user's prompt.
+        :param bypass_cache: Always ask the model; the fresh response replaces
+            any cached one.
+        :return: The new turn.
+        """
+        turn = Turn(prompt, self.connection.model, self.connection.host)
+        self.add_message(turn.user_message)
+        # Newest turns plus pinned/system messages that fit the token budget
+        turn.messages = self.request_builder.build(self.context.window_messages())
+        self._lookup_cache(turn, bypass_cache)
+        return turn
+
+    def begin_fanout(
+        self, prompt: str, targets: list[str], bypass_cache: bool = False
+    ) -> list[Turn]:
+        """
+        Records the prompt once and snapshots one request per target, so several
+        models or hosts answer the same context side by side. The answers are
+        candidates: none is added to the context until ``keep_turn``.
+
+        :param prompt: The user's prompt.
+        :param targets: ``"model"`` or ``"model@host:port"`` for each answer.
+        :param bypass_cache: Always ask the models.
+        :return: One turn per target, in order.
+        """
+        user_message = Message(role="user", content=prompt)
+        self.add_message(user_message)
+        messages = self.request_builder.build(self.context.window_messages())
+        turns = []
+        for target in targets:
+            model, _, host = target.partition("@")
+            if host:
+                self.pool.add_host(host)
+            turn = Turn(
+                prompt,
+                model or self.connection.model,
+                host or self.connection.host,
+                user_message=user_message,
+                pinned_host=host or None,
+            )
+            turn.candidate = True
+            turn.messages = messages
+            self._lookup_cache(turn, bypass_cache)
+            turns.append(turn)
+        return turns
+
+    def continuable(self) -> Message | None:
+        """
+        The latest response of the context if it was cut short, i.e. cancelled,
+        failed mid-stream or recovered after a crash.
+
+        :return: The response, or None if the context does not end with one.
+        """
+        for ts, message in reversed(self.context.messages):
+            if message.role == "assistant" and message.status in CONTINUABLE:
+                return message
+            if message.role != "assistant" or message.enabled:
+                return None  # Anything but a disabled thinking trace ends the search
+        return None
+
+    def begin_continue(self) -> Turn | None:
+        """
+        Snapshots a request that resumes the context's cut-short response. The
+        partial text is the last message of the request, so the model treats it
+        as a prefill and only generates the remainder, which ``record_chunk``
+        appends to the same message; ``finish_turn`` saves it again under its
+        sequence number, keeping its place in the context.
+
+        :return: The continuation turn, or None if there is nothing to resume.
+        """
+        response = self.continuable()
+        if response is None:
+            return None
+        prior_metrics = response.metrics or {}
+        turn = Turn(
+            "",
+            prior_metrics.get("model") or self.connection.model,
+            self.connection.host,
+        )
+        turn.prior_metrics = prior_metrics
+        turn.response_message = response
+        before = [m for ts, m in self.context.messages]
+        position = next(i for i, m in enumerate(before) if m is response)
+        for message in reversed(before[:position]):
+            if message.role == "user":
+                turn.user_message = message
+                break
+            if message.role == "assistant" and not message.enabled:
+                turn.thinking_message = message  # Its thinking trace
+        if response.content:
+            turn.last_channel = "content"
+        # The partial response is enabled again so it is sent as the prefill
+        response.enabled = bool(response.content)
+        turn.messages = self.request_builder.build(self.context.window_messages())
+        return turn
+
+    def _lookup_cache(self, turn: Turn, bypass_cache: bool):
+        if self.response_cache:
+            turn.cache_key = ResponseCache.key(
+                turn.model, self.chat_options(), turn.messages
+            )
+            if not bypass_cache:
+                turn.cached_events = self.response_cache.get(turn.cache_key)
+
+    def run_turn(self, turn: Turn, emit: Callable[[tuple[str, Any]], None]):
+        """
+        Streams the turn's response. Safe to call from a worker thread: it does
+        not touch the context, only ``emit``. Ends with ``("cancelled", None)``
+        instead of "done" once ``turn.cancel`` was cancelled.
+
+        :param turn: A turn from ``begin_turn``.
+        :param emit: Receives each ``(channel, value)`` event.
+        """
+        if turn.cache_hit:
+            for event in turn.cached_events:
+                emit(event)
+            emit(("done", None))
+            return
+        turn.metrics.start()
+        if self.journal_enabled and not turn.candidate:
+            turn.journal = TurnJournal(
+                self.journal_folder,
+                {
+                    "context_path": self.context_folder,
+                    "session_id": self.context.session_id,
+                    "epoch": turn.metrics.epoch,
+                    "model": turn.model,
+                    "host": turn.host,
+                    "continues_seq": (
+                        turn.response_message.seq if turn.continuation else None
+                    ),
+                },
+                self.journal_flush_seconds,
+                self.journal_flush_bytes,
+            )
+        tried: list[HostState] = []
+        while True:
+            state = self.pool.choose(tried, turn.model, turn.pinned_host)
+            tried.append(state)
+            turn.host = turn.metrics.host = state.host
+            emit(("host", state.host))
+            try:
+                with self.pool.use(state, turn.cancel) as connection:
+                    self._stream_turn(turn, connection, emit)
+                break
+            except Exception as e:
+                if turn.cancel.cancelled:
+                    break  # Reading from the aborted socket fails as cancelled
+                # Nothing was shown yet, so another host can answer instead
+                untouched = turn.metrics.first_token_at is None
+                if untouched and self.pool.choose(tried, turn.model, turn.pinned_host):
+                    self.pool.mark_failed(state, e)
+                    print(f"Request to {state.host} failed, trying next host: {e}")
+                    continue
+                import traceback
+
+                print(f"Request error: {e}")
+                traceback.print_exc()
+                turn.error = e
+                if turn.journal:
+                    # Kept for finish_turn if part of the response arrived
+                    if turn.metrics.first_token_at is None:
+                        turn.journal.discard()
+                    else:
+                        turn.journal.close()
+                emit(("error", e))
+                return
+        if turn.journal:
+            turn.journal.close()  # Deleted once finish_turn stored the response
+        if turn.cancel.cancelled:
+            turn.cancel.acknowledge()
+            emit(("cancelled", None))
+        else:
+            emit(("done", None))
+
+    def _stream_turn(
+        self,
+        turn: Turn,
+        connection: OllamaConnection,
+        emit: Callable[[tuple[str, Any]], None],
+    ):
+        """
+        Streams the turn from one host and caches the complete response.
+
+        :param turn: The turn to stream.
+        :param connection: The chosen host's connection.
+        :param emit: Receives each ``(channel, value)`` event.
+        """
+        metrics = turn.metrics
+        events: list[tuple[str, str]] | None = [] if turn.cache_key else None
+        stream = self._fast_chunks if self.fast_stream else self._client_chunks
+        # Closing the generator closes the response, also after a break
+        with closing(stream(turn, connection)) as chunks:
+            for routed, done in chunks:
+                if turn.cancel.cancelled:
+                    break  # Exit the loop if streaming is interrupted
+                if routed:
+                    channel, value = routed
+                    metrics.on_chunk(channel)
+                    emit((channel, value))
+                    if turn.journal:
+                        turn.journal.append(channel, value)
+                    if events is not None:
+                        if ResponseCache.cacheable(channel, value):
+                            events.append((channel, value))
+                        else:
+                            events = None  # Tool calls and images: no replay
+                if done is not None:
+                    metrics.on_done(done)
+        if events and not turn.cancel.cancelled:
+            try:
+                self.response_cache.put(turn.cache_key, events, turn.model)
+            except OSError as e:
+                print(f"Response cache write failed: {e}")
+
+    def _client_chunks(
+        self, turn: Turn, connection: OllamaConnection
+    ) -> Iterator[tuple[tuple | None, Any]]:
+        """
+        Streams through ``ollama.Client.chat``, one pydantic ChatResponse per
+        chunk. Cancelling shuts down the response's socket, see
+        ``OllamaConnection.cancellable``.
+
+        :return: ``((channel, value) or None, final chunk or None)`` pairs.
+        """
+        with connection.cancellable(turn.cancel):
+            for part in connection.client.chat(
+                model=turn.model,
+                messages=turn.messages,
+                stream=True,
+                options=self.chat_options(),
+                keep_alive=self.request_builder.keep_alive,
+            ):
+                channels = [
+                    k
+                    for k, v in part.message.__dict__.items()
+                    if v and k not in ["role", ""]
+                ]
+                routed = (
+                    (channels[0], getattr(part.message, channels[0]))
+                    if channels
+                    else None
+                )
+                yield routed, part if part.done else None
+
+    def _fast_chunks(
+        self, turn: Turn, connection: OllamaConnection
+    ) -> Iterator[tuple[tuple | None, Any]]:
+        """
+        Streams over the pooled httpx client and routes plain decoded chunks,
+        without building a pydantic model per token. See ``agentx.ndjson``.
+
+        :return: ``((channel, value) or None, final chunk or None)`` pairs.
+        """
+        for chunk in ndjson.stream_chat(
+            connection.http,
+            {
+                "model": turn.model,
+                "messages": turn.messages,
+                "options": self.chat_options(),
+                "keep_alive": self.request_builder.keep_alive,
+            },
+            turn.cancel,
+        ):
+            message = chunk.get("message")
+            routed = ndjson.route(message) if message else None
+            yield routed, chunk if chunk.get("done") else None
+
+    def record_chunk(self, turn: Turn, channel: str, value: Any):
+        """
+        Accumulates one streamed chunk into the turn's messages.
+
+        :param turn: The turn being streamed.
+        :param channel: The message field the chunk arrived on (e.g. "thinking").
+        :param value: The chunk value for that field.
+        """
+        if channel == "content" and turn.last_channel != "content":
+            if not turn.candidate and turn.thinking_message.seq is None:
+                self.add_message(turn.thinking_message)
+                if turn.journal:
+                    turn.journal.saved_thinking(turn.thinking_message.epoch)
+        match channel:
+            case "thinking":
+                turn.thinking_message.append(value)
+            case "content":
+                turn.response_message.append(value)
+            case "tool_name":
+                print(f"Tool name received: {value}")  # Debugging for tool_name
+            case "tool_calls":
+                print(f"Tool calls received: {value}")  # Debugging for tool_calls
+            case "images":
+                print(f"Images received: {value}")  # Debugging for images
+            case _:
+                print(f"Unknown channel received: {channel}")
+        turn.last_channel = channel
+
+    def finish_turn(self, turn: Turn) -> dict[str, Any]:
+        """
+        Stores the response and appends the turn's metrics to the session's
+        metrics export, both through the write-behind queue when there is one. A
+        cancelled turn keeps its partial response, marked "interrupted", a turn
+        that failed mid-stream keeps it marked "partial"; if empty, it is left
+        out of later prompts. A continuation is saved again under its sequence
+        number. A fan-out candidate is only stored by ``keep_turn``.
+
+        :param turn: The turn whose stream reported "done" or "cancelled", or
+            "error" after part of the response arrived.
+        :return: The turn's metrics.
+        """
+        metrics = turn.metrics.to_dict()
+        metrics["prefix_messages_reused"] = self.request_builder.reused
+        metrics["prefix_invalidated"] = self.request_builder.invalidated
+        metrics["cached"] = turn.cache_hit
+        if turn.candidate:
+            metrics["candidate"] = True
+        if turn.continuation:
+            metrics["continued"] = True
+            prior = turn.prior_metrics
+            metrics["prior_tokens"] = prior.get("tokens", 0) + prior.get(
+                "prior_tokens", 0
+            )
+        response = turn.response_message
+        response.status = None
+        if turn.cancel.cancelled:
+            metrics["interrupted"] = True
+            metrics.update(turn.cancel.latency())
+            response.status = "interrupted"
+        elif turn.error is not None:
+            metrics["error"] = str(turn.error)
+            response.status = "partial"
+        response.enabled = response.status is None or bool(response.content)
+        response.metrics = metrics
+        if self.writer is not None:
+            line = dict(metrics)  # Snapshot; the response's copy may change
+            self.writer.submit(
+                ("metrics", next(self._metrics_lines)),
+                lambda: append_metrics(self.metrics_path, line),
+            )
+        else:
+            append_metrics(self.metrics_path, metrics)
+        if not turn.candidate:
+            thinking = turn.thinking_message
+            if thinking.seq is not None:
+                if turn.continuation:
+                    self.context.update_message(thinking)
+            elif turn.last_channel != "content" and thinking.content:
+                self.add_message(thinking)  # Never reached content
+            if response.seq is None:
+                self.add_message(response)
+            else:
+                self.context.update_message(response, resized=True)
+        if turn.journal:
+            self.discard_journal(turn.journal)
+        return metrics
+
+    def discard_journal(self, journal: TurnJournal):
+        """
+        Deletes a turn's journal once its response is on disk: after the queued
+        save of the response when writing behind, right away otherwise.
+
+        :param journal: The finished turn's journal.
+        """
+        if self.writer is not None:
+            self.writer.submit(("journal", journal.path), journal.discard)
+        else:
+            journal.discard()
+
+    def keep_turn(self, turn: Turn):
+        """
+        Adds the fan-out answer the user chose to the context.
+
+        :param turn: A finished candidate from ``begin_fanout``.
+        """
+        if not turn.candidate:
+            return  # Already part of the context
+        turn.candidate = False
+        if turn.thinking_message.content:
+            self.add_message(turn.thinking_message)
+        self.add_message(turn.response_message)
+
+    def ask(self, prompt: str, bypass_cache: bool = False) -> Turn:
+        """
+        Runs a whole turn in the calling thread.
+
+        :param prompt: The user's prompt.
+        :param bypass_cache: Always ask the model.
+        :return: The finished turn; ``turn.error`` is set if the request failed.
+        """
+        turn = self.begin_turn(prompt, bypass_cache)
+
+        def emit(event: tuple[str, Any]):
+            channel, value = event
+            if channel == "error":
+                turn.error = value
+            elif channel not in ("done", "host"):
+                self.record_chunk(turn, channel, value)
+
+        self.run_turn(turn, emit)
+        if turn.error is None or turn.metrics.tokens:
+            self.finish_turn(turn)
+        return turn
+
+    def close(self):
+        """
+        Writes everything still queued and closes the context's message log. The
+        pool's connections may be shared and are closed by ``pool.close``.
+        """
+        if self.writer is not None:
+            self.writer.close()
+        self.context.close()
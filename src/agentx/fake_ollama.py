@@ -0,0 +1,256 @@
+"""
+Docstring for agentx.fake_ollama
+"""
+
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+FILLER_WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing")
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """
+    Serves the subset of the Ollama API that AgentX calls.
+    """
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real server
+    server: "FakeOllama"
+
+    def log_message(self, format: str, *args: Any):
+        pass  # Keep benchmark output clean
+
+    def _send_json(self, data: dict[str, Any], status: int = 200):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        server = self.server
+        match self.path:
+            case "/api/version":
+                self._send_json({"version": "0.0.0-fake"})
+            case "/api/tags":
+                self._send_json({"models": [server.model_info()]})
+            case "/api/ps":
+                self._send_json({"models": [server.model_info()]})
+            case "/":
+                body = b"Ollama is running"
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            case _:
+                self._send_json({"error": "not found"}, 404)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        if self.path != "/api/chat":
+            self._send_json({"error": "not found"}, 404)
+            return
+        request = self._read_json()
+        server = self.server
+        server.requests += 1
+        if not request.get("messages"):
+            # The handshake: an empty chat only loads the model
+            self._send_json(server.final_chunk(0, 0.0))
+            return
+        if request.get("stream", True) is False:
+            text = "".join(value for _, value in server.chunks())
+            response = server.final_chunk(server.tokens, 0.0)
+            response["message"]["content"] = text
+            self._send_json(response)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        started = time.perf_counter()
+        interval = 1.0 / server.token_rate if server.token_rate else 0.0
+        try:
+            for idx, (channel, value) in enumerate(server.chunks()):
+                if interval:
+                    delay = started + idx * interval - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                self._write_chunk(server.chunk(channel, value))
+            elapsed = time.perf_counter() - started
+            self._write_chunk(server.final_chunk(server.tokens, elapsed))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            server.cancelled += 1  # The client hung up mid-stream
+
+    def _write_chunk(self, data: dict[str, Any]):
+        line = json.dumps(data).encode("utf-8") + b"\n"
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+
+
+class FakeOllama(ThreadingHTTPServer):
+    """
+    A local stand-in for an Ollama server, for benchmarks and offline runs.
+
+    ``/api/chat`` streams NDJSON like the real server: ``tokens`` chunks of
+    ``chunk_chars`` characters each, the first ``thinking_ratio`` of them on the
+    thinking channel, paced at ``token_rate`` chunks per second (0 streams as
+    fast as possible), followed by a done chunk with eval counters.
+    ``/api/tags``, ``/api/ps`` and ``/api/version`` answer with a single model.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        model: str = "fake",
+        tokens: int = 200,
+        token_rate: float = 0.0,
+        thinking_ratio: float = 0.3,
+        chunk_chars: int = 6,
+    ):
+        """
+        FakeOllama
+
+        :param host: Interface to listen on.
+        :param port: Port to listen on; 0 picks a free one.
+        :param model: Model name reported in every response.
+        :param tokens: Chunks per streamed response.
+        :param token_rate: Chunks per second; 0 for no pacing.
+        :param thinking_ratio: Fraction of chunks on the thinking channel.
+        :param chunk_chars: Characters per chunk.
+        """
+        super().__init__((host, port), FakeOllamaHandler)
+        self.model = model
+        self.tokens = tokens
+        self.token_rate = token_rate
+        self.thinking_ratio = thinking_ratio
+        self.chunk_chars = chunk_chars
+        self.requests = 0
+        self.cancelled = 0  # Streams the client closed early
+        self._thread: threading.Thread | None = None
+
+    @property
+    def address(self) -> str:
+        """
+        ``host:port`` as used by ``ollama_host`` in agentx.toml.
+        """
+        host, port = self.server_address[:2]
+        return f"{host}:{port}"
+
+    def model_info(self) -> dict[str, Any]:
+        return {
+            "name": self.model,
+            "model": self.model,
+            "modified_at": self.timestamp(),
+            "size": 0,
+            "digest": "0" * 64,
+            "details": {"family": "fake", "parameter_size": "0B"},
+        }
+
+    @staticmethod
+    def timestamp() -> str:
+        return datetime.now(timezone.utc).isoformat()
+
+    def chunks(self) -> list[tuple[str, str]]:
+        """
+        The ``(channel, text)`` chunks of one response.
+        """
+        thinking = int(self.tokens * self.thinking_ratio)
+        chunks = []
+        for idx in range(self.tokens):
+            word = FILLER_WORDS[idx % len(FILLER_WORDS)] + " "
+            text = (word * (self.chunk_chars // len(word) + 1))[: self.chunk_chars]
+            chunks.append(("thinking" if idx < thinking else "content", text))
+        return chunks
+
+    def chunk(self, channel: str, value: str) -> dict[str, Any]:
+        message = {"role": "assistant", "content": ""}
+        message[channel] = value
+        return {
+            "model": self.model,
+            "created_at": self.timestamp(),
+            "message": message,
+            "done": False,
+        }
+
+    def final_chunk(self, tokens: int, elapsed: float) -> dict[str, Any]:
+        return {
+            "model": self.model,
+            "created_at": self.timestamp(),
+            "message": {"role": "assistant", "content": ""},
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int(elapsed * 1e9),
+            "load_duration": 0,
+            "prompt_eval_count": 1,
+            "prompt_eval_duration": 0,
+            "eval_count": tokens,
+            "eval_duration": int(elapsed * 1e9),
+        }
+
+    def start(self) -> "FakeOllama":
+        """
+        Serve on a daemon thread.
+
+        :return: The server itself, for chaining.
+        """
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="fake-ollama", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving and close the socket.
+        """
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in Ollama server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--model", default="fake")
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=0.0, help="tokens/second")
+    parser.add_argument("--thinking-ratio", type=float, default=0.3)
+    parser.add_argument("--chunk-chars", type=int, default=6)
+    args = parser.parse_args()
+    server = FakeOllama(
+        args.host,
+        args.port,
+        model=args.model,
+        tokens=args.tokens,
+        token_rate=args.rate,
+        thinking_ratio=args.thinking_ratio,
+        chunk_chars=args.chunk_chars,
+    )
+    print(f"Fake Ollama serving {args.model} on {server.address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Docstring for agentx.fanout
+"""
+
+import queue
+import threading
+import tkinter as tk
+from tkinter import ttk
+from typing import Any, Callable
+
+from .engine import ConversationEngine, Turn
+from .render import RenderBuffer
+
+END_CHANNELS = ("done", "error", "cancelled")
+
+
+class FanOut:
+    """
+    One prompt answered by several models or hosts at once, each streaming into
+    its own tab of the output notebook.
+
+    Every turn runs on its own worker thread; their events share one queue,
+    tagged with the turn's index, and are rendered by ``pump`` on the Tk main
+    thread. Each tab shows its turn's TTFT and tokens per second once it is
+    done, and a "Keep" button that adds that answer to the context.
+    """
+
+    def __init__(
+        self,
+        engine: ConversationEngine,
+        notebook: ttk.Notebook,
+        turns: list[Turn],
+        frame_interval_ms: int = 16,
+        poll_interval_ms: int = 20,
+    ):
+        """
+        FanOut
+
+        :param engine: The session's conversation engine.
+        :param notebook: The output notebook the tabs are added to.
+        :param turns: The candidates from ``engine.begin_fanout``.
+        :param frame_interval_ms: Render flush interval of every tab.
+        :param poll_interval_ms: How often the event queue is drained.
+        """
+        self.engine = engine
+        self.notebook = notebook
+        self.turns = turns
+        self.poll_interval_ms = poll_interval_ms
+        self.events: queue.Queue = queue.Queue()
+        self.finished: dict[int, dict[str, Any] | Exception] = {}
+        self.kept: Turn | None = None
+        # Called on the Tk thread once every turn has ended
+        self.on_finished: Callable[["FanOut"], None] | None = None
+        # Called on the Tk thread with the turn the user kept
+        self.on_keep: Callable[[Turn], None] | None = None
+        self.tabs: list[tk.Frame] = []
+        self.labels: list[tk.Label] = []
+        self.keep_buttons: list[tk.Button] = []
+        self.renders: list[RenderBuffer] = []
+        for index, turn in enumerate(turns):
+            self._add_tab(index, turn, frame_interval_ms)
+
+    def _title(self, turn: Turn) -> str:
+        title = turn.model
+        if turn.pinned_host:
+            title += f"@{turn.pinned_host}"
+        return title
+
+    def _add_tab(self, index: int, turn: Turn, frame_interval_ms: int):
+        tab = tk.Frame(self.notebook, bg="white")
+        bar = tk.Frame(tab, bg="white")
+        bar.pack(side=tk.TOP, fill=tk.X)
+        label = tk.Label(
+            bar, text="⏳ Waiting…", anchor="w", bg="white", font=("Terminal", 9)
+        )
+        label.pack(side=tk.LEFT, expand=True, fill=tk.X)
+        keep = tk.Button(
+            bar,
+            text="Keep this answer",
+            state=tk.DISABLED,
+            command=lambda: self.keep(index),
+        )
+        keep.pack(side=tk.RIGHT)
+        scrollbar = tk.Scrollbar(tab)
+        text = tk.Text(tab, wrap=tk.WORD, yscrollcommand=scrollbar.set)
+        scrollbar.config(command=text.yview)
+        text.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        text.tag_config("gray", foreground="gray", font=("Terminal", 10, "italic"))
+        text.tag_config("agent_response", font=("Terminal", 10, "normal"))
+        text.tag_config("agent_thinking", font=("Terminal", 10, "italic"))
+        self.notebook.add(tab, text=f"⇉ {self._title(turn)}")
+        self.tabs.append(tab)
+        self.labels.append(label)
+        self.keep_buttons.append(keep)
+        self.renders.append(RenderBuffer(text, frame_interval_ms))
+
+    def start(self, before_run: Callable[[Turn], None] | None = None):
+        """
+        Start one worker per turn and the pump.
+
+        :param before_run: Runs on each worker before it streams, e.g. to wait
+            for the model warm-up.
+        """
+        for index, turn in enumerate(self.turns):
+
+            def worker(index: int = index, turn: Turn = turn):
+                def emit(event: tuple[str, Any]):
+                    self.events.put((index, event))
+
+                if before_run:
+                    before_run(turn)
+                self.engine.run_turn(turn, emit)
+
+            threading.Thread(
+                target=worker, name=f"agentx-fanout-{index}", daemon=True
+            ).start()
+        self.pump()
+
+    @property
+    def done(self) -> bool:
+        """
+        True once every turn has ended.
+        """
+        return len(self.finished) == len(self.turns)
+
+    def pump(self):
+        """
+        Renders queued events on the Tk main thread until every turn has ended.
+        """
+        while True:
+            try:
+                index, (channel, value) = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if index in self.finished:
+                continue  # A worker that stopped after being force-cancelled
+            if channel in END_CHANNELS:
+                self._end(index, channel, value)
+            else:
+                self._chunk(index, channel, value)
+        if self.done:
+            if self.on_finished:
+                self.on_finished(self)
+            return
+        for index, turn in enumerate(self.turns):
+            metrics = turn.metrics
+            if index not in self.finished and metrics.tokens:
+                self.labels[index].config(
+                    text=f"⚡ {turn.host} · {metrics.tokens_per_second():.1f} tok/s"
+                    f" · TTFT {metrics.ttft_ms():.0f} ms"
+                )
+        self.notebook.after(self.poll_interval_ms, self.pump)
+
+    def _chunk(self, index: int, channel: str, value: Any):
+        turn = self.turns[index]
+        render = self.renders[index]
+        if channel == "host":
+            self.labels[index].config(text=f"🖧 Streaming from {value}")
+            return
+        if channel != turn.last_channel:
+            match channel:
+                case "thinking":
+                    render.write(f"({turn.model} is thinking...)\n\n", "gray")
+                case "content":
+                    render.write(f"\n\n{turn.model}:\n\n", "agent_response")
+        match channel:
+            case "thinking":
+                render.write(value, "agent_thinking")
+            case "content":
+                render.write(value, "agent_response")
+        self.engine.record_chunk(turn, channel, value)
+
+    def _end(self, index: int, channel: str, value: Any):
+        turn = self.turns[index]
+        render = self.renders[index]
+        if channel == "error":
+            self.finished[index] = value
+            render.write(f"\nError: {value}\n", "gray")
+            self.labels[index].config(text=f"⚠️ {turn.host}: {value}")
+        else:
+            if channel == "cancelled":
+                render.write("\n[interrupted]", "gray")
+            metrics = self.engine.finish_turn(turn)
+            self.finished[index] = metrics
+            self.labels[index].config(text=self.summary(turn, metrics))
+            if turn.response_message.content and self.kept is None:
+                self.keep_buttons[index].config(state=tk.NORMAL)
+        render.flush()
+
+    def summary(self, turn: Turn, metrics: dict[str, Any]) -> str:
+        """
+        One line with a finished turn's host, token count, rate and TTFT.
+        """
+        if metrics.get("cached"):
+            return f"♻️ {turn.model} · cached"
+        return (
+            f"{'⏹️' if metrics.get('interrupted') else '✅'} {metrics['host']} · "
+            f"{metrics['tokens']} tokens · {metrics['tokens_per_second']:.1f} tok/s"
+            f" · TTFT {metrics['ttft_ms'] or 0:.0f} ms"
+        )
+
+    def keep(self, index: int):
+        """
+        Adds one turn's answer to the context; the other answers are dropped.
+
+        :param index: The tab whose answer is kept.
+        """
+        if self.kept is not None or index not in self.finished:
+            return
+        turn = self.turns[index]
+        self.kept = turn
+        self.engine.keep_turn(turn)
+        for button in self.keep_buttons:
+            button.config(state=tk.DISABLED)
+        self.notebook.tab(self.tabs[index], text=f"★ {self._title(turn)}")
+        if self.on_keep:
+            self.on_keep(turn)
+
+    def cancel(self):
+        """
+        Cancels every turn that is still streaming.
+        """
+        for index, turn in enumerate(self.turns):
+            if index not in self.finished:
+                turn.cancel.cancel()
+
+    def force_cancel(self):
+        """
+        Ends cancelled turns whose workers have not stopped yet.
+        """
+        for index, turn in enumerate(self.turns):
+            if index not in self.finished and turn.cancel.cancelled:
+                self.events.put((index, ("cancelled", None)))
+
+    def destroy(self):
+        """
+        Removes the tabs from the output notebook.
+        """
+        self.cancel()
+        for tab in self.tabs:
+            self.notebook.forget(tab)
+            tab.destroy()
+        self.tabs = []
@@ -0,0 +1,201 @@
+"""
+Docstring for agentx.headless
+"""
+
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime
+from typing import Any, TextIO
+
+import httpx
+
+from .engine import ConversationEngine
+from .host_pool import HostPool
+from .journal import recover_journals
+from .message import Message
+from .response_cache import response_cache_from_config
+
+
+def read_conversations(prompts_path: str) -> list[dict[str, Any]]:
+    """
+    Read the conversations of a prompts file.
+
+    Each line is a JSON object holding either ``"prompt"`` (a one-turn
+    conversation) or ``"prompts"`` (a list of turns sent in order), and
+    optionally ``"id"`` and a ``"system"`` prompt.
+
+    :param prompts_path: Path of the JSONL prompts file, or "-" for stdin.
+    :return: The conversations, each with an ``id`` and a ``prompts`` list.
+    :raises ValueError: If a line is not a valid conversation.
+    """
+    f = sys.stdin if prompts_path == "-" else open(prompts_path, encoding="utf-8")
+    conversations = []
+    try:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            prompts = item.get("prompts") or [item.get("prompt")]
+            if not all(isinstance(p, str) and p for p in prompts):
+                raise ValueError(f"{prompts_path}:{line_no}: no prompt")
+            conversations.append(
+                {
+                    "id": str(item.get("id", len(conversations) + 1)),
+                    "system": item.get("system"),
+                    "prompts": prompts,
+                }
+            )
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    return conversations
+
+
+class HeadlessRunner:
+    """
+    Runs conversations from a prompts file against the configured hosts with
+    bounded parallelism, streaming one JSON result line per turn.
+
+    Every conversation gets its own ``ConversationEngine`` and session folder,
+    so the runs appear in the user's history like interactive sessions. The
+    engines share one host pool and one response cache.
+    """
+
+    def __init__(self, config: dict[str, Any], output: TextIO, concurrency: int = 4):
+        """
+        HeadlessRunner
+
+        :param config: The loaded agentx.toml configuration.
+        :param output: Where the JSONL results are written.
+        :param concurrency: Most conversations in flight at once.
+        """
+        self.config = config
+        self.output = output
+        self.concurrency = max(1, concurrency)
+        self.user = os.getenv("USER") or os.getenv("USERNAME") or "User"
+        self.user_history_folder = os.path.join(os.getcwd(), "sessions", self.user)
+        self.started = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        recovered = recover_journals(self.user_history_folder)
+        if recovered:
+            print(f"Recovered {len(recovered)} partial response(s)")
+        # Enough pooled connections per host for every concurrent stream
+        config["agentx"]["ollama_max_connections"] = max(
+            config["agentx"].get("ollama_max_connections", 8), self.concurrency
+        )
+        self.pool = HostPool(config)
+        self.response_cache = response_cache_from_config(
+            config, self.user_history_folder
+        )
+        self._output_lock = threading.Lock()
+        self.failures = 0
+
+    def write_result(self, result: dict[str, Any]):
+        """
+        Write one result line as soon as it is available.
+        """
+        line = json.dumps(result, ensure_ascii=False, default=str) + "\n"
+        with self._output_lock:
+            self.output.write(line)
+            self.output.flush()
+            if result.get("error"):
+                self.failures += 1
+
+    def run_conversation(self, conversation: dict[str, Any]):
+        """
+        Send a conversation's prompts in order, reporting every turn.
+
+        :param conversation: An entry from ``read_conversations``.
+        """
+        engine = ConversationEngine(
+            self.config,
+            self.user_history_folder,
+            f"session_{self.started}_headless-{conversation['id']}",
+            pool=self.pool,
+            response_cache=self.response_cache,
+        )
+        try:
+            if conversation["system"]:
+                engine.add_message(
+                    Message(role="system", content=conversation["system"], pinned=True)
+                )
+            for idx, prompt in enumerate(conversation["prompts"]):
+                turn = engine.ask(prompt)
+                self.write_result(
+                    {
+                        "id": conversation["id"],
+                        "turn": idx,
+                        "session_id": engine.context.session_id,
+                        "prompt": prompt,
+                        "thinking": turn.thinking_message.content,
+                        "response": turn.response_message.content,
+                        "metrics": turn.response_message.metrics,
+                        "error": str(turn.error) if turn.error else None,
+                    }
+                )
+                if turn.error is not None:
+                    break  # Later turns would lack this turn's answer
+        finally:
+            engine.close()
+
+    def run(self, conversations: list[dict[str, Any]]) -> int:
+        """
+        Run the conversations, at most ``concurrency`` at a time.
+
+        :param conversations: Entries from ``read_conversations``.
+        :return: The number of failed turns.
+        """
+        timeout_seconds = self.config["agentx"].get(
+            "ollama_initial_load_timeout_seconds", 120
+        )
+        try:
+            # Route the first turns with real probe results, then keep probing
+            self.pool.probe_all()
+            self.pool.handshake(timeout_seconds)
+            self.pool.start()
+            with ThreadPoolExecutor(
+                max_workers=self.concurrency, thread_name_prefix="agentx-headless"
+            ) as executor:
+                for future in [
+                    executor.submit(self.run_conversation, c) for c in conversations
+                ]:
+                    future.result()
+        finally:
+            self.pool.close()
+        return self.failures
+
+
+def run_headless(
+    config: dict[str, Any], prompts_path: str, concurrency: int, output_path: str
+) -> int:
+    """
+    Entry point of ``python -m agentx --headless``.
+
+    :param config: The loaded agentx.toml configuration.
+    :param prompts_path: The JSONL prompts file, or "-" for stdin.
+    :param concurrency: Most conversations in flight at once.
+    :param output_path: The JSONL results file, or "-" for stdout.
+    :return: The process exit code.
+    """
+    try:
+        conversations = read_conversations(prompts_path)
+    except (OSError, ValueError) as e:
+        print(f"Cannot read prompts: {e}", file=sys.stderr)
+        return 2
+    output = (
+        sys.stdout if output_path == "-" else open(output_path, "a", encoding="utf-8")
+    )
+    try:
+        # Keep diagnostics printed by the engine out of the JSONL results
+        with redirect_stdout(sys.stderr):
+            failures = HeadlessRunner(config, output, concurrency).run(conversations)
+    except httpx.HTTPError as e:
+        print(f"Failed to perform service handshake: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 1 if failures else 0
@@ -1,10 +1,9 @@
-import json
 import os
-import tkinter as tk
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 from .context import Context
-from .message import Message
+from .persistence import WriteBehind
+from .storage import READ_WORKERS, HistoryIndex
 
 
 class History:
@@ -12,124 +11,99 @@ class History:
     Docstring for History
     """
 
-    def __init__(self, user_history_path: str):
+    def __init__(
+        self,
+        user_history_path: str,
+        exclude_session_id: str = None,
+        writer: WriteBehind | None = None,
+    ):
         """
         Docstring for __init__
 
+        Sessions are listed from the user's history index alone; message bodies
+        are only read when a session is expanded (see Context.ensure_loaded).
+        Sessions written before the index existed are summarized once and added
+        to it, several at a time.
+
         :param self: Description
         :param user_session_path: Description
         :type user_session_path: str
+        :param exclude_session_id: Session to leave out, normally the current one.
+        :param writer: Persists changes to past sessions, such as toggles.
         """
         self.sessions = []
 
         # Load the list of contexts from the user session path
         # each folder under the user session path represent a context
-        # each file under the context folder represent a message
         # add each context to self.records alphabetically
 
         if not os.path.exists(user_history_path):
             return
 
-        # Get all folders under user_history_path
+        self.index = HistoryIndex(user_history_path)
+        summaries = self.index.load()
+
+        # Get all entries under user_history_path; only unindexed ones are stat'ed
         try:
-            context_folders = [
-                d
-                for d in os.listdir(user_history_path)
-                if os.path.isdir(os.path.join(user_history_path, d))
-            ]
+            context_folders = os.listdir(user_history_path)
         except OSError:
             return
 
-        # Sort alphabetically
-        context_folders.sort()
+        # Sort alphabetically, skipping the current session and cache folders
+        context_folders = sorted(
+            name
+            for name in context_folders
+            if name != exclude_session_id and not name.startswith(".")
+        )
+
+        unindexed = [
+            name
+            for name in context_folders
+            if name not in summaries
+            and os.path.isdir(os.path.join(user_history_path, name))
+        ]
+        if unindexed:
+            # Session reads wait on the disk, so overlap them; map keeps the order
+            with ThreadPoolExecutor(READ_WORKERS, "agentx-backfill") as pool:
+                backfilled = pool.map(
+                    lambda name: self.backfill(user_history_path, name), unindexed
+                )
+                summaries.update(zip(unindexed, backfilled))
 
-        # Load each context
         for context_folder_name in context_folders:
-            context_folder_path = os.path.join(
-                user_history_path, context_folder_name, "context"
-            )
-            context = Context()
-            context.session_id = context_folder_name
-            context.path = context_folder_path
-
-            # Load all message files from this context folder
-            try:
-                context.load_messages(context_folder_name)
-            except OSError:
-                continue
+            summary = summaries.get(context_folder_name)
+            if summary is None:
+                continue  # Not a session folder, or it could not be read
 
             # Add context to history if it contains messages
-            if context.messages:
+            if summary["messages"]:
+                context = Context()
+                context.session_id = context_folder_name
+                context.path = os.path.join(
+                    user_history_path, context_folder_name, "context"
+                )
+                context.summary = summary
+                context.writer = writer
+                context.loaded = False
                 # start with contexts collapsed
                 context.expanded = False
                 self.sessions.append(context)
 
-    def to_gui(self, parent_frame: tk.Frame, user_name: str) -> tk.Frame:
+    def backfill(self, user_history_path: str, session_id: str) -> dict | None:
         """
-        Docstring for to_gui
-
-        Laytout the user's history of contexts and messages in a GUI frame.
-        The frame should allow expanding/collapsing each context to show/hide its messages.
-        each message should be represented using its own to_gui method.
-
-        Example layout:
-
-        [v] {user name} History
-              [v] Context 1
-                    <Message 1 GUI>
-                    <Message 1 GUI>
-              [>] Context 1
-
-        Explanation:
-        - [v] or [>] indicates whether the context is expanded or collapsed.
-        - row 0 is always displayed as the header with the user's name and "History".
+        Summarize a session that is missing from the history index and record it.
 
-        :param parent_frame: Description
-        :type parent_frame: tk.Frame
-        :param user_name: The name of the user
-        :type user_name: str
-        :return: tk.Frame
+        :param user_history_path: The ``sessions/<user>`` folder.
+        :param session_id: The session folder name.
+        :return: The session summary, or None if the session could not be read.
         """
-        history_frame = tk.Frame(parent_frame)
-
-        expanded_var = tk.BooleanVar(value=False)
-        expand_collapse = {
-            True: "▼",
-            False: "▶",
-        }
-
-        def toggle_expand():
-            expanded = expanded_var.get()
-            expanded_var.set(not expanded)
-            collapse_expand_button.config(text=expand_collapse[expanded_var.get()])
-            if expanded:
-                history_contexts_frame.grid_remove()
-            else:
-                history_contexts_frame.grid(row=1, column=1, columnspan=2, sticky="w")
-
-        collapse_expand_button = tk.Button(
-            history_frame,
-            command=toggle_expand,
-            text=expand_collapse[expanded_var.get()],
-            width=1,
-            height=1,
-            font=("Terminal", 10),
-        )
-        collapse_expand_button.grid(row=0, column=0, sticky="w")
-
-        history_label = tk.Label(
-            history_frame,
-            text=f"{user_name} History ({len(self.sessions)} contexts)",
-            font=("Terminal", 10, "bold"),
-        )
-        history_label.grid(row=0, column=1, sticky="w")
-
-        history_contexts_frame = tk.Frame(history_frame)
-        history_contexts_frame.grid(row=1, column=1, columnspan=2, sticky="w")
-        history_contexts_frame.grid_remove()  # Start collapsed
-
-        for idx, context in enumerate(self.sessions):
-            c_frame = context.to_gui(history_contexts_frame)
-            c_frame.grid(row=idx, column=0, sticky="w", padx=(20, 0))
-
-        return history_frame
+        context = Context()
+        context.session_id = session_id
+        context.path = os.path.join(user_history_path, session_id, "context")
+        try:
+            context.load_messages(session_id)
+        except OSError:
+            return None
+        summary = context.summarize()
+        self.index.update(summary)
+        return summary
@@ -0,0 +1,311 @@
+"""
+Docstring for agentx.host_pool
+"""
+
+import threading
+import time
+from concurrent.futures import CancelledError
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+import httpx
+
+from .cancellation import CancelToken
+from .connection import OllamaConnection
+
+
+class HostState:
+    """
+    One Ollama host of the pool and what the last probe found out about it.
+    """
+
+    def __init__(
+        self, connection: OllamaConnection, weight: float = 1.0, slots: int = 2
+    ):
+        """
+        HostState
+
+        :param connection: The pooled connection to the host.
+        :param weight: Relative capacity; a weight 2 host takes twice the load.
+        :param slots: Most chat requests from this process running at once.
+        """
+        self.connection = connection
+        self.host = connection.host
+        self.weight = weight if weight > 0 else 1.0
+        self.slots = threading.BoundedSemaphore(max(1, slots))
+        self.healthy: bool | None = None  # None until the first probe
+        self.latency_ms: float | None = None  # Round trip of the last /api/ps
+        self.installed: set[str] | None = None  # Models from /api/tags, once known
+        self.loaded: set[str] = set()  # Models in memory, from /api/ps
+        self.in_flight = 0  # Chat requests from this process, running or queued
+        self.last_error: str | None = None
+        self.checked_at: float | None = None
+
+    def available(self, model: str) -> bool:
+        """
+        True if the model is installed, or nothing is known about the host yet.
+        """
+        return self.installed is None or model in self.installed
+
+    def resident(self, model: str) -> bool:
+        """
+        True if the model is loaded in the host's memory.
+        """
+        return model in self.loaded
+
+    def status(self, model: str) -> str:
+        """
+        Short status for the UI, e.g. "peters01:11434 ✓ 12 ms resident".
+
+        :param model: The model whose residency is shown.
+        """
+        if self.healthy is None:
+            return f"{self.host} …"
+        if not self.healthy:
+            return f"{self.host} ✗"
+        text = f"{self.host} ✓ {self.latency_ms:.0f} ms"
+        if self.resident(model):
+            text += " resident"
+        elif not self.available(model):
+            text += " no model"
+        if self.in_flight:
+            text += f" ({self.in_flight} busy)"
+        return text
+
+
+class HostPool:
+    """
+    The Ollama hosts a session may use, with background health probes and
+    least-loaded routing.
+
+    Hosts come from ``ollama_hosts`` in the [agentx] table, a list of
+    ``"host:port"`` strings or ``{ host = "host:port", weight = 2 }`` tables;
+    without it the pool holds ``ollama_host`` alone. A probe thread calls
+    ``/api/ps`` and ``/api/tags`` on every host each
+    ``ollama_probe_interval_seconds``. ``choose`` prefers healthy hosts that have
+    the model resident, then the fewest in-flight requests per unit of weight,
+    then the lowest probe latency. At most ``ollama_host_concurrency`` requests
+    run on a host at once; further requests wait in ``use`` for a free slot.
+    """
+
+    def __init__(
+        self,
+        config: dict[str, Any],
+        connection: OllamaConnection | None = None,
+    ):
+        """
+        HostPool
+
+        :param config: The loaded agentx.toml configuration.
+        :param connection: An existing connection to use for its host.
+        """
+        agentx_config = config["agentx"]
+        self.model = agentx_config["ollama_model"]
+        self.probe_interval = agentx_config.get("ollama_probe_interval_seconds", 15)
+        self.probe_timeout = agentx_config.get("ollama_probe_timeout_seconds", 2)
+        self.host_concurrency = agentx_config.get("ollama_host_concurrency", 2)
+        self.config = config
+        self._connection = connection
+        self.hosts: list[HostState] = []
+        entries = agentx_config.get("ollama_hosts") or [agentx_config["ollama_host"]]
+        for entry in entries:
+            if isinstance(entry, str):
+                entry = {"host": entry}
+            self.add_host(entry["host"], entry.get("weight", 1.0))
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def add_host(self, host: str, weight: float = 1.0) -> HostState:
+        """
+        Add a host to the pool, or return it if it is already part of it.
+
+        :param host: ``host:port`` of the Ollama server.
+        :param weight: Relative capacity of a new host.
+        :return: The host's state.
+        """
+        for state in self.hosts:
+            if state.host == host:
+                return state
+        if self._connection is not None and host == self._connection.host:
+            connection = self._connection
+        else:
+            agentx_config = {**self.config["agentx"], "ollama_host": host}
+            connection = OllamaConnection({**self.config, "agentx": agentx_config})
+        state = HostState(connection, weight, self.host_concurrency)
+        # Replaced, not appended to, so the probe thread can iterate safely
+        self.hosts = self.hosts + [state]
+        return state
+
+    @property
+    def primary(self) -> OllamaConnection:
+        """
+        The first configured host's connection.
+        """
+        return self.hosts[0].connection
+
+    def _model_names(self, models: list[dict]) -> set[str]:
+        names = set()
+        for model in models:
+            name = model.get("name") or model.get("model") or ""
+            names.add(name)
+            names.add(name.removesuffix(":latest"))
+        return names
+
+    def probe(self, state: HostState):
+        """
+        Check one host's health, latency and whether it holds the model.
+
+        :param state: The host to probe.
+        """
+        http = state.connection.http
+        try:
+            started = time.perf_counter()
+            ps = http.get("/api/ps", timeout=self.probe_timeout)
+            latency_ms = (time.perf_counter() - started) * 1000
+            ps.raise_for_status()
+            tags = http.get("/api/tags", timeout=self.probe_timeout)
+            tags.raise_for_status()
+        except (httpx.HTTPError, ValueError) as e:
+            state.healthy = False
+            state.last_error = str(e)
+        else:
+            state.healthy = True
+            state.latency_ms = latency_ms
+            state.last_error = None
+            state.loaded = self._model_names(ps.json().get("models") or [])
+            state.installed = self._model_names(tags.json().get("models") or [])
+        state.checked_at = time.time()
+
+    def probe_all(self):
+        """
+        Probe every host once.
+        """
+        for state in self.hosts:
+            self.probe(state)
+
+    def start(self):
+        """
+        Probe on a background thread, now and every probe interval.
+        """
+        if self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.is_set():
+                self.probe_all()
+                self._stop.wait(self.probe_interval)
+
+        self._thread = threading.Thread(target=run, name="agentx-probe", daemon=True)
+        self._thread.start()
+
+    def choose(
+        self,
+        exclude: list[HostState] = (),
+        model: str | None = None,
+        host: str | None = None,
+    ) -> HostState | None:
+        """
+        Pick the host for the next chat request.
+
+        :param exclude: Hosts already tried for this request.
+        :param model: The requested model; the pool's model if omitted.
+        :param host: Only consider this host, e.g. to compare hosts.
+        :return: The best host, or None if every host was excluded.
+        """
+        model = model or self.model
+        candidates = [
+            s for s in self.hosts if s not in exclude and host in (None, s.host)
+        ]
+        if not candidates:
+            return None
+        # Hosts that have not been probed yet are given the benefit of the doubt
+        usable = [
+            s for s in candidates if s.healthy is not False and s.available(model)
+        ]
+        if usable:
+            candidates = usable
+        with self._lock:
+            return min(
+                candidates,
+                key=lambda s: (
+                    not s.resident(model),
+                    (s.in_flight + 1) / s.weight,
+                    s.latency_ms if s.latency_ms is not None else float("inf"),
+                ),
+            )
+
+    @contextmanager
+    def use(
+        self, state: HostState, cancel: CancelToken | None = None
+    ) -> Iterator[OllamaConnection]:
+        """
+        Count a request against a host while it runs, waiting for one of the
+        host's slots first.
+
+        :param state: The chosen host.
+        :param cancel: Stops waiting for a slot when cancelled.
+        :return: The host's connection.
+        :raises concurrent.futures.CancelledError: If cancelled while waiting.
+        """
+        with self._lock:
+            state.in_flight += 1
+        try:
+            while not state.slots.acquire(timeout=0.1):
+                if cancel and cancel.cancelled:
+                    raise CancelledError(f"Cancelled waiting for {state.host}")
+            try:
+                yield state.connection
+            finally:
+                state.slots.release()
+        finally:
+            with self._lock:
+                state.in_flight -= 1
+
+    def mark_failed(self, state: HostState, error: Exception):
+        """
+        Take a host out of routing until its next successful probe.
+
+        :param state: The host whose request failed.
+        :param error: The failure.
+        """
+        state.healthy = False
+        state.last_error = str(error)
+
+    def handshake(self, timeout_seconds: float) -> HostState:
+        """
+        Load the model on the best host, trying the others if it fails.
+
+        :param timeout_seconds: How long to wait for the model to load.
+        :return: The host that loaded the model.
+        :raises httpx.HTTPError: If no host could load it.
+        """
+        tried: list[HostState] = []
+        while (state := self.choose(tried)) is not None:
+            tried.append(state)
+            try:
+                state.connection.handshake(timeout_seconds)
+            except httpx.HTTPError as e:
+                self.mark_failed(state, e)
+                if len(tried) == len(self.hosts):
+                    raise
+                print(f"Handshake with {state.host} failed, trying next host: {e}")
+                continue
+            state.healthy = True
+            state.loaded = state.loaded | {self.model}
+            return state
+        raise httpx.ConnectError("No Ollama host configured")
+
+    def status(self) -> str:
+        """
+        One line with every host's status, for the UI.
+        """
+        return " · ".join(state.status(self.model) for state in self.hosts)
+
+    def close(self):
+        """
+        Stop probing and close every host's connections.
+        """
+        self._stop.set()
+        for state in self.hosts:
+            state.connection.close()
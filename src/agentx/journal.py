@@ -0,0 +1,303 @@
+"""
+Docstring for agentx.journal
+
+In-flight journal of streamed responses.
+
+While a response streams, its thinking and content text is appended to a small
+JSONL journal in ``sessions/<user>/.inflight/``: a header line naming the
+session, then one line per flushed run of text. Text is buffered and written
+once ``flush_bytes`` have accumulated or ``flush_seconds`` have passed, so the
+cost stays proportional to the new text and the message itself is never
+rewritten. Once the finished response is stored in the session log the journal
+is deleted; a journal left behind by a crash or kill is turned into a partial
+message of its session by ``recover_journals`` on the next start.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from typing import Any
+
+from .context import Context
+from .message import Message
+from .storage import HistoryIndex
+
+JOURNAL_FOLDER = ".inflight"
+JOURNAL_CHANNELS = ("thinking", "content")
+
+
+class TurnJournal:
+    """
+    Append-only journal of one streaming response.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        header: dict[str, Any],
+        flush_seconds: float = 1.0,
+        flush_bytes: int = 4096,
+    ):
+        """
+        TurnJournal
+
+        :param folder: The user's ``.inflight`` folder.
+        :param header: Where the response belongs: ``context_path``,
+            ``session_id``, ``epoch``, ``model`` and ``host``.
+        :param flush_seconds: Longest time text may stay buffered.
+        :param flush_bytes: Buffered text that triggers a write.
+        """
+        os.makedirs(folder, exist_ok=True)
+        self.flush_seconds = flush_seconds
+        self.flush_bytes = flush_bytes
+        self.path = os.path.join(
+            folder, f"{time.time_ns()}-{os.getpid()}-{threading.get_ident()}.jsonl"
+        )
+        self._lock = threading.Lock()
+        self._records: list[dict[str, Any]] = []  # Records not yet written
+        self._buffered = 0
+        self._flushed_at = time.monotonic()
+        self._file = open(self.path, "ab")
+        header = {**header, "hostname": socket.gethostname(), "pid": os.getpid()}
+        self._file.write((json.dumps(header) + "\n").encode("utf-8"))
+        self._file.flush()
+
+    def append(self, channel: str, text: str):
+        """
+        Buffer streamed text, writing it out when a flush is due.
+
+        :param channel: "thinking" or "content"; other channels are ignored.
+        :param text: The chunk.
+        """
+        if channel not in JOURNAL_CHANNELS or not isinstance(text, str):
+            return
+        with self._lock:
+            if self._file is None:
+                return
+            last = self._records[-1] if self._records else None
+            if last and last.get("channel") == channel:
+                last["text"] += text
+            else:
+                self._records.append({"channel": channel, "text": text})
+            self._buffered += len(text)
+            if (
+                self._buffered >= self.flush_bytes
+                or time.monotonic() - self._flushed_at >= self.flush_seconds
+            ):
+                self._flush()
+
+    def saved_thinking(self, epoch: float):
+        """
+        Note that the thinking message was handed to the session log, so
+        recovery does not add it twice. Written with the next flush. The save
+        may still be queued on the write-behind thread, so recovery only trusts
+        the note if the log holds a message with this epoch.
+
+        :param epoch: The thinking message's epoch.
+        """
+        with self._lock:
+            self._records.append({"saved": "thinking", "epoch": epoch})
+
+    def _flush(self):
+        if self._records:
+            data = b"".join(
+                (json.dumps(record) + "\n").encode("utf-8") for record in self._records
+            )
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._records = []
+            self._buffered = 0
+        self._flushed_at = time.monotonic()
+
+    def close(self):
+        """
+        Write any buffered text and close the file; the journal stays on disk.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._flush()
+                self._file.close()
+                self._file = None
+
+    def discard(self):
+        """
+        Close and delete the journal, once its response is stored elsewhere.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _writer_alive(header: dict[str, Any]) -> bool:
+    """
+    True if the process that wrote a journal still runs on this machine.
+    """
+    if header.get("hostname") != socket.gethostname():
+        return False
+    try:
+        os.kill(header["pid"], 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, KeyError, TypeError):
+        return True  # Someone else's process, or unknown: leave it alone
+    return True
+
+
+def read_journal(path: str) -> tuple[dict[str, Any], dict[str, str]]:
+    """
+    Read a journal, ignoring a line torn by the crash.
+
+    :param path: The journal file.
+    :return: The header, with ``thinking_saved_epoch`` if the thinking message
+        was already stored, and the text of each channel.
+    """
+    header: dict[str, Any] = {}
+    texts = {channel: [] for channel in JOURNAL_CHANNELS}
+    with open(path, "rb") as f:
+        for idx, line in enumerate(f):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if idx == 0:
+                header = record
+            elif record.get("channel") in texts:
+                texts[record["channel"]].append(record.get("text", ""))
+            elif record.get("saved") == "thinking":
+                header["thinking_saved_epoch"] = record.get("epoch")
+    return header, {channel: "".join(parts) for channel, parts in texts.items()}
+
+
+def recover_journals(user_history_folder: str) -> list[Message]:
+    """
+    Turn the journals of responses whose process died into messages of their
+    sessions: a disabled thinking message, unless it was already stored, and the
+    response marked "partial". The text of a continuation is appended to the
+    response it resumed.
+
+    :param user_history_folder: The ``sessions/<user>`` folder.
+    :return: The recovered responses.
+    """
+    folder = os.path.join(user_history_folder, JOURNAL_FOLDER)
+    try:
+        names = sorted(os.listdir(folder))
+    except FileNotFoundError:
+        return []
+    index = HistoryIndex(user_history_folder)
+    summaries = None
+    recovered = []
+    for name in names:
+        if not name.endswith(".jsonl"):
+            continue
+        path = os.path.join(folder, name)
+        try:
+            header, texts = read_journal(path)
+        except OSError:
+            continue
+        if not header.get("context_path") or _writer_alive(header):
+            continue
+        # Claim the journal so a concurrent start does not recover it twice
+        claimed = f"{path}.recovering"
+        try:
+            os.rename(path, claimed)
+        except OSError:
+            continue
+        if texts["thinking"] or texts["content"]:
+            if summaries is None:
+                summaries = index.load()
+            recovered.append(_recover(header, texts, index, summaries))
+        os.remove(claimed)
+    return recovered
+
+
+def _recover(
+    header: dict[str, Any],
+    texts: dict[str, str],
+    index: HistoryIndex,
+    summaries: dict[str, dict[str, Any]],
+) -> Message:
+    context = Context()
+    context.path = header["context_path"]
+    context.session_id = header.get("session_id")
+    context.history_index = index
+    context.summary = summaries.get(context.session_id)
+    if header.get("continues_seq") is not None:
+        resumed = _recover_continuation(context, header["continues_seq"], texts)
+        if resumed is not None:
+            return resumed
+    saved_epoch = header.get("thinking_saved_epoch")
+    if saved_epoch is not None and not any(
+        entry.epoch == saved_epoch for entry in context.log.entries()
+    ):
+        saved_epoch = None  # Its save was still queued when the process died
+    # After the thinking message if that was stored, so the order is kept
+    epoch = saved_epoch or header.get("epoch") or time.time()
+    ts = datetime.fromtimestamp(epoch)
+    if texts["thinking"] and saved_epoch is None:
+        thinking = Message(role="assistant", content=texts["thinking"])
+        thinking.enabled = False
+        context.add_message(ts, thinking)
+    response = Message(
+        role="assistant",
+        content=texts["content"],
+        enabled=bool(texts["content"]),
+        metrics={
+            "model": header.get("model"),
+            "host": header.get("host"),
+            "epoch": header.get("epoch"),
+            "recovered": True,
+        },
+        status="partial",
+    )
+    context.add_message(ts, response)
+    context.close()
+    return response
+
+
+def _recover_continuation(
+    context: Context, seq: int, texts: dict[str, str]
+) -> Message | None:
+    """
+    Append a continuation's journaled text to the response it resumed, and its
+    thinking to the response's thinking message, as ``begin_continue`` does for
+    a live continuation. Both are saved again under their sequence numbers.
+
+    :return: The response, or None if it is missing from the log.
+    """
+    context.load_messages(context.session_id)
+    messages = [m for ts, m in context.messages]
+    position = next((i for i, m in enumerate(messages) if m.seq == seq), None)
+    if position is None:
+        return None
+    response = messages[position]
+    if texts["thinking"]:
+        thinking = None
+        for message in reversed(messages[:position]):
+            if message.role == "user":
+                break
+            if message.role == "assistant" and not message.enabled:
+                thinking = message  # Its thinking trace
+        if thinking is not None:
+            thinking.content += texts["thinking"]
+            context.update_message(thinking)
+        else:
+            thinking = Message(role="assistant", content=texts["thinking"])
+            thinking.enabled = False
+            # Just before the response, so it sorts in front of it
+            context.add_message(datetime.fromtimestamp(response.epoch - 1e-6), thinking)
+    response.content += texts["content"]
+    response.status = "partial"
+    response.enabled = bool(response.content)
+    response.metrics = {**(response.metrics or {}), "recovered": True}
+    context.update_message(response)
+    context.close()
+    return response
@@ -2,24 +2,66 @@
 Docstring for agentx.main
 """
 
-import tkinter as tk
+import argparse
+import sys
+import time
 
-from .config import load_config
-from .session import AgentXSession
+from .config import DEFAULT_CONFIG, load_config
 
 
-def main():
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """
+    Parse the command line.
+
+    :param argv: Arguments without the program name; defaults to sys.argv.
+    """
+    parser = argparse.ArgumentParser(prog="agentx", description="AgentX")
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help="agentx.toml path")
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Run the conversations of --prompts without a window",
+    )
+    parser.add_argument(
+        "--prompts", default="-", help="JSONL prompts file ('-' for stdin)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="Conversations in flight at once (default: headless_concurrency or 4)",
+    )
+    parser.add_argument(
+        "--output", default="-", help="JSONL results file ('-' for stdout)"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
     """
     Docstring for main
     """
-    session = AgentXSession(tk.Tk(), load_config())
+    started = time.perf_counter()
+    args = parse_args(argv)
+    config = load_config(args.config)
+
+    if args.headless:
+        # Imported here so headless runs never need a display or tkinter
+        from .headless import run_headless
+
+        concurrency = args.concurrency or config["agentx"].get(
+            "headless_concurrency", 4
+        )
+        sys.exit(run_headless(config, args.prompts, concurrency, args.output))
+
+    import tkinter as tk
+
+    from .session import AgentXSession
 
-    # Perform service handshake before initializing the layout
-    try:
-        session.perform_service_handshake()
-    except RuntimeError as e:
-        print(e)
-        return
+    session = AgentXSession(tk.Tk(), config)
 
+    # Draw the window right away and load the model in the background
     session.layout()
+    session.report_first_paint(started)
+    session.start_warmup()
     session.root.mainloop()
@@ -1,16 +1,52 @@
-import json
-import os
-import tkinter as tk
-from dataclasses import dataclass
+import sys
 from datetime import datetime
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .storage import IndexEntry, SessionLog
+
+CHARS_PER_TOKEN = 4  # Rough average for English text and code
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and template markers per message
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate how many tokens a message occupies in the model's context.
+
+    :param text: The message content.
+    """
+    return -(-len(text) // CHARS_PER_TOKEN) + MESSAGE_OVERHEAD_TOKENS
 
 
-@dataclass
 class Message:
     """
     Docstring for src.agentx.message
+
+    Messages are slotted, so a session with 100k messages does not carry 100k
+    instance dictionaries. Messages loaded from a session log with ``from_log``
+    do not keep their content: they hold the log and index entry it is stored
+    at, and read it again whenever ``content`` is used, e.g. to render a preview
+    or build a prompt.
     """
 
+    __slots__ = (
+        "role",
+        "_content",
+        "_log",
+        "_source",
+        "_chunks",
+        "attachments",
+        "_enabled",
+        "_file",
+        "_epoch",
+        "metrics",
+        "seq",
+        "_tokens",
+        "pinned",
+        "summary_of",
+        "status",
+    )
+
     def __init__(
         self,
         role: str,
@@ -19,6 +55,12 @@ class Message:
         enabled: bool = True,
         file: str = None,
         epoch: float = 0.0,
+        metrics: dict | None = None,
+        seq: int | None = None,
+        tokens: int | None = None,
+        pinned: bool = False,
+        summary_of: list[int] | None = None,
+        status: str | None = None,
     ):
         """
         Message
@@ -28,13 +70,30 @@ class Message:
         :param attachments: List of attachment file paths associated with the message.
         :param enabled: Flag indicating if the message is enabled in the context.
         :param file: The file path from which the message was loaded, if applicable.
+        :param metrics: Streaming telemetry for assistant responses, if recorded.
+        :param seq: The message's sequence number in its session log, once saved.
+        :param tokens: Cached token count, if already computed.
+        :param pinned: Keep the message in the prompt regardless of the token budget.
+        :param summary_of: For compaction summaries, the seqs of the messages
+            the summary replaces.
+        :param status: "interrupted" for a response cut short by the user.
         """
-        self.role = role
-        self.content = content
+        self.role = sys.intern(role)  # One shared string per role
+        self._content: str | None = content
+        # Where the content is while it is not kept in memory, see from_log()
+        self._log: "SessionLog | None" = None
+        self._source: "IndexEntry | None" = None
+        self._chunks: list[str] | None = None  # Pending streamed chunks, see append()
         self.attachments: list[str] = attachments or []
         self._enabled = enabled
-        self._file = file
-        self._epoch = epoch
+        self._file = sys.intern(file) if file else file  # Shared by a segment
+        self._epoch = float(epoch)
+        self.metrics = metrics
+        self.seq = seq
+        self._tokens = tokens
+        self.pinned = pinned
+        self.summary_of = summary_of
+        self.status = status
 
     @classmethod
     def from_dict(cls, data: dict, file_path: str = None) -> "Message":
@@ -52,8 +111,94 @@ class Message:
             enabled=data.get("enabled", True),
             file=file_path or data.get("file"),
             epoch=data.get("epoch", 0),
+            metrics=data.get("metrics"),
+            seq=data.get("seq"),
+            tokens=data.get("tokens"),
+            pinned=data.get("pinned", False),
+            summary_of=data.get("summary_of"),
+            status=data.get("status"),
         )
 
+    @classmethod
+    def from_log(
+        cls, log: "SessionLog", entry: "IndexEntry", record: dict | None = None
+    ) -> "Message":
+        """
+        Load a message from its session log without keeping its content.
+
+        :param log: The session log.
+        :param entry: The message's latest index entry.
+        :param record: The entry's record, if it was already read.
+        :return: Message instance whose content is read from the log on use
+        """
+        if record is None:
+            record = log.read(entry)
+        message = cls.from_dict(record, file_path=log.segment_path(entry.segment))
+        if message._tokens is None:
+            message._tokens = estimate_tokens(message._content)
+        message._content = None
+        message._log = log
+        message._source = entry
+        return message
+
+    @property
+    def content(self) -> str:
+        """
+        The message text. Chunks gathered with ``append`` are joined here, once,
+        the first time the content is read after they arrive. The content of a
+        message loaded with ``from_log`` is read from the log every time.
+        """
+        if self._source is not None:
+            return self._log.read(self._source).get("content", "")
+        if self._chunks:
+            self.finalize()
+        return self._content
+
+    @content.setter
+    def content(self, value: str):
+        self._chunks = None
+        self._log = self._source = None
+        self._content = value
+        self._tokens = None
+
+    @property
+    def epoch(self) -> float:
+        """
+        When the message was added, in seconds since the epoch.
+        """
+        return self._epoch
+
+    @property
+    def tokens(self) -> int:
+        """
+        Token count of the message, computed once and stored with it.
+        """
+        if self._tokens is None:
+            self._tokens = estimate_tokens(self.content)
+        return self._tokens
+
+    def append(self, chunk: str):
+        """
+        Append a streamed chunk to the content without rebuilding the string.
+
+        :param chunk: The text received from the model.
+        """
+        if chunk:
+            if self._source is not None:
+                self.content = self.content  # Keep it from now on
+            if self._chunks is None:
+                self._chunks = []
+            self._chunks.append(chunk)
+            self._tokens = None
+
+    def finalize(self):
+        """
+        Join any pending streamed chunks into the content.
+        """
+        if self._chunks:
+            self._content += "".join(self._chunks)
+            self._chunks = None
+
     @property
     def enabled(self) -> bool:
         return self._enabled
@@ -76,7 +221,7 @@ class Message:
 
     @file.setter
     def file(self, value: str):
-        self._file = value
+        self._file = sys.intern(value) if value else value
 
     def attach(self, attachment_path: str):
         """
@@ -105,26 +250,41 @@ class Message:
         :return: Description
         :rtype: dict
         """
-        return {
+        data = {
             "role": self.role,
             "content": self.content,
             "enabled": self.enabled,
             "file": self.file,
             "epoch": self._epoch,
             "attachments": self.attachments,
+            "seq": self.seq,
+            "tokens": self.tokens,
+            "pinned": self.pinned,
         }
-
-    def save(self, context_path: str, time_added: datetime) -> None:
+        if self.metrics is not None:
+            data["metrics"] = self.metrics
+        if self.summary_of is not None:
+            data["summary_of"] = self.summary_of
+        if self.status is not None:
+            data["status"] = self.status
+        return data
+
+    def save(self, log: "SessionLog", time_added: datetime | None = None) -> None:
         """
         save
-        Use this method to save the context object to a JSON file.
+        Use this method to append the message to its session log. Saving a message
+        that already has a sequence number appends a newer version of it.
+
+        :param log: The session log of the context the message belongs to.
+        :param time_added: When the message was added; sets the message epoch.
         """
-        message_file = os.path.join(
-            context_path, f"{time_added.timestamp()}_{self.role}.json"
-        )
-        self.file = message_file
-        with open(message_file, "w", encoding="utf-8") as f:
-            f.write(json.dumps(self.serialize()))
+        if time_added is not None:
+            self.ts = time_added
+        entry = log.append(self.serialize())
+        self.seq = entry.seq
+        self.file = log.segment_path(entry.segment)
+        if self._source is not None:
+            self._log, self._source = log, entry  # The new record has the content
 
     def llm_message_dict(self) -> dict:
         """
@@ -137,74 +297,12 @@ class Message:
         }
         return mj
 
-    def to_gui(self, parent):
+    def preview(self, length: int = 40) -> str:
         """
-        Generate tkinter GUI representation of the message.
-        :param parent: The parent widget for the frame.
-        :return: tkinter Frame representing the message
-        """
-        frame = tk.Frame(parent)
-
-        # State for expand/collapse
-        expanded_var = tk.BooleanVar(value=False)
-        expand_collapse = {
-            True: "▼",
-            False: "▶",
-        }
-
-        def toggle_expand():
-            expanded = expanded_var.get()
-            expanded_var.set(not expanded)
-            collapse_expand_button.config(text=expand_collapse[expanded_var.get()])
-            if expanded:
-                for w in attachment_widgets:
-                    w.grid_remove()
-            else:
-                for idx, w in enumerate(attachment_widgets):
-                    w.grid(
-                        row=1 + idx, column=3, columnspan=2, sticky="w", padx=(30, 0)
-                    )
-
-        collapse_expand_button = tk.Button(
-            frame,
-            text=expand_collapse[expanded_var.get()],
-            width=1,
-            height=1,
-            font=("Terminal", 10),
-            command=toggle_expand,
-        )
-        collapse_expand_button.grid(row=0, column=0, sticky="w")
-
-        enabled_var = tk.BooleanVar(value=self.enabled)
+        Short single-line preview of the content for the Session tab.
 
-        def on_enabled_toggle():
-            self.enabled = enabled_var.get()
-
-        enabled_checkbox = tk.Checkbutton(
-            frame, variable=enabled_var, command=on_enabled_toggle
-        )
-        enabled_checkbox.grid(row=0, column=1, sticky="w")
-
-        roles = {
-            "user": "👤",
-            "assistant": "🤖",
-            "system": "⚙️",
-        }
-        role_label = tk.Label(frame, text=roles.get(self.role, "⚙️"))
-        role_label.grid(row=0, column=2, sticky="w")
-
-        # Content preview (first 40 chars)
-        preview = self.content[:40] + ("..." if len(self.content) > 40 else "")
-        preview_label = tk.Label(frame, text=preview, anchor="w", width=50)
-        preview_label.grid(row=0, column=3, sticky="w")
-
-        # Attachments
-        attachment_widgets = []
-        for idx, att in enumerate(self.attachments):
-            att_label = tk.Label(frame, text=f"📁  {att.split('/')[-1]}", anchor="w")
-            att_label.grid(
-                row=1 + idx, column=3, columnspan=2, sticky="w", padx=(30, 0)
-            )
-            attachment_widgets.append(att_label)
-
-        return frame
+        :param length: Number of characters to keep.
+        """
+        content = self.content
+        preview = content[:length].replace("\n", " ")
+        return preview + ("..." if len(content) > length else "")
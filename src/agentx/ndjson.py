@@ -0,0 +1,103 @@
+"""
+Docstring for agentx.ndjson
+"""
+
+import json
+from typing import Any, Callable, Iterator
+
+import httpx
+from ollama import ResponseError
+
+from .cancellation import CancelToken, abort_network_stream
+
+try:
+    import orjson
+
+    loads = orjson.loads
+except ImportError:  # orjson is optional; the stdlib decoder also takes bytes
+    loads = json.loads
+
+# Message fields that carry streamed output, in the order ollama.Message declares
+# them, so a chunk is routed to the same channel as on the pydantic path
+CHANNELS = ("content", "thinking", "images", "tool_name", "tool_calls")
+
+
+def iter_lines(response: httpx.Response) -> Iterator[bytes]:
+    """
+    Split a streamed response body into lines without decoding it to str.
+
+    :param response: An open streaming response.
+    """
+    pending = b""
+    for data in response.iter_bytes():
+        lines = (pending + data).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if line:
+                yield line
+    if pending:
+        yield pending
+
+
+def route(message: dict[str, Any]) -> tuple[str, Any] | None:
+    """
+    The channel and value of one chunk's message: the first non-empty field.
+
+    :param message: The ``message`` object of a decoded chunk.
+    :return: ``(channel, value)``, or None for an empty chunk.
+    """
+    for channel in CHANNELS:
+        value = message.get(channel)
+        if value:
+            return channel, value
+    return None
+
+
+def stream_chat(
+    http: httpx.Client, payload: dict[str, Any], cancel: CancelToken | None = None
+) -> Iterator[dict]:
+    """
+    Stream ``/api/chat`` over a pooled httpx client, yielding decoded chunks as
+    plain dictionaries instead of ollama's pydantic ChatResponse objects.
+
+    With a cancel token, cancelling shuts down the request's socket: as soon as
+    the response headers arrived, or from the start if the request opened a new
+    connection. A request waiting for headers on a reused connection is aborted
+    the moment its headers arrive.
+
+    :param http: The connection's httpx client.
+    :param payload: The chat request; ``stream`` is forced on.
+    :param cancel: Aborts the request when cancelled.
+    :raises ollama.ResponseError: On an HTTP error or an error chunk, like
+        ``ollama.Client.chat``.
+    """
+    body = {k: v for k, v in payload.items() if v is not None}
+    body["stream"] = True
+    unregister: list[Callable[[], None]] = []
+
+    def trace(event: str, info: dict[str, Any]):
+        if event == "connection.connect_tcp.complete" and cancel:
+            stream = info["return_value"]
+            unregister.append(cancel.on_cancel(lambda: abort_network_stream(stream)))
+
+    try:
+        with http.stream(
+            "POST", "/api/chat", json=body, extensions={"trace": trace}
+        ) as response:
+            if cancel:
+                stream = response.extensions["network_stream"]
+                unregister.append(
+                    cancel.on_cancel(lambda: abort_network_stream(stream))
+                )
+            if response.status_code >= 400:
+                response.read()
+                raise ResponseError(response.text, response.status_code)
+            for line in iter_lines(response):
+                chunk = loads(line)
+                if err := chunk.get("error"):
+                    raise ResponseError(err)
+                yield chunk
+    finally:
+        # The connection may go back to the pool; never abort it after this
+        for callback in unregister:
+            callback()
@@ -0,0 +1,146 @@
+"""
+Docstring for agentx.persistence
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Hashable
+
+from .message import Message
+from .storage import SessionLog
+
+
+class WriteBehind:
+    """
+    Background writer for messages and session metadata, so the GUI thread never
+    waits on the file system (on NFS home directories every write and fsync is
+    a round trip to the server).
+
+    Jobs are keyed: submitting a job whose key is still pending replaces the
+    pending job in its place in the queue, so saving the same message twice
+    before the worker gets to it writes it once, with its latest state. The
+    queue is bounded; when ``max_pending`` jobs are waiting, ``submit`` blocks
+    until the worker catches up instead of letting memory grow. ``flush`` waits
+    for every submitted job, ``close`` also stops the worker and closes the
+    logs it wrote to.
+    """
+
+    def __init__(self, max_pending: int = 256, name: str = "agentx-persist"):
+        """
+        WriteBehind
+
+        :param max_pending: Most distinct jobs waiting at once.
+        :param name: Name of the worker thread.
+        """
+        self.max_pending = max(1, max_pending)
+        self._pending: OrderedDict[Hashable, Callable[[], None]] = OrderedDict()
+        self._running = 0  # Jobs taken off the queue and not finished yet
+        self._cond = threading.Condition()
+        self._closed = False
+        self._logs: dict[str, SessionLog] = {}  # Logs written to, by path
+        self.written = 0  # Jobs completed
+        self.coalesced = 0  # Jobs replaced by a newer one before they ran
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, key: Hashable, job: Callable[[], None]):
+        """
+        Queue a job, replacing a pending job with the same key.
+
+        :param key: Identifies what the job writes, e.g. a message.
+        :param job: Performs the write on the worker thread.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("WriteBehind is closed")
+            if key in self._pending:
+                self._pending[key] = job  # Keeps its place in the queue
+                self.coalesced += 1
+                return
+            while len(self._pending) >= self.max_pending:
+                self._cond.wait()
+            self._pending[key] = job
+            self._cond.notify_all()
+
+    def save_message(
+        self, log: SessionLog, message: Message, time_added: datetime | None = None
+    ):
+        """
+        Queue ``Message.save``. The message gets its sequence number right away,
+        and is serialized now, so later changes are saved by a later call.
+
+        :param log: The session log of the message's context.
+        :param message: The message to save.
+        :param time_added: When the message was added; sets the message epoch.
+        """
+        if time_added is not None:
+            message.ts = time_added
+        if message.seq is None:
+            message.seq = log.reserve_seq()
+        record = message.serialize()
+        record["attachments"] = list(record["attachments"])
+
+        def write():
+            entry = log.append(record)
+            message.file = log.segment_path(entry.segment)
+
+        with self._cond:
+            self._logs[log.path] = log
+        self.submit(("message", log.path, message.seq), write)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return  # Closed and drained
+                _, job = self._pending.popitem(last=False)
+                self._running += 1
+                self._cond.notify_all()
+            try:
+                job()
+                self.written += 1
+            except Exception as e:
+                print(f"Write-behind job failed: {e}")
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    self._cond.notify_all()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Wait until every submitted job has been written.
+
+        :param timeout: Seconds to wait at most; forever if None.
+        :return: False if jobs were still pending when the timeout expired.
+        """
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._pending and not self._running, timeout
+            )
+
+    def close(self, timeout: float | None = None):
+        """
+        Write everything still queued, stop the worker and close the logs it
+        wrote to. Called when the window closes. If the worker is still busy
+        when the timeout expires, the logs are left open for it to finish.
+
+        :param timeout: Seconds to wait for the queue to drain at most.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # Still writing: closing its logs now could tear a record
+            print(f"Write-behind still busy after {timeout}s; leaving its logs open")
+            return
+        with self._cond:
+            logs = list(self._logs.values())
+            self._logs = {}
+        for log in logs:
+            log.close()
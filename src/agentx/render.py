@@ -0,0 +1,75 @@
+"""
+Docstring for agentx.render
+"""
+
+import tkinter as tk
+
+
+class RenderBuffer:
+    """
+    Collects text destined for a tk.Text widget and flushes it at most once per
+    display frame.
+
+    Consecutive writes with the same tag are joined into a single run, and each
+    flush issues one ``insert`` (one chars/tags pair per run) followed by one
+    ``see(tk.END)``, so a fast model no longer forces a layout pass per token.
+    """
+
+    def __init__(self, text_widget: tk.Text, frame_interval_ms: int = 16):
+        """
+        RenderBuffer
+
+        :param text_widget: The Text widget the buffered text is inserted into.
+        :param frame_interval_ms: How long to gather chunks before flushing.
+        """
+        self.text_widget = text_widget
+        self.frame_interval_ms = frame_interval_ms
+        self._runs: list[tuple[tuple[str, ...], list[str]]] = []
+        self._after_id = None
+        self.chunks_written = 0  # Number of write() calls with text
+        self.flushes = 0  # Number of insert + see passes on the widget
+
+    def write(self, text: str, tag: str | None = None):
+        """
+        Queue text for the next frame.
+
+        :param text: The text to insert.
+        :param tag: Optional Text tag to apply to the text.
+        """
+        if not text:
+            return
+        self.chunks_written += 1
+        tags = (tag,) if tag else ()
+        if self._runs and self._runs[-1][0] == tags:
+            self._runs[-1][1].append(text)
+        else:
+            self._runs.append((tags, [text]))
+        if self._after_id is None:
+            self._after_id = self.text_widget.after(
+                self.frame_interval_ms, self._on_frame
+            )
+
+    def _on_frame(self):
+        """
+        Timer callback for the scheduled frame flush.
+        """
+        self._after_id = None
+        self.flush()
+
+    def flush(self):
+        """
+        Insert everything gathered so far and scroll to the end.
+        """
+        if self._after_id is not None:
+            self.text_widget.after_cancel(self._after_id)
+            self._after_id = None
+        if not self._runs:
+            return
+        args = []
+        for tags, chunks in self._runs:
+            args.append("".join(chunks))
+            args.append(tags)
+        self._runs = []
+        self.text_widget.insert(tk.END, *args)
+        self.text_widget.see(tk.END)  # Auto-scroll to the end
+        self.flushes += 1
@@ -0,0 +1,93 @@
+"""
+Docstring for agentx.request_builder
+"""
+
+import json
+
+from .message import Message
+
+
+class RequestBuilder:
+    """
+    Builds the message list of each chat request and tracks how much of it
+    repeats the previous request byte for byte.
+
+    Ollama reuses its KV cache for the longest prompt prefix shared with the
+    previous request, so a turn that only appends messages pays prompt
+    evaluation for the new messages alone. Any change to an earlier message
+    (toggling ``enabled``, editing, evicting a turn) forces the whole suffix
+    after it to be re-evaluated; ``would_invalidate`` lets the UI warn before
+    such an edit is made.
+    """
+
+    def __init__(self, keep_alive: str | float | None = None):
+        """
+        RequestBuilder
+
+        :param keep_alive: How long Ollama keeps the model (and its cache) loaded
+            after a request, e.g. "30m"; None uses the server default.
+        """
+        self.keep_alive = keep_alive
+        self._sent: list[str] = []  # Canonical JSON of each message last sent
+        self._sent_messages: list[Message] = []
+        self.reused = 0  # Messages shared with the previous request
+        self.invalidated = False  # Whether the last build broke the old prefix
+
+    @staticmethod
+    def encode(message_dict: dict) -> str:
+        """
+        Canonical form of a request message; equal strings mean equal tokens.
+        """
+        return json.dumps(message_dict, ensure_ascii=False, sort_keys=True)
+
+    def build(self, messages: list[Message]) -> list[dict]:
+        """
+        Build the request messages and record the prefix shared with the
+        previous request.
+
+        :param messages: The messages selected for this turn, in order.
+        :return: The message dictionaries to send.
+        """
+        dicts = [m.llm_message_dict() for m in messages]
+        encoded = [self.encode(d) for d in dicts]
+        common = 0
+        for previous, current in zip(self._sent, encoded):
+            if previous != current:
+                break
+            common += 1
+        self.reused = common
+        self.invalidated = common < len(self._sent)
+        self._sent = encoded
+        self._sent_messages = list(messages)
+        return dicts
+
+    def would_invalidate(self, message: Message, context_messages: list) -> int:
+        """
+        Estimate the cost of toggling a message before it is toggled.
+
+        :param message: The message about to be enabled or disabled.
+        :param context_messages: The context's ``(ts, message)`` list.
+        :return: Tokens of the cached prefix that would have to be re-evaluated,
+            or 0 if the edit does not touch the cached prefix.
+        """
+        if not self._sent_messages:
+            return 0
+        sent_ids = {id(m): idx for idx, m in enumerate(self._sent_messages)}
+        if id(message) in sent_ids:
+            first_changed = sent_ids[id(message)]
+        else:
+            # Enabling a message invalidates the prefix from where it lands
+            positions = {id(m): idx for idx, (_, m) in enumerate(context_messages)}
+            position = positions.get(id(message))
+            last_sent = positions.get(id(self._sent_messages[-1]))
+            if position is None or last_sent is None or position > last_sent:
+                return 0
+            first_changed = next(
+                (
+                    idx
+                    for idx, m in enumerate(self._sent_messages)
+                    if positions.get(id(m), -1) > position
+                ),
+                len(self._sent_messages),
+            )
+        return sum(m.tokens for m in self._sent_messages[first_changed:])
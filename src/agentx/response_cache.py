@@ -0,0 +1,178 @@
+"""
+Docstring for agentx.response_cache
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from .storage import write_atomic
+
+# Channels whose chunks are plain text and can be replayed verbatim
+CACHEABLE_CHANNELS = ("thinking", "content")
+
+
+class ResponseCache:
+    """
+    Opt-in on-disk cache of complete chat responses, keyed by an exact match on
+    the model, its options and the messages sent.
+
+    Each entry is one ``<key>.json`` file holding the ``(channel, text)`` chunks
+    of the original stream, so a hit is replayed through the normal queue and
+    rendering path. Entries older than ``stale_after_days`` are dropped on lookup,
+    and the least recently used entries are evicted once the cache holds more
+    than ``max_entries`` files or ``max_bytes`` bytes. A hit refreshes the file's
+    mtime, which is what recency is tracked by across restarts.
+
+    ``get`` runs on the Tk thread and ``put`` on the streaming worker, so every
+    access holds a lock.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entries: int = 1000,
+        stale_after_days: float = 7,
+    ):
+        """
+        ResponseCache
+
+        :param path: Folder holding the cache entries.
+        :param max_bytes: Most bytes the entries may take on disk.
+        :param max_entries: Most entries kept.
+        :param stale_after_days: Age after which an entry is no longer replayed.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.stale_after_seconds = stale_after_days * 86400
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, int] | None = None  # key -> size, LRU first
+        self._bytes = 0
+
+    @staticmethod
+    def key(model: str, options: dict | None, messages: list[dict]) -> str:
+        """
+        Hash of everything that determines the response.
+
+        :param model: The model name.
+        :param options: The model options sent with the request.
+        :param messages: The request's message dictionaries.
+        :return: A hex sha256 digest.
+        """
+        normalized = json.dumps(
+            {"model": model, "options": options or {}, "messages": messages},
+            ensure_ascii=False,
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.json")
+
+    def _load(self) -> OrderedDict[str, int]:
+        """
+        Index the cache folder once, least recently used first.
+        """
+        if self._entries is None:
+            found = []
+            try:
+                with os.scandir(self.path) as it:
+                    for entry in it:
+                        if entry.name.endswith(".json") and entry.is_file():
+                            stat = entry.stat()
+                            found.append((stat.st_mtime, entry.name[:-5], stat.st_size))
+            except FileNotFoundError:
+                pass
+            found.sort()
+            self._entries = OrderedDict((key, size) for _, key, size in found)
+            self._bytes = sum(self._entries.values())
+        return self._entries
+
+    def _remove(self, key: str):
+        self._bytes -= self._entries.pop(key, 0)
+        try:
+            os.remove(self._file(key))
+        except FileNotFoundError:
+            pass
+
+    def get(self, key: str) -> list[tuple[str, str]] | None:
+        """
+        Look up a response.
+
+        :param key: The request key from ``key``.
+        :return: The recorded ``(channel, text)`` chunks, or None on a miss.
+        """
+        with self._lock:
+            entries = self._load()
+            if key not in entries:
+                return None
+            try:
+                with open(self._file(key), "r", encoding="utf-8") as f:
+                    entry = json.loads(f.read())
+            except (OSError, ValueError):
+                self._remove(key)
+                return None
+            if time.time() - entry.get("created", 0) > self.stale_after_seconds:
+                self._remove(key)
+                return None
+            entries.move_to_end(key)
+            os.utime(self._file(key))
+            return [tuple(event) for event in entry["events"]]
+
+    def put(self, key: str, events: list[tuple[str, str]], model: str):
+        """
+        Store a complete response and evict the least recently used entries.
+
+        :param key: The request key from ``key``.
+        :param events: The ``(channel, text)`` chunks in arrival order.
+        :param model: The model that produced them, kept for inspection.
+        """
+        data = json.dumps(
+            {"model": model, "created": time.time(), "events": events}
+        ).encode("utf-8")
+        with self._lock:
+            entries = self._load()
+            os.makedirs(self.path, exist_ok=True)
+            write_atomic(self._file(key), data)
+            self._bytes -= entries.pop(key, 0)
+            entries[key] = len(data)
+            self._bytes += len(data)
+            while entries and (
+                len(entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(entries)))
+
+    @staticmethod
+    def cacheable(channel: str, value: Any) -> bool:
+        """
+        :return: True if a streamed chunk can be stored and replayed as text.
+        """
+        return channel in CACHEABLE_CHANNELS and isinstance(value, str)
+
+
+def response_cache_from_config(
+    config: dict[str, Any], user_history_folder: str
+) -> ResponseCache | None:
+    """
+    The user's response cache, if ``response_cache_enabled`` is set.
+
+    :param config: The loaded agentx.toml configuration.
+    :param user_history_folder: The user's sessions folder.
+    :return: A cache shared by all of the user's sessions, or None.
+    """
+    agentx_config = config["agentx"]
+    if not agentx_config.get("response_cache_enabled", False):
+        return None
+    return ResponseCache(
+        os.path.join(user_history_folder, ".responses"),
+        max_bytes=agentx_config.get("response_cache_max_mb", 64) * 1024**2,
+        max_entries=agentx_config.get("response_cache_max_entries", 1000),
+        stale_after_days=agentx_config.get("response_cache_stale_days", 7),
+    )
@@ -4,22 +4,27 @@ Docstring for agentx.session
 
 import json
 import os
+import queue
 import threading
+import time
 import tkinter as tk
+from concurrent.futures import Future
 from tkinter import ttk
 from datetime import datetime
 from typing import Any
 
 import httpx
-from ollama import Client
 
+from .compaction import Compactor
 from .context import Context
+from .engine import ConversationEngine, Turn
+from .fanout import FanOut
 from .file_explorer import FileExplorer
 from .history import History
+from .journal import recover_journals
 from .message import Message
-
-is_streaming = threading.Event()
-streaming_thread = None
+from .render import RenderBuffer
+from .session_tree import SessionTree
 
 
 class AgentXSession:
@@ -30,7 +35,6 @@ class AgentXSession:
     def __init__(self, root: tk.Tk, config: dict[str, Any]):
         self.root = root
         self.config = config
-        self.context = Context()
         self.file_explorer = FileExplorer(start_path=os.getcwd())
         self.user = os.getenv("USER") or os.getenv("USERNAME") or "User"
         self.start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -44,11 +48,41 @@ class AgentXSession:
             self.user_history_folder,
             f"session_{self.start_time.replace(' ', '_').replace(':', '-')}",
         )
-        os.makedirs(self.session_folder, exist_ok=True)
-        self.context_folder = os.path.join(self.session_folder, "context")
-        os.makedirs(self.context_folder, exist_ok=True)
-        self.context.path = self.context_folder
+        # Responses cut off by a crash or kill are stored as partial messages
+        self.recovered = recover_journals(self.user_history_folder)
+        if self.recovered:
+            print(f"Recovered {len(self.recovered)} partial response(s)")
+        # Context, streaming and persistence; the view only renders its events
+        self.engine = ConversationEngine(
+            config,
+            self.user_history_folder,
+            os.path.basename(self.session_folder),
+        )
+        self.engine.on_message = self.show_message
+        self.context = self.engine.context
+        self.context_folder = self.engine.context_folder
         self._history = None  # Placeholder for History object
+        self.connection = self.engine.connection  # The first configured host
+        self.pool = self.engine.pool  # Every host turns may be routed to
+        self.warmup: Future | None = None  # Background model load, see start_warmup
+        self.warm_host: str | None = None  # The host the warm-up loaded the model on
+        self.first_paint_ms: float | None = None
+        self.stream_queue: queue.Queue = queue.Queue()  # Chunks from the worker
+        self.turn: Turn | None = None  # The turn being streamed
+        self.fanout: FanOut | None = None  # The latest side-by-side comparison
+        self.streaming_thread: threading.Thread | None = None
+        self.render: RenderBuffer | None = None  # Created in layout()
+        self.session_tree: SessionTree | None = None  # Created in layout()
+        self.idle = threading.Event()  # Set while no chat turn is streaming
+        self.idle.set()
+        self.compactor: Compactor | None = None
+        if config["agentx"].get("compaction_enabled", True):
+            self.compactor = Compactor(
+                self.pool,
+                os.path.join(self.user_history_folder, ".summaries"),
+                self.idle,
+                min_messages=config["agentx"].get("compaction_min_messages", 4),
+            )
 
     @property
     def history(self) -> "History":
@@ -60,7 +94,11 @@ class AgentXSession:
         :rtype: History
         """
         if self._history is None:
-            self._history = History(user_history_path=self.user_history_folder)
+            self._history = History(
+                user_history_path=self.user_history_folder,
+                exclude_session_id=self.context.session_id,
+                writer=self.engine.writer,
+            )
         return self._history
 
     @history.setter
@@ -70,28 +108,22 @@ class AgentXSession:
     def refresh_context_gui(self):
         """
         Refreshes the context GUI in the Session tab of the system status notebook.
-        Destroys the old frames and re-renders the history and current context.
+        Destroys the old tree and re-renders the history and current context.
         """
-        # Destroy existing frames
-        if (
-            hasattr(self.root, "system_status_history")
-            and self.root.system_status_history
-        ):
-            self.root.system_status_history.destroy()
+        # Destroy existing frame
         if (
             hasattr(self.root, "system_status_context")
             and self.root.system_status_context
         ):
             self.root.system_status_context.destroy()
 
-        # Render history first (collapsed by default) in the Session tab
-        self.root.system_status_history = self.history.to_gui(
-            self.root.session_tab, self.user
+        # History (collapsed by default) and the current context share one tree
+        self.session_tree = SessionTree(
+            self.user, self.history, self.context, on_toggle=self.warn_prefix_change
+        )
+        self.root.system_status_context = self.session_tree.to_gui(
+            self.root.session_tab
         )
-        self.root.system_status_history.pack(expand=False, fill=tk.X, anchor=tk.N)
-
-        # Render current context in the Session tab
-        self.root.system_status_context = self.context.to_gui(self.root.session_tab)
         self.root.system_status_context.pack(expand=True, fill=tk.BOTH)
 
     def refresh_files_gui(self):
@@ -107,13 +139,16 @@ class AgentXSession:
         self.root.system_status_files = self.file_explorer.to_gui(self.root.files_tab)
         self.root.system_status_files.pack(expand=True, fill=tk.BOTH)
 
-    def add_message_to_context(self, message: Message):
+    def show_message(self, message: Message):
         """
-        Adds a message to the session context and refreshes the context GUI.
+        Appends the row of a message just added to the session context to the
+        context tree; the Session tab is only rebuilt if it has not been rendered
+        yet.
         """
-        time_added = datetime.now()
-        self.context.add_message(ts=time_added, message=message)
-        self.refresh_context_gui()
+        if not self.session_tree or not self.session_tree.append_message(
+            self.context, message
+        ):
+            self.refresh_context_gui()
 
     def layout(self):
         """
@@ -183,8 +218,37 @@ class AgentXSession:
         root.output_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         # Ensure selection highlighting is visible (after output_text is created)
         root.output_text.tag_config("sel", background="#3399ff", foreground="#ffffff")
+        # Streamed text is coalesced and flushed about once per display frame
+        self.render = RenderBuffer(
+            root.output_text, config["agentx"].get("render_frame_ms", 16)
+        )
+        if self.recovered:
+            self.render.write(
+                f"Recovered {len(self.recovered)} partial response(s) cut off when "
+                "AgentX last stopped; they are in History, marked partial.\n\n",
+                "gray",
+            )
 
         root.system_status = tk.Frame(root.paned, bg="lightblue")
+        # Status line for model warm-up and streaming progress
+        root.status_label = tk.Label(
+            root.system_status,
+            text="",
+            anchor="w",
+            bg="lightblue",
+            font=("Terminal", 9),
+        )
+        root.status_label.pack(side=tk.BOTTOM, fill=tk.X)
+        # Health and probe latency of every Ollama host, see poll_hosts
+        root.hosts_label = tk.Label(
+            root.system_status,
+            text="",
+            anchor="w",
+            bg="lightblue",
+            font=("Terminal", 9),
+        )
+        root.hosts_label.pack(side=tk.BOTTOM, fill=tk.X)
+        self.poll_hosts()
         # Create a notebook (tabbed interface) for system status
         root.system_notebook = ttk.Notebook(root.system_status)
         root.system_notebook.pack(expand=True, fill=tk.BOTH, padx=0, pady=0)
@@ -247,7 +311,7 @@ class AgentXSession:
         root.user_submit = tk.Button(
             root.user_input,
             text=enter_emoji_unicode,
-            command=lambda: self.stream_ollama_response_worker(),
+            command=lambda: self.stream_ollama_response(),
         )
         root.user_submit.place(relx=0.92, rely=0, relwidth=0.07, relheight=0.25)
 
@@ -255,21 +319,54 @@ class AgentXSession:
         root.user_break = tk.Button(
             root.user_input,
             text="❌",
-            command=interrupt_streaming,
+            command=self.interrupt_streaming,
             state=tk.DISABLED,
         )
         root.user_break.place(relx=0.92, rely=0.26, relwidth=0.07, relheight=0.25)
 
+        # Send the prompt to every model of fanout_models side by side
+        root.user_fanout = tk.Button(
+            root.user_input,
+            text="⇉",
+            command=lambda: self.fan_out_response(),
+        )
+        root.user_fanout.place(relx=0.92, rely=0.52, relwidth=0.07, relheight=0.22)
+
+        # Resume the last response if it was interrupted or failed mid-stream
+        root.user_continue = tk.Button(
+            root.user_input,
+            text="⏩",
+            command=lambda: self.continue_response(),
+        )
+        root.user_continue.place(relx=0.92, rely=0.76, relwidth=0.07, relheight=0.22)
+
         root.user_input.place(relx=0.001, rely=0.80, relwidth=1.0, relheight=0.2)
 
         # Bind Ctrl-Enter to trigger the user_submit button
         root.user_input_text.bind(
             "<Control-Return>", lambda event: root.user_submit.invoke()
         )
+        # Ctrl-Shift-Enter submits without replaying a cached response
+        root.user_input_text.bind(
+            "<Control-Shift-Return>",
+            lambda event: self.stream_ollama_response(bypass_cache=True) or "break",
+        )
+
+        # Alt-Right triggers the continue button
+        root.user_input_text.bind(
+            "<Alt-Right>", lambda event: self.continue_response() or "break"
+        )
+        # Alt-Enter triggers the fan-out button
+        root.user_input_text.bind(
+            "<Alt-Return>", lambda event: self.fan_out_response() or "break"
+        )
 
         # Bind Ctrl-Space globally to trigger the user_break button
         root.bind_all("<Control-space>", lambda event: root.user_break.invoke())
 
+        # Release the pooled Ollama connection when the window is closed
+        root.protocol("WM_DELETE_WINDOW", self.on_close)
+
         # Setup the Ollama client with the loaded configuration
         # Adds text styling tags to the output_text widget.
         root.output_text.tag_config(
@@ -292,197 +389,512 @@ class AgentXSession:
             root, text=enter_emoji_unicode, font=ctrl_enter_font
         )
 
-    def stream_ollama_response_worker(self):
+    def stream_ollama_response_worker(self, turn: Turn, stream_queue: queue.Queue):
         """
-        Worker function that streams the response from the Ollama server and updates the output_text widget.
-        This runs in a separate thread to keep the GUI responsive.
+        Worker function that streams the response from the Ollama server.
+        This runs in a separate thread and never touches Tk widgets; every chunk is
+        put on the turn's queue as a ``(channel, value)`` tuple and rendered by
+        ``pump_stream_queue`` on the Tk main thread.
+
+        :param turn: The turn to stream, with its request already snapshotted.
+        :param stream_queue: The turn's queue; a later turn gets a new one, so a
+            cancelled worker that stops late cannot leak into it.
         """
-        root = self.root
-        config = self.config
+        try:
+            # Wait for the background model load rather than blocking the whole app
+            self.warmup.result()
+        except Exception as e:
+            stream_queue.put(("error", e))
+            return
+        if turn.cancel.cancelled:
+            stream_queue.put(("cancelled", None))
+            return
+        self.engine.run_turn(turn, stream_queue.put)
 
-        global is_streaming  # Ensure we use the global is_streaming instance
-        is_streaming.set()
-        root.user_break.config(state=tk.NORMAL)  # Enable the break button
-        root.update_idletasks()
+    def pump_stream_queue(self):
+        """
+        Drains the stream queue on the Tk main thread and renders the chunks into
+        the output_text widget. Reschedules itself with ``root.after`` until the
+        worker reports that the stream is done.
+        """
+        root = self.root
+        agentx_config = self.config["agentx"]
+        batch_size = agentx_config.get("stream_batch_size", 256)
+        finished = False
+
+        for _ in range(batch_size):
+            try:
+                channel, value = self.stream_queue.get_nowait()
+            except queue.Empty:
+                break
+            if channel in ("done", "error", "cancelled"):
+                finished = True
+                self.handle_stream_end(channel, value)
+                break
+            self.handle_stream_chunk(channel, value)
+
+        if finished:
+            return
+        metrics = self.turn.metrics
+        if metrics.tokens:
+            self.set_status(
+                f"⚡ {metrics.tokens_per_second():.1f} tok/s · "
+                f"TTFT {metrics.ttft_ms():.0f} ms"
+            )
+        root.after(
+            agentx_config.get("stream_poll_interval_ms", 20), self.pump_stream_queue
+        )
 
-        # Load configuration
-        ollama_host = config["agentx"]["ollama_host"]
-        ollama_model = config["agentx"]["ollama_model"]
+    def handle_stream_chunk(self, channel: str, value: Any):
+        """
+        Renders one streamed chunk and accumulates it into the turn's messages.
 
-        # Get the prompt from the user_input_text widget
-        prompt = root.user_input_text.get("1.0", tk.END).strip()
-        if not prompt:
-            root.output_text.insert(tk.END, "No input provided.\n")
+        :param channel: The message field the chunk arrived on (e.g. "thinking").
+        :param value: The chunk value for that field.
+        """
+        if channel == "host":
+            self.set_status(f"🖧 Streaming from {value}")
             return
+        render = self.render
+        if channel != self.turn.last_channel:
+            match channel:
+                case "thinking":
+                    render.write(
+                        "\n", "system_space"
+                    )  # Add spacing between different channels
+                    render.write(
+                        f"(Agent is thinking...){self.cached_marker()}\n\n",
+                        "agent_thinking",
+                    )
+                case "content":
+                    render.write("\n", "agent_thinking")  # end of line for thinking
+                    render.write(
+                        "\n", "system_space"
+                    )  # Add spacing between different channels
+                    render.write(f"Agent{self.cached_marker()}:\n\n", "agent_response")
+                case _:
+                    pass  # For other channels, no special header
+        match channel:
+            case "thinking":
+                render.write(value, "agent_thinking")
+            case "content":
+                render.write(value, "agent_response")
+        self.engine.record_chunk(self.turn, channel, value)
+
+    def handle_stream_end(self, channel: str, value: Any):
+        """
+        Finalizes the turn once the worker has finished, failed or been cancelled.
 
-        # Display the user prompt in the output_text widget
-        root.user_input_text.delete("1.0", tk.END)  # Clear the user input text
-        root.output_text.insert(tk.END, f"User: {prompt}\n", ("user_prompt",))
-        root.output_text.see(tk.END)  # Auto-scroll to the end
-        root.update_idletasks()
-
-        try:
-            # Define the message payload
-            user_message = Message(role="user", content=prompt)
-            agent_thinking_message = Message(role="assistant", content="")
-            agent_thinking_message.enabled = False
-            agent_response_message = Message(role="assistant", content="")
-            self.add_message_to_context(user_message)
-            # Use the AsyncClient to stream responses
-            last_channel = ""
-            client = Client(host=f"http://{ollama_host}")
-            for part in client.chat(
-                model=ollama_model,
-                messages=[
-                    m[1].llm_message_dict()
-                    for m in self.context.messages
-                    if m[1].enabled
-                ],
-                stream=True,
-            ):
-                if not is_streaming.is_set():
-                    break  # Exit the loop if streaming is interrupted
-                # print(f"Received part: {part}")  # Debugging for received part
-                channels = [
-                    k
-                    for k, v in part.message.__dict__.items()
-                    if v and k not in ["role", ""]
-                ]
-                if channels:
-                    channel = channels[0]
-                    # print(f"Received channel: {channel}: {part.message[channel]}")  # Debugging for received channel
-                    if channel != last_channel:
-                        match channel:
-                            case "thinking":
-                                root.output_text.insert(
-                                    tk.END, "\n", ("system_space",)
-                                )  # Add spacing between different channels
-                                root.output_text.insert(
-                                    tk.END,
-                                    "(Agent is thinking...)\n\n",
-                                    ("agent_thinking",),
-                                )
-                                root.output_text.see(tk.END)  # Auto-scroll to the end
-                            case "content":
-                                self.add_message_to_context(agent_thinking_message)
-                                root.output_text.insert(
-                                    tk.END, "\n", ("agent_thinking",)
-                                )  # end of line for thinking
-                                root.output_text.insert(
-                                    tk.END, "\n", ("system_space",)
-                                )  # Add spacing between different channels
-                                root.output_text.insert(
-                                    tk.END, "Agent:\n\n", ("agent_response",)
-                                )
-                                root.update_idletasks()
-                            case _:
-                                pass  # For other channels, no special header
-                    match channel:
-                        case "thinking":
-                            # Handle agent thinking content
-                            root.output_text.insert(
-                                tk.END, part.message.thinking, ("agent_thinking",)
-                            )
-                            agent_thinking_message.content += part.message.thinking
-                            root.output_text.see(tk.END)  # Auto-scroll to the end
-                            last_channel = channel
-                        case "content":
-                            # Handle agent response content
-                            root.output_text.insert(
-                                tk.END, part.message.content, ("agent_response",)
-                            )
-                            agent_response_message.content += part.message.content
-                            root.output_text.see(tk.END)  # Auto-scroll to the end
-                            last_channel = channel
-                        case "tool_name":
-                            # Handle tool_name (currently pass)
-                            print(
-                                f"Tool name received: {part.message.tool_name}"
-                            )  # Debugging for tool_name
-                            last_channel = channel
-                        case "tool_calls":
-                            # Handle tool_calls (currently pass)
-                            print(
-                                f"Tool calls received: {part.message.tool_calls}"
-                            )  # Debugging for tool_calls
-                            last_channel = channel
-                        case "images":
-                            # Handle images (currently pass)
-                            print(
-                                f"Images received: {part.message.images}"
-                            )  # Debugging for images
-                            last_channel = channel
-                        case _:
-                            print(
-                                f"Unknown channel received: {channel}"
-                            )  # Debugging for unknown channels
-                            last_channel = channel
-                    root.update_idletasks()
+        :param channel: "done", "error" or "cancelled".
+        :param value: The exception for "error", otherwise None.
+        """
+        root = self.root
+        turn = self.turn
+        if channel == "error":
+            self.render.write(f"Error: {value}\n")
+        if channel == "error" and not turn.metrics.tokens:
+            pass  # Nothing arrived, so there is nothing to keep
+        else:
+            if channel == "cancelled":
+                self.render.write("\n[interrupted]", "gray")
             # After streaming is complete, add spacing
-            root.output_text.insert(
-                tk.END, "\n\n", ("system_space",)
+            self.render.write(
+                "\n\n", "system_space"
             )  # Add spacing between different channels
-            self.add_message_to_context(agent_response_message)
-            root.update_idletasks()
+            metrics = self.engine.finish_turn(turn)
+            if turn.continuation and self.session_tree:
+                self.session_tree.refresh_message(turn.response_message)
+            # Summarize turns that fell out of the window while the user reads
+            if self.compactor and self.compactor.schedule(self.context):
+                self.poll_compactions()
+            if channel == "cancelled":
+                self.set_status(
+                    f"⏹️ Interrupted after {metrics['tokens']} tokens · request "
+                    f"closed in {metrics['cancel_close_ms'] or 0:.0f} ms"
+                    " · ⏩ to continue"
+                )
+            elif channel == "error":
+                self.set_status(
+                    f"⚠️ Failed after {metrics['tokens']} tokens; kept as partial"
+                    " · ⏩ to continue"
+                )
+            elif turn.cache_hit:
+                self.set_status(
+                    "♻️ Replayed a cached response (Ctrl-Shift-Enter to regenerate)"
+                )
+            else:
+                self.set_status(
+                    f"✅ {metrics['tokens']} tokens · "
+                    f"{metrics['tokens_per_second']:.1f} tok/s"
+                    f" · TTFT {metrics['ttft_ms'] or 0:.0f} ms · {metrics['host']}"
+                )
+        self.render.flush()
+        self.streaming_thread = None
+        self.idle.set()
+        root.user_break.config(state=tk.DISABLED)  # Disable the break button
+
+    def cached_marker(self) -> str:
+        """
+        Suffix for the response headers of a turn replayed from the cache.
+        """
+        return " (cached)" if self.turn and self.turn.cache_hit else ""
 
-        except Exception as e:
-            import traceback
+    def warn_prefix_change(self, context: Context, message: Message):
+        """
+        Warns in the status line when toggling a message will change the prompt
+        prefix that Ollama has cached from the previous turn.
+
+        :param context: The context of the message being toggled.
+        :param message: The message about to be enabled or disabled.
+        """
+        if context is not self.context:
+            return
+        tokens = self.engine.request_builder.would_invalidate(message, context.messages)
+        if tokens:
+            self.set_status(
+                f"⚠️ This change invalidates the cached prompt prefix: "
+                f"~{tokens} tokens will be re-evaluated next turn"
+            )
 
-            root.output_text.insert(tk.END, f"Error: {e}\n")
-            print(f"Request error: {e}")
-            traceback.print_exc()
-        finally:
-            is_streaming.clear()
-            root.user_break.config(state=tk.DISABLED)  # Disable the break button
+    def poll_compactions(self):
+        """
+        Applies finished compaction summaries on the Tk thread, polling until the
+        queued jobs are done.
+        """
+        compactor = self.compactor
+        while not compactor.results.empty():
+            job = compactor.results.get_nowait()
+            summary = compactor.apply(job)
+            if summary is None:
+                continue
+            if self.session_tree:
+                for message in job.messages:
+                    self.session_tree.refresh_message(message)
+                self.session_tree.insert_message(job.context, summary)
+            self.set_status(
+                f"🗜️ Compacted {len(job.messages)} earlier messages into a summary"
+            )
+        if compactor.busy():
+            self.root.after(500, self.poll_compactions)
 
     def perform_service_handshake(self):
         """
         Performs a handshake with the Ollama server and ensures the model is loaded.
+        Loads it on the host the first turn will be routed to, trying the other
+        hosts of the pool if that fails, so the first chat turn reuses it.
+
+        :return: The host that loaded the model.
         """
-        config = self.config
-        ollama_host = config["agentx"]["ollama_host"]
-        ollama_model = config["agentx"]["ollama_model"]
-        timeout_seconds = config["agentx"].get(
+        timeout_seconds = self.config["agentx"].get(
             "ollama_initial_load_timeout_seconds", 120
         )
-
-        url = f"http://{ollama_host}/api/chat"
-        headers = {"Content-Type": "application/json"}
-        payload = {
-            "model": ollama_model,
-            "prompt": "",
-        }  # Empty prompt to trigger model load
-
         try:
-            with httpx.Client(timeout=timeout_seconds) as client:
-                response = client.post(url, json=payload, headers=headers)
-                response.raise_for_status()
-                print("Service handshake and model invocation successful.")
-        except httpx.RequestError as e:
+            state = self.pool.handshake(timeout_seconds)
+            print(f"Service handshake and model invocation on {state.host} successful.")
+            return state.host
+        except httpx.HTTPError as e:
             raise RuntimeError(
                 f"Failed to perform service handshake and model invocation: {e}"
             )
 
-    def stream_ollama_response(self):
+    def start_warmup(self):
+        """
+        Loads the model in the background while the GUI is already usable.
+        ``self.warmup`` resolves once the handshake finished; submitted prompts
+        wait on it in the streaming worker instead of the app waiting at startup.
+        """
+        future = Future()
+        started = time.perf_counter()
+        self.pool.start()  # Probe the hosts in the background from now on
+
+        def run():
+            try:
+                self.warm_host = self.perform_service_handshake()
+                future.set_result(time.perf_counter() - started)
+            except Exception as e:
+                # Always resolve the future, so prompts never wait on a dead
+                # warm-up and the next one retries it, see ensure_warmup
+                print(e)
+                future.set_exception(e)
+
+        self.warmup = future
+        threading.Thread(target=run, name="agentx-warmup", daemon=True).start()
+        self.poll_warmup(future, started)
+
+    def ensure_warmup(self):
+        """
+        Starts the warm-up if it never ran, or retries it if it failed.
+        """
+        if self.warmup is None or (
+            self.warmup.done() and self.warmup.exception() is not None
+        ):
+            self.start_warmup()
+
+    def poll_warmup(self, future: Future, started: float):
+        """
+        Shows the warm-up progress in the status line until the model is loaded.
+
+        :param future: The warm-up future being tracked.
+        :param started: ``time.perf_counter()`` when the warm-up started.
+        """
+        if future is not self.warmup:
+            return  # Superseded by a retry
+        model = self.connection.model
+        if not future.done():
+            elapsed = time.perf_counter() - started
+            self.set_status(f"⏳ Loading {model}… {elapsed:.0f}s")
+            self.root.after(500, self.poll_warmup, future, started)
+        elif future.exception() is not None:
+            self.set_status(f"⚠️ {model} failed to load: {future.exception()}")
+        else:
+            self.set_status(
+                f"✅ {model} ready on {self.warm_host} ({future.result():.1f}s)"
+            )
+
+    def poll_hosts(self):
+        """
+        Refreshes the host status line every two seconds with the pool's latest
+        probe results.
+        """
+        self.root.hosts_label.config(text=f"🖧 {self.pool.status()}")
+        self.root.after(2000, self.poll_hosts)
+
+    def set_status(self, text: str):
+        """
+        Updates the status line below the Session/Files notebook.
+
+        :param text: The status text to show.
+        """
+        if hasattr(self.root, "status_label"):
+            self.root.status_label.config(text=text)
+
+    def report_first_paint(self, started: float):
+        """
+        Prints the time from process start to the first painted window.
+
+        :param started: ``time.perf_counter()`` taken before the Tk root was created.
+        """
+        root = self.root
+
+        def on_idle():
+            self.first_paint_ms = (time.perf_counter() - started) * 1000
+            print(f"First paint after {self.first_paint_ms:.0f} ms")
+
+        def on_map(event):
+            if event.widget is not root:
+                return
+            root.unbind("<Map>")
+            # Redraws are idle callbacks queued by the map, so this runs after them
+            root.after_idle(on_idle)
+
+        root.bind("<Map>", on_map)
+
+    def on_close(self):
+        """
+        Handles the window close: stops any stream, writes the queued saves and
+        releases the connection pool.
+        """
+        self.interrupt_streaming()
+        if self.compactor:
+            self.compactor.stop()
+        self.engine.close()
+        self.pool.close()
+        self.root.destroy()
+
+    def stream_ollama_response(self, bypass_cache: bool = False):
         """
         Initiates streaming response in a separate thread to keep the GUI responsive.
+        Reads the prompt and records it on the Tk main thread, then hands a snapshot
+        of the enabled context to ``stream_ollama_response_worker``. With the
+        response cache enabled, an identical earlier request is replayed instead.
+
+        :param bypass_cache: Always ask the model; the fresh response replaces
+            any cached one.
         """
-        global streaming_thread
         root = self.root
-        config = self.config
-        if streaming_thread and streaming_thread.is_alive():
+        if not self.idle.is_set():
+            print("Streaming already in progress")
+            return
+
+        # Get the prompt from the user_input_text widget
+        prompt = root.user_input_text.get("1.0", tk.END).strip()
+        if not prompt:
+            self.render.write("No input provided.\n")
+            self.render.flush()
+            return
+
+        # Display the user prompt in the output_text widget
+        root.user_input_text.delete("1.0", tk.END)  # Clear the user input text
+        self.render.write(f"User: {prompt}\n", "user_prompt")
+        self.render.flush()
+
+        self.ensure_warmup()
+
+        # Record the prompt and snapshot the request on the Tk thread
+        self.start_turn(self.engine.begin_turn(prompt, bypass_cache))
+
+    def continue_response(self):
+        """
+        Resumes the last response after it was interrupted or failed mid-stream:
+        its partial text is sent as a prefill, and the remainder streams into
+        the same message.
+        """
+        if not self.idle.is_set():
+            print("Streaming already in progress")
+            return
+        turn = self.engine.begin_continue()
+        if turn is None:
+            self.set_status("⏩ The last response is complete; nothing to continue")
+            return
+        # The remainder follows the partial text shown above, without a header
+        self.render.write("[continuing]\n", "gray")
+        self.render.flush()
+        self.ensure_warmup()
+        self.start_turn(turn)
+
+    def start_turn(self, turn: Turn):
+        """
+        Streams a turn from ``begin_turn`` or ``begin_continue`` on a worker
+        thread, or replays it from the response cache.
+
+        :param turn: The turn to stream.
+        """
+        root = self.root
+        self.turn = turn
+        self.idle.clear()
+        self.stream_queue = queue.Queue()
+        if self.turn.cache_hit:
+            # Replayed through the queue so it renders like a streamed response
+            self.engine.run_turn(self.turn, self.stream_queue.put)
+            self.pump_stream_queue()
+            return
+        root.user_break.config(state=tk.NORMAL)  # Enable the break button
+        self.streaming_thread = threading.Thread(
+            target=self.stream_ollama_response_worker,
+            args=(self.turn, self.stream_queue),
+            daemon=True,
+        )
+        self.streaming_thread.start()
+        self.pump_stream_queue()
+
+    def interrupt_streaming(self):
+        """
+        Cancels the turn being streamed: its HTTP request is aborted and the turn
+        ends with the partial response kept and marked as interrupted.
+        """
+        grace_ms = self.config["agentx"].get("cancel_grace_ms", 250)
+        if self.fanout and not self.fanout.done:
+            print("Interrupting fan-out...")
+            self.fanout.cancel()
+            self.root.after(grace_ms, self.fanout.force_cancel)
+            return
+        turn = self.turn
+        if turn is None or self.idle.is_set():
+            return
+        print("Interrupting streaming...")
+        turn.cancel.cancel()
+        # A worker still waiting for response headers on a reused connection
+        # only notices once they arrive; do not keep the user waiting for it
+        self.root.after(grace_ms, self.force_cancel, turn, self.stream_queue)
+
+    def force_cancel(self, turn: Turn, stream_queue: queue.Queue):
+        """
+        Ends a cancelled turn whose worker has not stopped yet.
+
+        :param turn: The cancelled turn.
+        :param stream_queue: The turn's queue.
+        """
+        if turn is self.turn and not self.idle.is_set():
+            stream_queue.put(("cancelled", None))
+
+    def fan_out_response(self, bypass_cache: bool = False):
+        """
+        Sends the prompt with the current context to every target of
+        ``fanout_models`` at once, e.g. ``["gpt-oss", "llama3.2@peters02:11434"]``.
+        Each answer streams into its own output tab with its TTFT and tokens per
+        second; none enters the context until the user keeps one.
+
+        :param bypass_cache: Always ask the models.
+        """
+        root = self.root
+        agentx_config = self.config["agentx"]
+        if not self.idle.is_set():
             print("Streaming already in progress")
             return
-        streaming_thread = threading.Thread(
-            target=self.stream_ollama_response_worker, args=(root, config), daemon=False
+        targets = agentx_config.get("fanout_models") or []
+        if not targets:
+            self.set_status("⇉ Set fanout_models in agentx.toml to compare models")
+            return
+        prompt = root.user_input_text.get("1.0", tk.END).strip()
+        if not prompt:
+            self.render.write("No input provided.\n")
+            self.render.flush()
+            return
+
+        root.user_input_text.delete("1.0", tk.END)
+        self.render.write(f"User: {prompt}\n", "user_prompt")
+        self.render.flush()
+        if self.fanout:
+            self.fanout.destroy()  # Only the latest comparison keeps its tabs
+
+        self.ensure_warmup()
+        turns = self.engine.begin_fanout(prompt, targets, bypass_cache)
+        self.idle.clear()
+        root.user_break.config(state=tk.NORMAL)
+        self.fanout = FanOut(
+            self.engine,
+            root.output_notebook,
+            turns,
+            agentx_config.get("render_frame_ms", 16),
+            agentx_config.get("stream_poll_interval_ms", 20),
         )
-        streaming_thread.start()
+        self.fanout.on_finished = self.handle_fanout_end
+        self.fanout.on_keep = self.keep_fanout_answer
+        root.output_notebook.select(self.fanout.tabs[0])
+        self.set_status(f"⇉ Asking {len(turns)} models…")
+        self.fanout.start(before_run=self.wait_for_warmup)
 
+    def wait_for_warmup(self, turn: Turn):
+        """
+        Lets a fan-out worker wait for the background model load, so its request
+        does not race the handshake for the same host.
 
-def interrupt_streaming():
-    """
-    Interrupts the ongoing streaming process.
-    """
-    global is_streaming
-    print("Interrupting streaming...")
-    is_streaming.clear()
+        :param turn: The turn about to stream.
+        """
+        try:
+            self.warmup.result()
+        except Exception:
+            pass  # The turn reports its own failure if the host is unusable
+
+    def handle_fanout_end(self, fanout: FanOut):
+        """
+        Summarizes a finished fan-out in the status line.
+
+        :param fanout: The fan-out whose turns have all ended.
+        """
+        rates = []
+        for index, turn in enumerate(fanout.turns):
+            result = fanout.finished[index]
+            if isinstance(result, Exception):
+                rates.append(f"{turn.model} ⚠️")
+            else:
+                rates.append(f"{turn.model} {result['tokens_per_second']:.1f} tok/s")
+        self.set_status("⇉ " + " · ".join(rates) + " · keep one answer")
+        self.idle.set()
+        self.root.user_break.config(state=tk.DISABLED)
+
+    def keep_fanout_answer(self, turn: Turn):
+        """
+        Shows the kept fan-out answer in the Output tab, after its prompt.
+
+        :param turn: The turn the user kept.
+        """
+        if turn.response_message.content:
+            self.render.write(f"Agent ({turn.model}):\n\n", "agent_response")
+            self.render.write(turn.response_message.content, "agent_response")
+            self.render.write("\n\n", "system_space")
+            self.render.flush()
+        self.root.output_notebook.select(self.root.output_tab)
+        self.set_status(f"★ Kept the answer of {turn.model} on {turn.host}")
+        if self.compactor and self.compactor.schedule(self.context):
+            self.poll_compactions()
@@ -0,0 +1,330 @@
+"""
+Docstring for agentx.session_tree
+"""
+
+import threading
+import tkinter as tk
+from concurrent.futures import CancelledError
+from tkinter import ttk
+from typing import Callable
+
+from .cancellation import CancelToken
+from .context import Context
+from .history import History
+from .message import Message
+
+ROLE_ICONS = {
+    "user": "👤",
+    "assistant": "🤖",
+    "system": "⚙️",
+}
+ENABLED_MARKS = {
+    True: "☑",
+    False: "☐",
+}
+PLACEHOLDER = "…"  # Child shown under a node until it is opened
+LOADING = "⏳ Loading…"  # Child shown while a session's messages are read
+
+
+class SessionTree:
+    """
+    The Session tab: the user's history and the current context in a single
+    virtualized ttk.Treeview.
+
+    Example:
+    ▼ {user} History (2 contexts)
+        ▶ session_2026-01-30_16-52-43 (4 messages)  How do I...
+        ▼ session_2026-02-02_09-10-11 (2 messages)  Explain...
+            ☑  👤  Explain the difference between...
+            ☐  🤖  (thinking trace)
+    ▼ session_2026-02-03_10-00-00 (2 messages)    # current context
+
+    Collapsed nodes only hold a placeholder child; their real children are
+    created on ``<<TreeviewOpen>>``, in chunks, so neither thousands of past
+    sessions nor a 100k-message session create widgets up front. A past
+    session's messages are read on a worker thread when it is first opened;
+    collapsing it, or the history, before they are read cancels the load.
+    Clicking the ☑/☐ column toggles whether a message is sent to the model.
+    """
+
+    def __init__(
+        self,
+        user: str,
+        history: History,
+        context: Context,
+        on_toggle: Callable[[Context, Message], None] | None = None,
+    ):
+        """
+        SessionTree
+
+        :param user: The user name shown on the history node.
+        :param history: The user's past sessions.
+        :param context: The current session context.
+        :param on_toggle: Called with the context and message just before a
+            message's enabled flag is toggled.
+        """
+        self.user = user
+        self.history = history
+        self.context = context
+        self.on_toggle = on_toggle
+        self.chunk_size = 500  # Rows inserted per event-loop turn
+        self._messages: dict[str, Message] = {}  # Row iid -> message
+        self._rows: dict[int, str] = {}  # id(message) -> row iid
+        self._contexts: dict[str, Context] = {}  # Node iid -> context
+        self._context_nodes: dict[int, str] = {}  # id(context) -> node iid
+        self._populated: set[str] = set()  # Nodes whose children exist
+        self._loading: dict[str, CancelToken] = {}  # Node iid -> running load
+        self._history_node = ""
+        self.tree: ttk.Treeview | None = None
+
+    def to_gui(self, parent_frame: tk.Frame) -> tk.Frame:
+        """
+        Create the Session tab frame.
+
+        :param parent_frame: The parent Tkinter frame to attach the tree to.
+        :return: A Tkinter frame containing the tree and its scrollbar.
+        """
+        frame = tk.Frame(parent_frame)
+        vsb = ttk.Scrollbar(frame, orient=tk.VERTICAL)
+        self.tree = ttk.Treeview(
+            frame,
+            columns=("enabled",),
+            yscrollcommand=vsb.set,
+            selectmode="browse",
+        )
+        vsb.config(command=self.tree.yview)
+
+        self.tree.column("#0", width=360, minwidth=150, stretch=True)
+        self.tree.column(
+            "enabled", width=30, minwidth=30, stretch=False, anchor=tk.CENTER
+        )
+        self.tree.heading("#0", text="Session", anchor=tk.W)
+        self.tree.heading("enabled", text="✓")
+
+        self.tree.bind("<<TreeviewOpen>>", self._on_open)
+        self.tree.bind("<<TreeviewClose>>", self._on_close)
+        self.tree.bind("<Button-1>", self._on_click)
+
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        vsb.grid(row=0, column=1, sticky="ns")
+        frame.grid_rowconfigure(0, weight=1)
+        frame.grid_columnconfigure(0, weight=1)
+
+        self._history_node = self.tree.insert(
+            "",
+            "end",
+            text=f"{self.user} History ({len(self.history.sessions)} contexts)",
+            open=False,
+        )
+        if self.history.sessions:
+            self.tree.insert(self._history_node, "end", text=PLACEHOLDER)
+        self._insert_context("", self.context)
+        return frame
+
+    def _insert_context(self, parent: str, context: Context) -> str:
+        """
+        Insert a context node; its messages follow immediately if it is expanded.
+        """
+        iid = self.tree.insert(
+            parent, "end", text=context.gui_label(), open=context.expanded
+        )
+        self._contexts[iid] = context
+        self._context_nodes[id(context)] = iid
+        if context.expanded:
+            self._populate(iid)
+        elif context.message_count:
+            self.tree.insert(iid, "end", text=PLACEHOLDER)
+        return iid
+
+    def _insert_message(self, parent: str, message: Message, index="end") -> str:
+        """
+        Insert one message row and its attachment rows.
+        """
+        iid = self.tree.insert(
+            parent,
+            index,
+            text=f"{ROLE_ICONS.get(message.role, '⚙️')}  {message.preview()}",
+            values=(ENABLED_MARKS[message.enabled],),
+        )
+        self._messages[iid] = message
+        self._rows[id(message)] = iid
+        for att in message.attachments:
+            self.tree.insert(iid, "end", text=f"📁  {att.split('/')[-1]}")
+        return iid
+
+    def _populate(self, iid: str):
+        """
+        Replace a node's placeholder with its real children.
+        """
+        if iid in self._populated:
+            return
+        self._populated.add(iid)
+        self.tree.delete(*self.tree.get_children(iid))
+        if iid == self._history_node:
+            self._insert_in_chunks(iid, self.history.sessions, self._insert_context)
+            return
+        context = self._contexts[iid]
+        if context.loaded:
+            self._insert_messages(iid, context)
+            return
+        self.tree.insert(iid, "end", text=LOADING)
+        cancel = CancelToken()
+        self._loading[iid] = cancel
+        finished = threading.Event()
+
+        def load():
+            try:
+                context.ensure_loaded(cancel)
+            except CancelledError:
+                pass
+            except OSError as e:
+                print(f"Could not load {context.session_id}: {e}")
+            finally:
+                finished.set()
+
+        threading.Thread(target=load, name="agentx-load", daemon=True).start()
+        self._wait_for_load(iid, context, cancel, finished)
+
+    def _wait_for_load(
+        self,
+        iid: str,
+        context: Context,
+        cancel: CancelToken,
+        finished: threading.Event,
+    ):
+        """
+        Poll a background load from the Tk main thread and show the messages
+        once they are read.
+        """
+        if not finished.is_set():
+            self.tree.after(20, self._wait_for_load, iid, context, cancel, finished)
+            return
+        if self._loading.get(iid) is cancel:
+            del self._loading[iid]
+        if cancel.cancelled or not self.tree.exists(iid):
+            return  # Collapsed meanwhile; _cancel_load reset the node
+        self.tree.delete(*self.tree.get_children(iid))
+        if context.loaded:
+            self._insert_messages(iid, context)
+        else:
+            self._populated.discard(iid)  # Failed; try again on the next open
+            self.tree.insert(iid, "end", text=PLACEHOLDER)
+
+    def _insert_messages(self, iid: str, context: Context):
+        self.tree.item(iid, text=context.gui_label())
+        self._insert_in_chunks(
+            iid, [m for ts, m in context.messages], self._insert_message
+        )
+
+    def _cancel_load(self, iid: str):
+        """
+        Cancel a node's running load and put its placeholder back.
+        """
+        cancel = self._loading.pop(iid, None)
+        if cancel is None:
+            return
+        cancel.cancel()
+        self._populated.discard(iid)
+        if self.tree.exists(iid):
+            self.tree.delete(*self.tree.get_children(iid))
+            self.tree.insert(iid, "end", text=PLACEHOLDER)
+
+    def _insert_in_chunks(self, parent: str, items: list, insert, start: int = 0):
+        """
+        Insert rows ``chunk_size`` at a time, yielding to the event loop between
+        chunks so opening a very large node never freezes the window.
+        """
+        if not self.tree.exists(parent):
+            return
+        end = min(start + self.chunk_size, len(items))
+        for item in items[start:end]:
+            insert(parent, item)
+        if end < len(items):
+            self.tree.after(1, self._insert_in_chunks, parent, items, insert, end)
+
+    def _on_open(self, event):
+        iid = self.tree.focus()
+        if not iid:
+            return
+        if iid in self._contexts:
+            self._contexts[iid].expanded = True
+        if iid == self._history_node or iid in self._contexts:
+            self._populate(iid)
+
+    def _on_close(self, event):
+        iid = self.tree.focus()
+        if iid in self._contexts:
+            self._contexts[iid].expanded = False
+        # Collapsing a session, or the history holding it, stops its load
+        for loading in list(self._loading):
+            if iid in (loading, self.tree.parent(loading)):
+                self._cancel_load(loading)
+        # and closes the files its hidden rows read their previews from
+        if iid == self._history_node:
+            for context in self.history.sessions:
+                context.close_readers()
+        elif iid in self._contexts:
+            self._contexts[iid].close_readers()
+
+    def _on_click(self, event):
+        """
+        Toggle a message's enabled flag when its ☑/☐ cell is clicked.
+        """
+        if self.tree.identify_column(event.x) != "#1":
+            return
+        iid = self.tree.identify_row(event.y)
+        message = self._messages.get(iid)
+        if message is None:
+            return
+        context = self._contexts[self.tree.parent(iid)]
+        if self.on_toggle:
+            self.on_toggle(context, message)
+        context.set_enabled(message, not message.enabled)
+        self.tree.set(iid, "enabled", ENABLED_MARKS[message.enabled])
+
+    def append_message(self, context: Context, message: Message) -> bool:
+        """
+        Add the row for a message just appended to a context and update the
+        context's header in place, instead of re-rendering the tree.
+
+        :param context: The context the message was appended to.
+        :param message: The message that was appended last.
+        :return: False if the context is not shown in this tree.
+        """
+        iid = self._context_nodes.get(id(context))
+        if iid is None or self.tree is None or not self.tree.exists(iid):
+            return False
+        self.tree.item(iid, text=context.gui_label())
+        if iid in self._populated:
+            self.tree.see(self._insert_message(iid, message))
+        elif not self.tree.get_children(iid):
+            self.tree.insert(iid, "end", text=PLACEHOLDER)
+        return True
+
+    def refresh_message(self, message: Message):
+        """
+        Update a message row's ☑/☐ mark after its enabled flag changed.
+
+        :param message: The message whose row to update.
+        """
+        iid = self._rows.get(id(message))
+        if iid is not None and self.tree.exists(iid):
+            self.tree.set(iid, "enabled", ENABLED_MARKS[message.enabled])
+
+    def insert_message(self, context: Context, message: Message):
+        """
+        Add the row for a message inserted in the middle of a context, such as a
+        compaction summary, at its position in the context.
+
+        :param context: The context the message was inserted into.
+        :param message: The inserted message.
+        """
+        iid = self._context_nodes.get(id(context))
+        if iid is None or self.tree is None or not self.tree.exists(iid):
+            return
+        self.tree.item(iid, text=context.gui_label())
+        if iid in self._populated:
+            index = next(
+                idx for idx, (ts, m) in enumerate(context.messages) if m is message
+            )
+            self._insert_message(iid, message, index)
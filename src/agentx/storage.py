@@ -0,0 +1,601 @@
+"""
+Docstring for agentx.storage
+
+Append-only session log.
+
+Each context folder holds numbered JSONL segments (``messages.00000.jsonl``, ...)
+and a fixed-width binary index (``messages.idx``). Every append writes one JSON
+line to the active segment and one index record describing where it landed, so a
+message can be found with a single seek instead of a directory scan. Updates to
+an existing message (e.g. toggling ``enabled``) append a new record with the same
+sequence number; the latest record wins.
+"""
+
+import json
+import os
+import struct
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from glob import glob
+from typing import Any, Iterator
+
+from .cancellation import CancelToken
+from .ndjson import loads
+
+HISTORY_INDEX_FILE = "history_index.jsonl"
+PREVIEW_CHARS = 40
+
+SEGMENT_PATTERN = "messages.{:05d}.jsonl"
+INDEX_FILE = "messages.idx"
+
+# seq, segment, offset, length, epoch, role code, flags
+INDEX_RECORD = struct.Struct("<IIQIdBB")
+FLAG_ENABLED = 0x01
+
+# Records are read and decoded on a shared pool, READ_BATCH records per task;
+# os.pread and orjson release the GIL, so cold reads from slow disks overlap
+READ_WORKERS = min(8, (os.cpu_count() or 1) + 4)
+READ_BATCH = 256
+READ_AHEAD = 2 * READ_WORKERS  # Batches in flight; bounds the decoded records held
+
+ROLE_CODES = {"user": 0, "assistant": 1, "system": 2, "tool": 3}
+ROLE_NAMES = {code: role for role, code in ROLE_CODES.items()}
+UNKNOWN_ROLE = 0xFF
+
+
+_read_pool: ThreadPoolExecutor | None = None
+_read_pool_lock = threading.Lock()
+
+
+def read_pool() -> ThreadPoolExecutor:
+    """
+    The thread pool session logs are read on, started on first use.
+    """
+    global _read_pool
+    with _read_pool_lock:
+        if _read_pool is None:
+            _read_pool = ThreadPoolExecutor(READ_WORKERS, "agentx-read")
+        return _read_pool
+
+
+class IndexEntry:
+    """
+    One decoded index record.
+    """
+
+    __slots__ = ("seq", "segment", "offset", "length", "epoch", "role", "enabled")
+
+    def __init__(self, seq, segment, offset, length, epoch, role_code, flags):
+        self.seq = seq
+        self.segment = segment
+        self.offset = offset
+        self.length = length
+        self.epoch = epoch
+        self.role = ROLE_NAMES.get(role_code)  # None when the role is not indexed
+        self.enabled = bool(flags & FLAG_ENABLED)
+
+
+class SessionLog:
+    """
+    Append-only, segmented message log for one context folder.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        segment_max_bytes: int = 16 * 1024 * 1024,
+        fsync_every: int = 16,
+        fsync_interval_seconds: float = 1.0,
+    ):
+        """
+        SessionLog
+
+        :param path: The context folder holding the segments and index.
+        :param segment_max_bytes: Size after which a new segment is started.
+        :param fsync_every: Appends allowed between fsyncs.
+        :param fsync_interval_seconds: Longest time an append may stay unsynced.
+        """
+        self.path = path
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_every = fsync_every
+        self.fsync_interval_seconds = fsync_interval_seconds
+        self._lock = threading.RLock()
+        self._entries: list[IndexEntry] | None = None  # All index records, in order
+        self._latest: dict[int, IndexEntry] = {}  # seq -> latest record
+        self._writer = None  # Active segment, opened on first append
+        self._index_writer = None
+        self._readers: dict[int, int] = {}  # segment -> read fd
+        self._reads: dict[int, int] = {}  # fd -> reads in progress
+        self._retired: set[int] = set()  # fds closed while a read was using them
+        self._segment = 0
+        self._next_seq = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.path, INDEX_FILE)
+
+    def segment_path(self, segment: int) -> str:
+        """
+        :param segment: The segment number.
+        :return: The path of that segment's JSONL file.
+        """
+        return os.path.join(self.path, SEGMENT_PATTERN.format(segment))
+
+    def exists(self) -> bool:
+        """
+        :return: True if the log has been written to at least once.
+        """
+        return os.path.exists(self.index_path) or os.path.exists(self.segment_path(0))
+
+    def _load_index(self):
+        """
+        Read the index into memory, repairing it against the segments if the last
+        write was torn.
+        """
+        if self._entries is not None:
+            return
+        entries = []
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                data = f.read()
+            usable = len(data) - len(data) % INDEX_RECORD.size
+            if usable < len(data):
+                # Torn last record: cut it off so later appends stay aligned
+                with open(self.index_path, "r+b") as f:
+                    f.truncate(usable)
+            entries = [
+                IndexEntry(*fields)
+                for fields in INDEX_RECORD.iter_unpack(memoryview(data)[:usable])
+            ]
+        self._entries = entries
+        self._latest = {}
+        for entry in entries:
+            self._latest[entry.seq] = entry
+        self._next_seq = max(self._latest) + 1 if self._latest else 0
+        segments = sorted(
+            int(os.path.basename(p).split(".")[1])
+            for p in glob(os.path.join(self.path, "messages.*.jsonl"))
+        )
+        self._segment = segments[-1] if segments else 0
+        self._recover_tail()
+
+    def _recover_tail(self):
+        """
+        Index any complete lines that reached the active segment without their
+        index record, and drop a partially written trailing line.
+        """
+        segment_path = self.segment_path(self._segment)
+        if not os.path.exists(segment_path):
+            return
+        indexed_end = 0
+        for entry in reversed(self._entries):
+            if entry.segment == self._segment:
+                indexed_end = entry.offset + entry.length
+                break
+        size = os.path.getsize(segment_path)
+        if size < indexed_end:
+            # The index outlived its segment data (lost write): forget those records
+            self._entries = [
+                e
+                for e in self._entries
+                if e.segment != self._segment or e.offset + e.length <= size
+            ]
+            with open(self.index_path, "wb") as f:
+                f.write(b"".join(self._pack(e) for e in self._entries))
+            self._latest = {e.seq: e for e in self._entries}
+            self._next_seq = max(self._latest) + 1 if self._latest else 0
+            return
+        if size == indexed_end:
+            return
+        with open(segment_path, "rb") as f:
+            f.seek(indexed_end)
+            tail = f.read()
+        offset = indexed_end
+        recovered = []
+        for line in tail.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            recovered.append(self._entry_for(record, self._segment, offset, len(line)))
+            offset += len(line)
+        if offset < size:
+            with open(segment_path, "r+b") as f:
+                f.truncate(offset)
+        if recovered:
+            with open(self.index_path, "ab") as f:
+                for entry in recovered:
+                    f.write(self._pack(entry))
+            for entry in recovered:
+                self._entries.append(entry)
+                self._latest[entry.seq] = entry
+                self._next_seq = max(self._next_seq, entry.seq + 1)
+
+    @staticmethod
+    def _entry_for(record: dict, segment: int, offset: int, length: int):
+        flags = FLAG_ENABLED if record.get("enabled", True) else 0
+        return IndexEntry(
+            record["seq"],
+            segment,
+            offset,
+            length,
+            float(record.get("epoch") or 0.0),
+            ROLE_CODES.get(record.get("role"), UNKNOWN_ROLE),
+            flags,
+        )
+
+    @staticmethod
+    def _pack(entry: IndexEntry) -> bytes:
+        return INDEX_RECORD.pack(
+            entry.seq,
+            entry.segment,
+            entry.offset,
+            entry.length,
+            entry.epoch,
+            ROLE_CODES.get(entry.role, UNKNOWN_ROLE),
+            FLAG_ENABLED if entry.enabled else 0,
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._load_index()
+            return len(self._latest)
+
+    def next_seq(self) -> int:
+        """
+        :return: The sequence number the next new message will get.
+        """
+        with self._lock:
+            self._load_index()
+            return self._next_seq
+
+    def reserve_seq(self) -> int:
+        """
+        Hand out the next sequence number ahead of the append that uses it, so a
+        message can be written later, e.g. by a background writer.
+
+        :return: The reserved sequence number.
+        """
+        with self._lock:
+            self._load_index()
+            seq = self._next_seq
+            self._next_seq += 1
+            return seq
+
+    def append(self, record: dict[str, Any]) -> IndexEntry:
+        """
+        Append a record. Records without a ``seq`` get the next sequence number;
+        records with an existing ``seq`` supersede the earlier version.
+
+        :param record: The serialized message.
+        :return: The index entry describing where the record was written.
+        """
+        with self._lock:
+            self._load_index()
+            if record.get("seq") is None:
+                record["seq"] = self.next_seq()
+            line = (json.dumps(record) + "\n").encode("utf-8")
+            self._open_writers(len(line))
+            offset = self._writer.tell()
+            self._writer.write(line)
+            self._writer.flush()
+            entry = self._entry_for(record, self._segment, offset, len(line))
+            self._index_writer.write(self._pack(entry))
+            self._index_writer.flush()
+            self._entries.append(entry)
+            self._latest[entry.seq] = entry
+            self._next_seq = max(self._next_seq, entry.seq + 1)
+            self._unsynced += 1
+            if (
+                self._unsynced >= self.fsync_every
+                or time.monotonic() - self._last_sync >= self.fsync_interval_seconds
+            ):
+                self.sync()
+            return entry
+
+    def _open_writers(self, incoming: int):
+        """
+        Open the active segment for appending, rolling to a new segment when the
+        current one would grow past ``segment_max_bytes``.
+        """
+        if self._writer is None:
+            self._writer = open(self.segment_path(self._segment), "ab")
+        size = self._writer.tell()
+        if size > 0 and size + incoming > self.segment_max_bytes:
+            self.sync()
+            self._writer.close()
+            self._segment += 1
+            self._writer = open(self.segment_path(self._segment), "ab")
+        if self._index_writer is None:
+            self._index_writer = open(self.index_path, "ab")
+
+    def sync(self):
+        """
+        fsync the active segment and the index.
+        """
+        with self._lock:
+            for f in (self._writer, self._index_writer):
+                if f is not None:
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def size_bytes(self) -> int:
+        """
+        :return: The bytes used by the segments and the index on disk.
+        """
+        with self._lock:
+            self._load_index()
+            paths = [self.segment_path(n) for n in range(self._segment + 1)]
+            paths.append(self.index_path)
+            return sum(os.path.getsize(p) for p in paths if os.path.exists(p))
+
+    def entries(self) -> list[IndexEntry]:
+        """
+        :return: The latest index entry of every message, in sequence order.
+        """
+        with self._lock:
+            self._load_index()
+            return [self._latest[seq] for seq in sorted(self._latest)]
+
+    def read(self, entry: IndexEntry) -> dict[str, Any]:
+        """
+        Read and decode the record an index entry points to.
+
+        :param entry: The entry returned by ``entries`` or ``append``.
+        """
+        return loads(self.read_bytes(entry))
+
+    def iter_many(
+        self, entries: list[IndexEntry], cancel: CancelToken | None = None
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Read and decode many records on the read pool, up to ``READ_AHEAD``
+        batches ahead of the caller, so only those are held at once.
+
+        :param entries: The entries to read.
+        :param cancel: Stops the read between batches when cancelled.
+        :return: The records, in the order of ``entries``.
+        :raises concurrent.futures.CancelledError: If cancelled before the end.
+        """
+        batches = deque(
+            entries[start : start + READ_BATCH]
+            for start in range(0, len(entries), READ_BATCH)
+        )
+        if len(batches) <= 1:
+            yield from self._read_batch(entries, cancel)
+            return
+        pool = read_pool()
+        ahead = deque()
+        try:
+            while batches or ahead:
+                while batches and len(ahead) < READ_AHEAD:
+                    ahead.append(
+                        pool.submit(self._read_batch, batches.popleft(), cancel)
+                    )
+                yield from ahead.popleft().result()
+        finally:
+            for future in ahead:
+                future.cancel()
+
+    def _read_batch(
+        self, entries: list[IndexEntry], cancel: CancelToken | None
+    ) -> list[dict[str, Any]]:
+        if cancel is not None and cancel.cancelled:
+            raise CancelledError(f"Cancelled reading {self.path}")
+        return [loads(self.read_bytes(entry)) for entry in entries]
+
+    def read_bytes(self, entry: IndexEntry) -> bytes:
+        """
+        Read the raw JSON line an index entry points to.
+
+        :param entry: The entry returned by ``entries`` or ``append``.
+        """
+        with self._lock:
+            fd = self._readers.get(entry.segment)
+            if fd is None:
+                fd = os.open(self.segment_path(entry.segment), os.O_RDONLY)
+                self._readers[entry.segment] = fd
+            self._reads[fd] = self._reads.get(fd, 0) + 1
+        try:
+            # Outside the lock so reads overlap; close_readers defers closing fd
+            return os.pread(fd, entry.length, entry.offset)
+        finally:
+            with self._lock:
+                self._reads[fd] -= 1
+                if not self._reads[fd]:
+                    del self._reads[fd]
+                    if fd in self._retired:
+                        self._retired.discard(fd)
+                        os.close(fd)
+
+    def iter_records(self) -> Iterator[dict[str, Any]]:
+        """
+        Lazily yield the latest record of every message in sequence order.
+        """
+        for entry in self.entries():
+            yield self.read(entry)
+
+    def close(self):
+        """
+        Sync and close all open files.
+        """
+        with self._lock:
+            if self._writer is not None or self._index_writer is not None:
+                self.sync()
+            for f in (self._writer, self._index_writer):
+                if f is not None:
+                    f.close()
+            self._writer = None
+            self._index_writer = None
+            self.close_readers()
+
+    def close_readers(self):
+        """
+        Close the segments opened for reading; the next read opens them again.
+        A segment still being read is closed when its last read finishes.
+        """
+        with self._lock:
+            for fd in self._readers.values():
+                if fd in self._reads:
+                    self._retired.add(fd)
+                else:
+                    os.close(fd)
+            self._readers = {}
+
+
+def legacy_message_files(context_path: str) -> list[str]:
+    """
+    :param context_path: A context folder.
+    :return: The per-message ``{timestamp}_{role}.json`` files in it, sorted.
+    """
+    files = glob(os.path.join(context_path, "*.json"))
+    files.sort()
+    return files
+
+
+def migrate_legacy_context(context_path: str, log: SessionLog | None = None) -> int:
+    """
+    Move a context folder from one JSON file per message into the session log.
+
+    Safe to re-run after an interruption: files already copied into the log are
+    recognized by their ``migrated_from`` name and skipped. The legacy files are
+    only removed after the log has been fsynced.
+
+    :param context_path: The context folder to migrate.
+    :param log: An already open log for the folder, if the caller has one.
+    :return: The number of messages migrated.
+    """
+    files = legacy_message_files(context_path)
+    if not files:
+        return 0
+    own_log = log is None
+    if own_log:
+        log = SessionLog(context_path)
+    already = set()
+    if len(log):
+        already = {r.get("migrated_from") for r in log.iter_records()}
+    migrated = 0
+    for message_file in files:
+        name = os.path.basename(message_file)
+        if name in already:
+            continue
+        with open(message_file, "r", encoding="utf-8") as f:
+            record = json.loads(f.read())
+        if not record.get("epoch"):
+            # Legacy files carry their timestamp in the file name only
+            try:
+                record["epoch"] = float(name.split("_", 1)[0])
+            except ValueError:
+                record["epoch"] = 0.0
+        record["seq"] = None
+        record["file"] = None
+        record["migrated_from"] = name
+        log.append(record)
+        migrated += 1
+    log.sync()
+    for message_file in files:
+        os.remove(message_file)
+    if own_log:
+        log.close()
+    return migrated
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """
+    Replace a file's content atomically with a temp file and rename.
+
+    :param path: The file to write.
+    :param data: The complete new content.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def new_summary(session_id: str) -> dict[str, Any]:
+    """
+    :param session_id: The session folder name.
+    :return: An empty session summary.
+    """
+    return {
+        "session_id": session_id,
+        "messages": 0,
+        "first_epoch": None,
+        "last_epoch": None,
+        "preview": "",
+        "bytes": 0,
+    }
+
+
+class HistoryIndex:
+    """
+    Per-user index of session summaries (message count, first/last timestamp,
+    first-prompt preview, byte size), kept in ``history_index.jsonl`` next to the
+    session folders. Writers append a summary line whenever a session changes and
+    the latest line per session wins, so History can start without opening any
+    session log.
+    """
+
+    def __init__(self, user_history_path: str):
+        """
+        HistoryIndex
+
+        :param user_history_path: The ``sessions/<user>`` folder.
+        """
+        self.path = os.path.join(user_history_path, HISTORY_INDEX_FILE)
+        self._lock = threading.Lock()
+
+    def load(self) -> dict[str, dict[str, Any]]:
+        """
+        Read the index, compacting it when superseded lines dominate.
+
+        :return: The latest summary of every indexed session, by session id.
+        """
+        summaries: dict[str, dict[str, Any]] = {}
+        lines = 0
+        try:
+            with open(self.path, "rb") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        summary = loads(line)
+                    except ValueError:
+                        continue  # Torn last line after a crash
+                    summaries[summary["session_id"]] = summary
+        except FileNotFoundError:
+            return summaries
+        if lines > 2 * len(summaries) + 100:
+            self.rewrite(summaries)
+        return summaries
+
+    def update(self, summary: dict[str, Any]) -> None:
+        """
+        Record the current summary of a session.
+
+        :param summary: The session summary to append.
+        """
+        line = json.dumps(summary) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def rewrite(self, summaries: dict[str, dict[str, Any]]) -> None:
+        """
+        Replace the index with exactly one line per session.
+
+        :param summaries: The summaries to keep.
+        """
+        data = "".join(json.dumps(s) + "\n" for s in summaries.values())
+        with self._lock:
+            write_atomic(self.path, data.encode("utf-8"))
@@ -0,0 +1,154 @@
+"""
+Docstring for agentx.telemetry
+"""
+
+import json
+import time
+from typing import Any
+
+# Timing fields Ollama reports on the final (done) chunk of a chat stream
+SERVER_FIELDS = (
+    "eval_count",
+    "eval_duration",
+    "prompt_eval_count",
+    "prompt_eval_duration",
+    "load_duration",
+    "total_duration",
+)
+
+
+def percentile(sorted_values: list[float], q: float) -> float | None:
+    """
+    Nearest-rank percentile of an already sorted list.
+
+    :param sorted_values: The values, sorted ascending.
+    :param q: The percentile in the range 0-100.
+    :return: The percentile value, or None for an empty list.
+    """
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class TurnMetrics:
+    """
+    Client- and server-side timings for one streamed chat turn.
+
+    ``on_chunk`` is called from the streaming worker as each chunk arrives, so the
+    timestamps reflect network arrival rather than when the UI drained them.
+    """
+
+    def __init__(self, model: str, host: str):
+        """
+        TurnMetrics
+
+        :param model: The model the turn was sent to.
+        :param host: The Ollama host that served the turn.
+        """
+        self.model = model
+        self.host = host
+        self.epoch = time.time()
+        self.started: float | None = None
+        self.first_token_at: float | None = None
+        self.first_content_at: float | None = None
+        self.last_token_at: float | None = None
+        self.tokens = 0
+        self.gaps: list[float] = []  # Inter-token latencies in seconds
+        self.server: dict[str, Any] = {}
+
+    def start(self):
+        """
+        Mark the moment the request is sent.
+        """
+        self.epoch = time.time()
+        self.started = time.perf_counter()
+
+    def on_chunk(self, channel: str):
+        """
+        Record the arrival of one streamed token.
+
+        :param channel: The message field the token arrived on.
+        """
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        else:
+            self.gaps.append(now - self.last_token_at)
+        if channel == "content" and self.first_content_at is None:
+            self.first_content_at = now
+        self.last_token_at = now
+        self.tokens += 1
+
+    def on_done(self, part: Any):
+        """
+        Keep the server-side counters from the final chunk.
+
+        :param part: The final ChatResponse of the stream, or the decoded final
+            chunk as a dictionary.
+        """
+        get = part.get if isinstance(part, dict) else lambda f: getattr(part, f, None)
+        for field in SERVER_FIELDS:
+            value = get(field)
+            if value is not None:
+                self.server[field] = value
+
+    def tokens_per_second(self) -> float:
+        """
+        Client-side generation rate since the first token.
+        """
+        if self.tokens < 2 or self.last_token_at == self.first_token_at:
+            return 0.0
+        return (self.tokens - 1) / (self.last_token_at - self.first_token_at)
+
+    def ttft_ms(self) -> float | None:
+        """
+        Time to first token (thinking or content) in milliseconds.
+        """
+        if self.started is None or self.first_token_at is None:
+            return None
+        return (self.first_token_at - self.started) * 1000
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Summarize the turn for the message JSON and the metrics export.
+        """
+        gaps_ms = sorted(g * 1000 for g in self.gaps)
+        data = {
+            "model": self.model,
+            "host": self.host,
+            "epoch": self.epoch,
+            "tokens": self.tokens,
+            "ttft_ms": self.ttft_ms(),
+            "ttfct_ms": (
+                (self.first_content_at - self.started) * 1000
+                if self.started is not None and self.first_content_at is not None
+                else None
+            ),
+            "itl_p50_ms": percentile(gaps_ms, 50),
+            "itl_p90_ms": percentile(gaps_ms, 90),
+            "itl_p99_ms": percentile(gaps_ms, 99),
+            "tokens_per_second": self.tokens_per_second(),
+            "total_ms": (
+                (self.last_token_at - self.started) * 1000
+                if self.started is not None and self.last_token_at is not None
+                else None
+            ),
+        }
+        data.update(self.server)
+        if self.server.get("eval_count") and self.server.get("eval_duration"):
+            data["server_tokens_per_second"] = (
+                self.server["eval_count"] / self.server["eval_duration"] * 1e9
+            )
+        return data
+
+
+def append_metrics(metrics_path: str, metrics: dict[str, Any]) -> None:
+    """
+    Append one turn's metrics as a JSON line to the session's metrics export.
+
+    :param metrics_path: Path of the session's metrics.jsonl file.
+    :param metrics: The dictionary produced by ``TurnMetrics.to_dict``.
+    """
+    with open(metrics_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(metrics) + "\n")
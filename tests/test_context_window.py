@@ -0,0 +1,50 @@
+from agentx.context_window import ContextWindow
+from agentx.message import Message
+
+
+def message(role, tokens, **kwargs):
+    return Message(role=role, content="x", tokens=tokens, **kwargs)
+
+
+def test_oldest_turns_are_evicted_down_to_low_water():
+    window = ContextWindow(budget=100, low_water=0.5)
+    turns = [(message("user", 20), message("assistant", 20)) for _ in range(3)]
+    for question, answer in turns:
+        window.append(question)
+        window.append(answer)
+
+    # 120 tokens > 100: evict whole turns until at most 50 remain
+    assert window.messages() == list(turns[2])
+    assert window.evicted == list(turns[0] + turns[1])
+    assert window.tokens == 40
+
+
+def test_pinned_and_system_messages_are_always_sent():
+    window = ContextWindow(budget=50)
+    system = message("system", 10)
+    pinned = message("assistant", 10, pinned=True)
+    window.append(system)
+    window.append(pinned)
+    old = message("user", 30)
+    new = message("user", 30)
+    window.append(old)
+    window.append(new)
+
+    assert window.messages() == [system, pinned, new]
+
+
+def test_the_newest_turn_is_kept_even_over_budget():
+    window = ContextWindow(budget=10)
+    huge = message("user", 500)
+    window.append(huge)
+    assert window.messages() == [huge]
+
+
+def test_disabled_messages_cost_nothing_and_are_not_sent():
+    window = ContextWindow(budget=100)
+    question = message("user", 20)
+    answer = message("assistant", 60, enabled=False)
+    window.append(question)
+    window.append(answer)
+    assert window.tokens == 20
+    assert window.messages() == [question]
@@ -0,0 +1,160 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from agentx.context import Context
+from agentx.journal import JOURNAL_FOLDER, TurnJournal, recover_journals
+from agentx.message import Message
+from agentx.storage import SessionLog
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def new_session(history):
+    context = Context()
+    context.session_id = "session_1"
+    context.path = os.path.join(history, context.session_id, "context")
+    os.makedirs(context.path)
+    context.add_message(datetime.now(), Message(role="user", content="question"))
+    context.close()
+    return context
+
+
+def crashed_journal(
+    history,
+    context,
+    thinking_epoch=None,
+    thinking="pondering",
+    content="half an ans",
+    continues_seq=None,
+):
+    """
+    Journal a response with thinking and content, as left by a killed process.
+    """
+    journal = TurnJournal(
+        os.path.join(history, JOURNAL_FOLDER),
+        {
+            "context_path": context.path,
+            "session_id": context.session_id,
+            "epoch": time.time(),
+            "model": "fake",
+            "host": "localhost:11434",
+            "continues_seq": continues_seq,
+        },
+        flush_bytes=1,
+    )
+    journal.append("thinking", thinking)
+    if thinking_epoch is not None:
+        journal.saved_thinking(thinking_epoch)
+    journal.append("content", content)
+    journal.close()
+    with open(journal.path, "rb") as f:
+        lines = f.readlines()
+    header = json.loads(lines[0])
+    header["pid"] = dead_pid()
+    lines[0] = (json.dumps(header) + "\n").encode("utf-8")
+    with open(journal.path, "wb") as f:
+        f.writelines(lines)
+    return journal
+
+
+def session_messages(context):
+    log = SessionLog(context.path)
+    try:
+        return [(r["content"], r.get("status")) for r in log.iter_records()]
+    finally:
+        log.close()
+
+
+def test_recovers_a_crashed_response_as_partial(tmp_path):
+    context = new_session(tmp_path)
+    journal = crashed_journal(tmp_path, context)
+
+    recovered = recover_journals(str(tmp_path))
+
+    assert [m.content for m in recovered] == ["half an ans"]
+    assert session_messages(context) == [
+        ("question", None),
+        ("pondering", None),
+        ("half an ans", "partial"),
+    ]
+    assert not os.path.exists(journal.path)
+
+
+def test_thinking_already_in_the_log_is_not_added_twice(tmp_path):
+    context = new_session(tmp_path)
+    thinking = Message(role="assistant", content="pondering")
+    thinking.enabled = False
+    context.add_message(datetime.now(), thinking)
+    context.close()
+    crashed_journal(tmp_path, context, thinking_epoch=thinking.epoch)
+
+    recover_journals(str(tmp_path))
+
+    assert session_messages(context) == [
+        ("question", None),
+        ("pondering", None),
+        ("half an ans", "partial"),
+    ]
+
+
+def test_thinking_whose_save_was_still_queued_is_recovered(tmp_path):
+    context = new_session(tmp_path)
+    crashed_journal(tmp_path, context, thinking_epoch=time.time())
+
+    recover_journals(str(tmp_path))
+
+    assert session_messages(context) == [
+        ("question", None),
+        ("pondering", None),
+        ("half an ans", "partial"),
+    ]
+
+
+def test_journal_of_a_running_process_is_left_alone(tmp_path):
+    context = new_session(tmp_path)
+    journal = TurnJournal(
+        os.path.join(tmp_path, JOURNAL_FOLDER),
+        {"context_path": context.path, "session_id": context.session_id},
+        flush_bytes=1,
+    )
+    journal.append("content", "still streaming")
+
+    assert recover_journals(str(tmp_path)) == []
+    assert os.path.exists(journal.path)
+    journal.discard()
+
+
+def test_continuation_appends_thinking_and_content_to_the_resumed_messages(
+    tmp_path,
+):
+    context = new_session(tmp_path)
+    thinking = Message(role="assistant", content="pondering")
+    thinking.enabled = False
+    context.add_message(datetime.now(), thinking)
+    response = Message(role="assistant", content="half an", status="partial")
+    context.add_message(datetime.now(), response)
+    context.close()
+    crashed_journal(
+        tmp_path,
+        context,
+        thinking=" some more",
+        content=" answer",
+        continues_seq=response.seq,
+    )
+
+    recovered = recover_journals(str(tmp_path))
+
+    assert [m.content for m in recovered] == ["half an answer"]
+    assert session_messages(context) == [
+        ("question", None),
+        ("pondering some more", None),
+        ("half an answer", "partial"),
+    ]
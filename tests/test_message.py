@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from agentx.context import Context
+from agentx.message import Message
+
+
+def saved_context(path, contents):
+    context = Context()
+    context.path = str(path)
+    for idx, content in enumerate(contents):
+        role = "user" if idx % 2 == 0 else "assistant"
+        context.add_message(datetime.now(), Message(role=role, content=content))
+    context.close()
+
+
+def loaded_messages(path):
+    context = Context()
+    context.path = str(path)
+    context.load_messages("")
+    return context, [m for ts, m in context.messages]
+
+
+def test_loaded_messages_read_their_content_from_the_log(tmp_path):
+    saved_context(tmp_path, ["question", "answer"])
+    context, messages = loaded_messages(tmp_path)
+
+    assert all(m._content is None for m in messages)
+    assert [m.content for m in messages] == ["question", "answer"]
+    assert messages[1].tokens == Message("assistant", "answer").tokens
+    context.close()
+
+
+def test_appending_keeps_the_content_and_saves_it(tmp_path):
+    saved_context(tmp_path, ["question", "half an"])
+    context, messages = loaded_messages(tmp_path)
+    messages[1].append(" answer")
+    context.update_message(messages[1])
+    context.close()
+
+    context, messages = loaded_messages(tmp_path)
+    assert [m.content for m in messages] == ["question", "half an answer"]
+    context.close()
+
+
+def test_messages_compare_by_identity_and_share_role_strings():
+    first = Message("".join(["assis", "tant"]), "same")
+    second = Message("assistant", "same")
+    assert first != second
+    assert first.role is second.role
+    assert len({first, second}) == 2
@@ -0,0 +1,69 @@
+import threading
+from datetime import datetime
+
+from agentx.message import Message
+from agentx.persistence import WriteBehind
+from agentx.storage import SessionLog
+
+
+def test_pending_jobs_with_the_same_key_are_coalesced():
+    writer = WriteBehind()
+    gate = threading.Event()
+    written = []
+    writer.submit("blocker", gate.wait)  # Hold the worker so jobs stay pending
+    writer.submit("message", lambda: written.append("first"))
+    writer.submit("other", lambda: written.append("other"))
+    writer.submit("message", lambda: written.append("second"))
+    gate.set()
+    assert writer.flush(timeout=5)
+    writer.close()
+
+    assert written == ["second", "other"]  # Latest job, in the first one's place
+    assert writer.coalesced == 1
+
+
+def test_close_writes_everything_still_queued(tmp_path):
+    log = SessionLog(tmp_path)
+    writer = WriteBehind()
+    messages = [Message(role="user", content=f"message {idx}") for idx in range(50)]
+    for message in messages:
+        writer.save_message(log, message, datetime.now())
+    assert [m.seq for m in messages] == list(range(50))  # Reserved up front
+    writer.close(timeout=5)
+
+    reopened = SessionLog(tmp_path)
+    assert [r["content"] for r in reopened.iter_records()] == [
+        f"message {idx}" for idx in range(50)
+    ]
+    reopened.close()
+
+
+def test_a_failing_job_does_not_stop_the_worker():
+    writer = WriteBehind()
+    written = []
+    writer.submit("bad", lambda: 1 / 0)
+    writer.submit("good", lambda: written.append("good"))
+    assert writer.flush(timeout=5)
+    writer.close()
+    assert written == ["good"]
+
+
+def test_close_leaves_logs_open_while_the_worker_is_busy(tmp_path):
+    log = SessionLog(tmp_path)
+    writer = WriteBehind()
+    writer.save_message(log, Message(role="user", content="first"), datetime.now())
+    assert writer.flush(timeout=5)
+    gate = threading.Event()
+    writer.submit("blocker", gate.wait)
+    writer.save_message(log, Message(role="user", content="second"), datetime.now())
+
+    writer.close(timeout=0.05)
+    assert log._writer is not None  # Not closed under the busy worker
+
+    gate.set()
+    writer._thread.join(5)
+    assert not writer._thread.is_alive()
+    log.close()
+    reopened = SessionLog(tmp_path)
+    assert [r["content"] for r in reopened.iter_records()] == ["first", "second"]
+    reopened.close()
@@ -0,0 +1,37 @@
+from agentx.session import AgentXSession
+
+
+class StubPool:
+    def start(self):
+        pass
+
+
+def warmup_session(handshake):
+    """
+    An AgentXSession with only what the warm-up uses; no window is created.
+    """
+    session = AgentXSession.__new__(AgentXSession)
+    session.pool = StubPool()
+    session.warmup = None
+    session.perform_service_handshake = handshake
+    session.poll_warmup = lambda future, started: None
+    return session
+
+
+def test_failed_warmup_resolves_and_is_retried():
+    attempts = []
+
+    def handshake():
+        attempts.append(1)
+        raise ValueError("invalid ollama_host")
+
+    session = warmup_session(handshake)
+    session.ensure_warmup()
+    first = session.warmup
+    assert isinstance(first.exception(timeout=5), ValueError)
+    assert first.done()
+
+    session.ensure_warmup()
+    assert session.warmup is not first
+    session.warmup.exception(timeout=5)
+    assert len(attempts) == 2
@@ -0,0 +1,98 @@
+import os
+from concurrent.futures import CancelledError
+
+import pytest
+
+from agentx.cancellation import CancelToken
+from agentx.storage import INDEX_FILE, INDEX_RECORD, READ_BATCH, SessionLog
+
+
+def write_messages(path, count, start=0):
+    log = SessionLog(path)
+    for idx in range(start, start + count):
+        log.append({"role": "user", "content": f"message {idx}", "epoch": idx})
+    log.close()
+
+
+def contents(path):
+    log = SessionLog(path)
+    try:
+        return [record["content"] for record in log.iter_records()]
+    finally:
+        log.close()
+
+
+def test_append_and_reopen(tmp_path):
+    write_messages(tmp_path, 3)
+    assert contents(tmp_path) == ["message 0", "message 1", "message 2"]
+
+
+def test_update_supersedes_earlier_record(tmp_path):
+    log = SessionLog(tmp_path)
+    entry = log.append({"role": "user", "content": "draft"})
+    log.append({"role": "user", "content": "final", "seq": entry.seq})
+    log.close()
+    assert contents(tmp_path) == ["final"]
+
+
+def test_torn_index_tail_is_truncated_before_the_next_append(tmp_path):
+    write_messages(tmp_path, 3)
+    index_path = os.path.join(tmp_path, INDEX_FILE)
+    with open(index_path, "r+b") as f:
+        f.truncate(3 * INDEX_RECORD.size - 10)
+
+    # The torn record is dropped, then re-indexed from the segment
+    assert contents(tmp_path) == ["message 0", "message 1", "message 2"]
+    assert os.path.getsize(index_path) % INDEX_RECORD.size == 0
+
+    write_messages(tmp_path, 1, start=3)
+    assert contents(tmp_path) == [f"message {idx}" for idx in range(4)]
+
+
+def test_torn_segment_tail_is_dropped(tmp_path):
+    write_messages(tmp_path, 2)
+    log = SessionLog(tmp_path)
+    with open(log.segment_path(0), "ab") as f:
+        f.write(b'{"role": "user", "content": "tor')
+    log.close()
+
+    assert contents(tmp_path) == ["message 0", "message 1"]
+    write_messages(tmp_path, 1, start=2)
+    assert contents(tmp_path) == ["message 0", "message 1", "message 2"]
+
+
+def test_closing_readers_mid_read_defers_the_close(tmp_path, monkeypatch):
+    write_messages(tmp_path, 1)
+    log = SessionLog(tmp_path)
+    entry = log.entries()[0]
+    real_pread = os.pread
+    closed_during_read = []
+
+    def pread(fd, length, offset):
+        log.close_readers()  # Another thread closing the log mid-read
+        try:
+            os.fstat(fd)
+        except OSError:
+            closed_during_read.append(fd)
+        return real_pread(fd, length, offset)
+
+    monkeypatch.setattr(os, "pread", pread)
+    assert log.read(entry)["content"] == "message 0"
+    assert closed_during_read == []
+    assert log._readers == {} and log._reads == {} and log._retired == set()
+    log.close()
+
+
+def test_many_records_are_read_in_order_and_cancellable(tmp_path):
+    count = READ_BATCH * 5 + 3
+    write_messages(tmp_path, count)
+    log = SessionLog(tmp_path)
+    entries = log.entries()
+    records = list(log.iter_many(entries))
+    assert [r["content"] for r in records] == [f"message {i}" for i in range(count)]
+
+    cancel = CancelToken()
+    cancel.cancel()
+    with pytest.raises(CancelledError):
+        list(log.iter_many(entries, cancel))
+    log.close()